@@ -0,0 +1,212 @@
+# Import necessary libraries for packing track artwork into a single file
+import io  # For encoding thumbnails in memory
+import logging  # For reporting a damaged pack, which is skipped rather than fatal
+import mmap  # For reading the pack without copying it into memory
+import os  # For listing the artwork directory and atomic replacement of the pack
+import struct  # For the binary header and index
+import sys  # For the packer's command line arguments
+
+# Pack file layout, all integers little-endian:
+#   magic            8 bytes, MAGIC
+#   count            uint32, number of entries
+#   index            count x (uint16 name length, name in UTF-8, uint64 offset, uint32 length)
+#   data             the thumbnails, each at its absolute offset
+# Names are the artwork file names without extension, i.e. the track keys ("01", "120").
+# Thumbnails are stored as PNG, already resized for the track details panel.
+
+MAGIC = b"ARTPACK1"
+_COUNT = struct.Struct("<I")
+_NAME_LENGTH = struct.Struct("<H")
+_LOCATION = struct.Struct("<QI")
+
+logger = logging.getLogger(__name__)
+
+def artwork_name(path):
+    """
+    Get the pack entry name of an artwork file, e.g. "01" for "images/01.gif".
+
+    """
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+class ArtworkPack:
+    """
+    Read-only pack of track artwork thumbnails in one file.
+    The file is memory-mapped and the index is read once, so looking up artwork costs
+    a dictionary lookup instead of a stat and an open per track, and get() returns a
+    zero-copy view of the mapped bytes. Entries can be discarded, e.g. the artwork of
+    deleted tracks; their bytes stay in the file until the pack is rebuilt with pack_directory.
+    """
+    def __init__(self, path):
+        """
+        Open a pack file and read its index.
+        Raises ValueError if the file is not a pack or is truncated or damaged.
+
+        """
+        self.path = path
+        with open(path, "rb") as file:
+            stat = os.fstat(file.fileno())
+            if stat.st_size < len(MAGIC) + _COUNT.size:  # mmap cannot map an empty file
+                raise ValueError(f"{path} is not an artwork pack")
+            self.mtime = stat.st_mtime_ns
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)  # Stays valid after closing the file
+        self._view = memoryview(self._map)
+        try:
+            if self._map[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not an artwork pack")
+            self._entries = self._read_index(len(self._map))
+        except (ValueError, struct.error) as error:  # UnicodeDecodeError is a ValueError
+            self.close()
+            raise ValueError(f"{path} is damaged: {error}") from error
+
+    def _read_index(self, size):
+        """
+        Read the index into {name: (offset, length)}, checking every entry lies inside the file.
+
+        """
+        entries = {}
+        position = len(MAGIC)
+        (count,) = _COUNT.unpack_from(self._map, position)
+        position += _COUNT.size
+        for _ in range(count):
+            (name_length,) = _NAME_LENGTH.unpack_from(self._map, position)
+            position += _NAME_LENGTH.size
+            if position + name_length > size:
+                raise ValueError("index runs past the end of the file")
+            name = self._map[position:position + name_length].decode("utf-8")
+            position += name_length
+            offset, length = _LOCATION.unpack_from(self._map, position)
+            position += _LOCATION.size
+            if offset + length > size:
+                raise ValueError(f"entry {name!r} runs past the end of the file")
+            entries[name] = (offset, length)
+        return entries
+
+    def __contains__(self, name):
+        """
+        Check whether the pack has artwork with the given name.
+
+        """
+        return name in self._entries
+
+    def __len__(self):
+        """
+        Get the number of entries.
+
+        """
+        return len(self._entries)
+
+    def names(self):
+        """
+        Get the names of all entries.
+
+        """
+        return self._entries.keys()
+
+    def discard(self, name):
+        """
+        Stop serving the entry with the given name, if there is one.
+
+        """
+        self._entries.pop(name, None)
+
+    def get(self, name):
+        """
+        Get a read-only memoryview of the thumbnail with the given name, or None.
+        Release the view (or use it in a with statement) once it has been decoded, so the pack can be closed.
+
+        """
+        location = self._entries.get(name)
+        if location is None:
+            return None
+        offset, length = location
+        return self._view[offset:offset + length]
+
+    def close(self):
+        """
+        Unmap the file. Views returned by get() must have been released.
+
+        """
+        self._view.release()
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_pack(path="artwork.pack"):
+    """
+    Open an artwork pack, or return None if there is no pack file or it cannot be read,
+    so artwork is loaded from the loose image files instead.
+
+    """
+    try:
+        return ArtworkPack(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as error:
+        logger.warning("Ignoring artwork pack: %s", error)
+        return None
+
+def write_pack(path, entries):
+    """
+    Write (name, bytes) entries to a pack file.
+    The pack is written to a temporary file, fsynced and renamed over path.
+
+    """
+    entries = sorted(entries)
+    names = [name.encode("utf-8") for name, data in entries]
+    offset = len(MAGIC) + _COUNT.size + sum(_NAME_LENGTH.size + len(name) + _LOCATION.size for name in names)
+    index = [MAGIC, _COUNT.pack(len(entries))]
+    for name, (_, data) in zip(names, entries):
+        index += [_NAME_LENGTH.pack(len(name)), name, _LOCATION.pack(offset, len(data))]
+        offset += len(data)
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.writelines(index)
+        file.writelines(data for name, data in entries)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+def pack_directory(images_dir="images", path="artwork.pack", size=None):
+    """
+    Convert a directory of artwork files into a pack of resized PNG thumbnails.
+    Returns the number of packed images.
+
+    """
+    from PIL import Image  # Only the packer needs PIL; reading a pack does not
+    from thumbnail_cache import THUMBNAIL_SIZE, fit_size
+
+    entries = []
+    for filename in sorted(os.listdir(images_dir)):
+        try:
+            with Image.open(os.path.join(images_dir, filename)) as image:
+                image = image.convert("RGBA")
+                image = image.resize(fit_size(image.width, image.height, size or THUMBNAIL_SIZE),
+                                     Image.Resampling.LANCZOS)
+        except OSError:
+            continue  # Not an image
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        entries.append((artwork_name(filename), buffer.getvalue()))
+    write_pack(path, entries)
+    return len(entries)
+
+def main():
+    """
+    Pack the artwork directory from the command line.
+    Usage: python artwork_pack.py [images_dir] [pack_file]
+
+    """
+    images_dir = sys.argv[1] if len(sys.argv) > 1 else "images"
+    path = sys.argv[2] if len(sys.argv) > 2 else "artwork.pack"
+    count = pack_directory(images_dir, path)
+    print(f"Packed {count} images from {images_dir} into {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+# Benchmarks for the music library
+# Run them from the project directory, e.g. python -m benchmarks.bench_memory
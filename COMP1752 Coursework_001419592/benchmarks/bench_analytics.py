@@ -0,0 +1,75 @@
+# Benchmark of the NumPy analytics against the pure-Python loop over LibraryItems
+# Needs NumPy
+# Usage: python -m benchmarks.bench_analytics [rows]
+
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+import track_library as lib
+from benchmarks.bench_search import fill_library
+from library_analytics import PERCENTILES, LibraryAnalytics
+
+def python_report():
+    """
+    Compute the report the way it was done before: one loop over the tracks with the getters.
+
+    """
+    histogram = Counter()
+    totals = defaultdict(int)
+    counts = Counter()
+    plays = []
+    for key in lib.get_keys():
+        rating = lib.get_rating(key)
+        artist = lib.get_artist(key)
+        histogram[rating] += 1
+        totals[artist] += rating
+        counts[artist] += 1
+        plays.append(lib.get_play_count(key))
+    averages = {artist: totals[artist] / counts[artist] for artist in counts}
+    plays.sort()
+    percentiles = {percentile: plays[min(len(plays) - 1, len(plays) * percentile // 100)] for percentile in PERCENTILES}
+    return histogram, averages, percentiles
+
+def numpy_report(analytics):
+    """
+    Compute the same report with the analytics module.
+
+    """
+    return (analytics.rating_histogram(), analytics.artist_average_ratings(),
+            analytics.play_count_percentiles())
+
+def timed(function, *args):
+    """
+    Return the time of one call.
+
+    """
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+def main():
+    """
+    Print the time of the Python loop, the first NumPy report (including the export),
+    a NumPy report after 1000 changes and one without changes.
+
+    """
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    fill_library(count)
+    rng = random.Random(2)
+    for item in lib.library.values():
+        item.play_count = int(rng.paretovariate(1.2)) - 1
+    analytics = LibraryAnalytics()
+    print(f"rows: {count}")
+    print(f"python loop                  {timed(python_report) * 1e3:9.1f} ms")
+    print(f"numpy, export + report       {timed(numpy_report, analytics) * 1e3:9.1f} ms")
+    keys = lib.get_keys()
+    for key in rng.sample(keys, 1000):
+        lib.set_rating(key, rng.randrange(6))
+    lib.increment_play_counts(rng.sample(keys, 1000))
+    print(f"numpy, after 1000 changes    {timed(numpy_report, analytics) * 1e3:9.1f} ms")
+    print(f"numpy, unchanged             {timed(numpy_report, analytics) * 1e3:9.1f} ms")
+    analytics.close()
+
+if __name__ == "__main__":
+    main()
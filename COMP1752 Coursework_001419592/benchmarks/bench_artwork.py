@@ -0,0 +1,69 @@
+# Benchmark of reading artwork from loose files against an artwork pack
+# Reads every thumbnail once the way load_image does (exists check, open, read) and once from the pack
+# Usage: python -m benchmarks.bench_artwork [images]
+
+import os
+import random
+import sys
+import tempfile
+import time
+from artwork_pack import ArtworkPack, write_pack
+
+def read_loose(directory, names):
+    """
+    Read each artwork file after checking that it exists. Returns the bytes read.
+
+    """
+    total = 0
+    for name in names:
+        path = os.path.join(directory, f"{name}.gif")
+        if os.path.exists(path):
+            with open(path, "rb") as file:
+                total += len(file.read())
+    return total
+
+def read_pack(pack, names):
+    """
+    Look up each thumbnail in the pack. Returns the bytes viewed.
+
+    """
+    total = 0
+    for name in names:
+        view = pack.get(name)
+        if view is not None:
+            total += len(view)
+    return total
+
+def main():
+    """
+    Print the time to read every thumbnail from loose files and from a pack.
+
+    """
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(1)
+    entries = [(f"{index:02d}", rng.randbytes(rng.randrange(4000, 12000))) for index in range(1, count + 1)]
+    names = [name for name, data in entries]
+    rng.shuffle(names)
+    with tempfile.TemporaryDirectory() as directory:
+        for name, data in entries:
+            with open(os.path.join(directory, f"{name}.gif"), "wb") as file:
+                file.write(data)
+        pack_path = os.path.join(directory, "artwork.pack")
+        write_pack(pack_path, entries)
+
+        start = time.perf_counter()
+        loose_bytes = read_loose(directory, names)
+        loose_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ArtworkPack(pack_path) as pack:
+            open_time = time.perf_counter() - start
+            pack_bytes = read_pack(pack, names)
+        pack_time = time.perf_counter() - start
+    assert loose_bytes == pack_bytes
+    print(f"{count} thumbnails, {loose_bytes / 1024 / 1024:.1f} MiB")
+    print(f"loose files   {loose_time * 1e3:8.1f} ms")
+    print(f"artwork pack  {pack_time * 1e3:8.1f} ms  (open and index {open_time * 1e3:.1f} ms)")
+
+if __name__ == "__main__":
+    main()
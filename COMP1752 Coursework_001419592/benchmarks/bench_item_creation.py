@@ -0,0 +1,55 @@
+# Micro-benchmark of track object creation cost
+# Compares LibraryItem, SlottedLibraryItem and the bulk from_rows constructor
+# Usage: python -m benchmarks.bench_item_creation [rows]
+
+import sys
+import time
+import tracemalloc
+from library_item import LibraryItem, SlottedLibraryItem
+
+def make_rows(count):
+    """
+    Generate synthetic (name, artist, rating) rows as they come out of csv.reader.
+
+    """
+    return [(f"Track {index}", f"Artist {index % 5000}", str(index % 7)) for index in range(count)]
+
+def create_each(cls):
+    """
+    Return a function that creates one object per row through the constructor.
+
+    """
+    return lambda rows: [cls(name, artist, rating) for name, artist, rating in rows]
+
+def run(label, create, rows):
+    """
+    Time creating the objects and measure the memory they hold.
+
+    """
+    start = time.perf_counter()
+    items = create(rows)
+    elapsed = time.perf_counter() - start
+    del items
+
+    tracemalloc.start()
+    items = create(rows)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    print(f"{label:32} {elapsed:7.3f} s {elapsed / len(rows) * 1e9:7.0f} ns/row {size / len(rows):6.1f} B/row")
+
+def main():
+    """
+    Print the creation cost of each variant.
+
+    """
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rows = make_rows(count)
+    print(f"rows: {count}")
+    run("LibraryItem(...)", create_each(LibraryItem), rows)
+    run("SlottedLibraryItem(...)", create_each(SlottedLibraryItem), rows)
+    run("LibraryItem.from_rows", LibraryItem.from_rows, rows)
+    run("SlottedLibraryItem.from_rows", SlottedLibraryItem.from_rows, rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Memory benchmark comparing the dict-of-LibraryItem library with the columnar store
+# Usage: python -m benchmarks.bench_memory [rows]
+
+import sys
+import tracemalloc
+from columnar_library import ColumnarLibrary
+from library_item import LibraryItem
+
+def make_rows(count):
+    """
+    Generate synthetic (key, name, artist, rating) rows with a realistic number of repeated artists.
+
+    """
+    for index in range(1, count + 1):
+        yield f"{index:02d}", f"Track {index}", f"Artist {index % 5000}", str(index % 7)
+
+def measure(build, count):
+    """
+    Measure the memory held by the library that build() returns.
+
+    """
+    tracemalloc.start()
+    library = build(make_rows(count))
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del library
+    return size
+
+def build_dict(rows):
+    """
+    Build the library the way track_library does by default.
+
+    """
+    library = {}
+    for key, name, artist, rating in rows:
+        library[key] = LibraryItem(name, artist, int(rating))
+    return library
+
+def build_columnar(rows):
+    """
+    Build the library in a ColumnarLibrary.
+
+    """
+    library = ColumnarLibrary()
+    for key, name, artist, rating in rows:
+        library[key] = LibraryItem(name, artist, int(rating))
+    return library
+
+def main():
+    """
+    Print the memory used by both layouts.
+
+    """
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    dict_size = measure(build_dict, count)
+    columnar_size = measure(build_columnar, count)
+    print(f"rows:              {count}")
+    print(f"dict of LibraryItem: {dict_size / 2**20:8.1f} MiB ({dict_size / count:6.1f} B/row)")
+    print(f"ColumnarLibrary:     {columnar_size / 2**20:8.1f} MiB ({columnar_size / count:6.1f} B/row)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Benchmark of playback start latency: time from PlaybackEngine.play() to the first sample
+# The first sample counts as played when the mixer's position first moves past zero
+# The first run includes importing pygame and opening the mixer; later runs reuse them
+# Needs pygame and a sound card
+# Usage: python -m benchmarks.bench_playback [runs]
+
+import math
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import wave
+from playback import PlaybackEngine
+from track_library import TrackLibrary
+
+def write_tone(path, seconds=2.0, rate=44100):
+    """
+    Write a 440 Hz sine wave to a 16-bit mono WAV file.
+
+    """
+    samples = (int(12000 * math.sin(2 * math.pi * 440 * index / rate)) for index in range(int(seconds * rate)))
+    with wave.open(path, "wb") as file:
+        file.setnchannels(1)
+        file.setsampwidth(2)
+        file.setframerate(rate)
+        file.writeframes(b"".join(struct.pack("<h", sample) for sample in samples))
+
+def main():
+    """
+    Print the start-to-first-sample latency of a cold start and of warm starts.
+
+    """
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    with tempfile.TemporaryDirectory() as directory:
+        write_tone(os.path.join(directory, "01.wav"))
+        library = TrackLibrary()
+        library.add_track("Tone", "Benchmark")
+        engine = PlaybackEngine(library=library, audio_dir=directory, poll_interval=0.001)
+        first_sample = threading.Event()
+        engine.subscribe(lambda state, key, position: (position > 0 or state == "error") and first_sample.set())
+        latencies = []
+        for run in range(runs):
+            first_sample.clear()
+            start = time.perf_counter()
+            engine.play(["01"])
+            if not first_sample.wait(5) or engine.error:
+                print(f"no audio: {engine.error or 'nothing played within 5 s'}")
+                break
+            latencies.append(time.perf_counter() - start)
+            engine.stop()
+            engine.wait()
+        engine.close()
+    if latencies:
+        warm = sorted(latencies[1:]) or latencies
+        print(f"cold start {latencies[0] * 1e3:8.1f} ms")
+        print(f"warm start {warm[len(warm) // 2] * 1e3:8.1f} ms median, {warm[-1] * 1e3:.1f} ms max "
+              f"over {len(warm)} runs")
+
+if __name__ == "__main__":
+    main()
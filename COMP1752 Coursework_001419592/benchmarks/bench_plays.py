@@ -0,0 +1,50 @@
+# Benchmark of sustained plays per second with the write-behind play journal attached
+# Usage: python -m benchmarks.bench_plays [seconds]
+
+import os
+import random
+import sys
+import tempfile
+import time
+import track_library as lib
+from play_journal import PlayJournal
+
+def run(label, seconds, batch_size, journal_path):
+    """
+    Record plays in batches for a number of seconds and print the rate.
+
+    """
+    keys = lib.get_keys()
+    rng = random.Random(1)
+    journal = PlayJournal(journal_path, fsync_interval=0.5)
+    lib.attach_play_journal(journal)
+    plays = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        if batch_size == 1:
+            lib.increment_play_count(rng.choice(keys))
+        else:
+            lib.increment_play_counts(rng.choices(keys, k=batch_size))
+        plays += batch_size
+    elapsed = time.perf_counter() - start
+    start_close = time.perf_counter()
+    journal.close()
+    close_time = time.perf_counter() - start_close
+    lib.attach_play_journal(None)
+    print(f"{label:28} {plays / elapsed:12,.0f} plays/s  (final flush {close_time * 1e3:.1f} ms, "
+          f"journal {os.path.getsize(journal_path) / 1024:.0f} KiB)")
+
+def main():
+    """
+    Print the sustained play rate for single and batched increments.
+
+    """
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    lib.load_library("music.csv")
+    with tempfile.TemporaryDirectory() as directory:
+        run("increment_play_count", seconds, 1, os.path.join(directory, "single.journal"))
+        run("increment_play_counts x100", seconds, 100, os.path.join(directory, "batch.journal"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# Benchmark of the query engine against sorting and scanning every track
+# Usage: python -m benchmarks.bench_query [rows]
+
+import random
+import sys
+import time
+import track_library as lib
+from benchmarks.bench_search import fill_library
+from library_query import LibraryQuery, artist_is, plays_at_least, rating_between
+
+def timed(function, *args, **options):
+    """
+    Return the time of one call and its result.
+
+    """
+    start = time.perf_counter()
+    result = function(*args, **options)
+    return time.perf_counter() - start, result
+
+def report(label, query_time, baseline_time=None):
+    """
+    Print the time of a query and of the full sort or scan it replaces.
+
+    """
+    line = f"{label:38} query {query_time * 1e3:9.2f} ms"
+    if baseline_time is not None:
+        line += f"  baseline {baseline_time * 1e3:9.1f} ms"
+    print(line)
+
+def main():
+    """
+    Print build, query and maintenance times.
+
+    """
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    fill_library(count)
+    rng = random.Random(2)
+    for item in lib.library.values():
+        item.play_count = int(rng.paretovariate(1.2)) - 1
+    query = LibraryQuery()
+    keys = lib.get_keys()
+    artist = lib.get_artist(keys[len(keys) // 2])
+    print(f"rows: {count}")
+
+    for field in ("rating", "play_count", "artist", "name"):
+        build_time, _ = timed(query.sort_order, field)
+        report(f"build {field} sort order", build_time)
+
+    # Baselines sort or scan all tracks the way callers did before the query engine
+    query_time, _ = timed(query.select, order_by=("-rating", "name"), limit=50)
+    baseline_time, _ = timed(lambda: sorted(lib.iter_tracks(), key=lambda track: (-track[3], track[1].lower()))[:50])
+    report("first page by -rating, name", query_time, baseline_time)
+
+    query_time, _ = timed(query.select, artist_is(artist), order_by="name")
+    baseline_time, _ = timed(lambda: sorted((track for track in lib.iter_tracks() if track[2] == artist),
+                                            key=lambda track: track[1].lower()))
+    report("one artist by name", query_time, baseline_time)
+
+    query_time, _ = timed(query.select, rating_between(5) & plays_at_least(50), order_by="-play_count")
+    baseline_time, _ = timed(lambda: sorted((track for track in lib.iter_tracks() if track[3] == 5 and track[4] >= 50),
+                                            key=lambda track: -track[4]))
+    report("5 stars, 50+ plays, by -plays", query_time, baseline_time)
+
+    query_time, _ = timed(query.top, 10, by="play_count")
+    baseline_time, _ = timed(lambda: sorted(lib.iter_tracks(), key=lambda track: track[4], reverse=True)[:10])
+    report("top 10 by plays (heap)", query_time, baseline_time)
+
+    query_time, groups = timed(query.group_by_artist)
+    report(f"group by artist ({len(groups)} artists)", query_time)
+
+    changed = rng.sample(keys, 1000)
+    start = time.perf_counter()
+    for key in changed:
+        lib.set_rating(key, rng.randrange(6))
+    lib.increment_play_counts(changed)
+    report("1000 ratings + plays, orders updated", time.perf_counter() - start)
+    query_time, _ = timed(query.select, order_by="-play_count", limit=50)
+    report("first page by -plays after changes", query_time)
+    query.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Benchmark of the search index against the linear scan that ViewTrack used to do
+# Usage: python -m benchmarks.bench_search [rows]
+
+import random
+import sys
+import time
+import track_library as lib
+from library_item import SlottedLibraryItem
+
+WORDS = ["love", "night", "dream", "fire", "heart", "summer", "rain", "dance", "light", "river",
+         "shadow", "gold", "wild", "blue", "home", "star", "road", "city", "ocean", "storm"]
+
+def fill_library(count):
+    """
+    Fill the library with synthetic tracks.
+
+    """
+    rng = random.Random(1)
+    lib.library.clear()
+    for index in range(1, count + 1):
+        name = " ".join(rng.choice(WORDS) for _ in range(3)) + f" {index}"
+        artist = f"Artist {rng.randrange(count // 20 + 1)}"
+        lib.library[f"{index:02d}"] = SlottedLibraryItem(name, artist, rng.randrange(6))
+
+def scan(term, field):
+    """
+    Search the way ViewTrack.search_tracks did before the index existed.
+
+    """
+    position = 1 if field == "name" else 2
+    return [track[0] for track in lib.iter_tracks() if term in track[position].lower()]
+
+def timed(function, *args, repeat=5):
+    """
+    Return the best time of several calls and the last result.
+
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    """
+    Print index build time and query times for the index and the scan.
+
+    """
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    fill_library(count)
+    start = time.perf_counter()
+    library = lib.default_library()
+    with library._index_lock:
+        index = library._get_search_index()
+    print(f"rows: {count}, index build: {time.perf_counter() - start:.2f} s")
+    queries = [(lib.get_name(f"{count // 2:02d}")[-12:], "name", "substring"), ("summer rain", "name", "words"),
+               ("oce", "name", "prefix"), ("artist 123", "artist", "substring"),
+               ("7", "name", "substring"), ("wi", "name", "substring")]  # Shorter than an n-gram
+    for term, field, match in queries:
+        index_time, keys = timed(index.search, term, field, match)
+        line = f"{match:9} {term!r:14} {len(keys):8} hits  index {index_time * 1e3:9.3f} ms"
+        if match == "substring":
+            scan_time, _ = timed(scan, term, field, repeat=1)
+            line += f"  scan {scan_time * 1e3:9.1f} ms"
+        print(line)
+
+if __name__ == "__main__":
+    main()
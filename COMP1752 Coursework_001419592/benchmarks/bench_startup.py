@@ -0,0 +1,87 @@
+# Benchmark of the application's cold start
+# Reports the slowest imports from python -X importtime, the time to load the library,
+# and the time until the main window is drawn (skipped when there is no display)
+# Usage: python -m benchmarks.bench_startup [runs]
+
+import subprocess
+import sys
+import time
+
+# Target time from starting Python to a drawn main window, in milliseconds
+TARGET_TIME_TO_WINDOW_MS = 500
+
+# Script run in a fresh interpreter to time the window; prints the elapsed milliseconds
+WINDOW_SCRIPT = """
+import time
+start = time.perf_counter()
+import tkinter as tk
+import jukebox
+root = tk.Tk()
+app = jukebox.JukeBox(root)
+root.update()
+print((time.perf_counter() - start) * 1000)
+root.destroy()
+"""
+
+def import_times():
+    """
+    Import jukebox in a fresh interpreter with -X importtime.
+    Returns (cumulative microseconds, module) pairs, slowest first.
+
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import jukebox"],
+                            capture_output=True, text=True, check=True)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_time, cumulative, module = line[len("import time:"):].split("|")
+        times.append((int(cumulative), module.rstrip()))
+    return sorted(times, reverse=True)
+
+def library_load_time(runs):
+    """
+    Get the best time to load music.csv in a fresh interpreter, in milliseconds.
+
+    """
+    script = ("import time, track_library as lib; start = time.perf_counter(); lib.load_library(); "
+              "print((time.perf_counter() - start) * 1000)")
+    return min(float(subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                                    check=True).stdout) for _ in range(runs))
+
+def time_to_window(runs):
+    """
+    Get the best time from interpreter start to a drawn main window, in milliseconds,
+    or None if no window can be opened (e.g. no display).
+
+    """
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", WINDOW_SCRIPT], capture_output=True, text=True)
+        if result.returncode != 0:
+            return None
+        elapsed = (time.perf_counter() - start) * 1000  # Includes starting the interpreter
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    """
+    Print the startup report.
+
+    """
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    times = import_times()
+    print(f"import jukebox: {times[0][0] / 1000:.1f} ms; slowest imports:")
+    for cumulative, module in times[1:11]:
+        print(f"  {cumulative / 1000:8.1f} ms  {module}")
+    print(f"load_library (background thread at startup): {library_load_time(runs):.1f} ms")
+    window = time_to_window(runs)
+    if window is None:
+        print("time to window: skipped (cannot open a window here)")
+    else:
+        verdict = "OK" if window <= TARGET_TIME_TO_WINDOW_MS else "over target"
+        print(f"time to window: {window:.0f} ms (target {TARGET_TIME_TO_WINDOW_MS} ms, {verdict})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# Benchmark of the SQLite storage backend against the CSV file
+# Compares loading the library, saving a single edit and searching by name
+# Usage: python -m benchmarks.bench_storage [rows]
+
+import csv
+import os
+import sys
+import tempfile
+import time
+import track_library as lib
+from storage import SqliteStorage, import_csv
+
+def write_music_csv(path, count):
+    """
+    Write a synthetic music.csv with count tracks.
+
+    """
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["name", "artist", "rating"])
+        writer.writerows((f"Track {index}", f"Artist {index % 5000}", index % 6) for index in range(1, count + 1))
+
+def save_csv_edit(path):
+    """
+    Save one edit the way Update.save_to_csv does: rewrite every row of the file.
+
+    """
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["name", "artist", "rating"])
+        writer.writerows((name, artist, rating) for key, name, artist, rating, plays in lib.iter_tracks())
+
+def scan(term):
+    """
+    Search names the way ViewTrack.search_tracks originally did.
+
+    """
+    return [track[0] for track in lib.iter_tracks() if term in track[1].lower()]
+
+def timed(label, function, *args):
+    """
+    Print how long a call takes.
+
+    """
+    start = time.perf_counter()
+    function(*args)
+    print(f"  {label:24} {(time.perf_counter() - start) * 1e3:10.1f} ms")
+
+def main():
+    """
+    Print the timings for both backends.
+
+    """
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "music.csv")
+        write_music_csv(csv_path, count)
+        key = f"{count // 2:02d}"
+
+        print(f"CSV ({count} rows)")
+        timed("load", lib.load_library, csv_path)
+        lib.set_rating(key, 3)
+        timed("save single edit", save_csv_edit, csv_path)
+        timed("search 'track 1234'", scan, "track 1234")
+
+        print(f"SQLite ({count} rows)")
+        storage = SqliteStorage(os.path.join(directory, "music.db"))
+        timed("one-shot import", import_csv, storage, csv_path, directory)
+        timed("load", lib.load_storage, storage)
+        timed("save single edit", lib.set_rating, key, 4)
+        timed("search 'track 1234'", storage.search, "track 1234")
+        timed("prefix search", storage.search, "Track 1234", "name", "prefix")
+        storage.close()
+
+if __name__ == "__main__":
+    main()
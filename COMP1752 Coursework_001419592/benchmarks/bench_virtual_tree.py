@@ -0,0 +1,60 @@
+# Benchmark of time-to-first-paint and memory for a plain Treeview and the VirtualTreeview
+# Each case runs in its own process so peak RSS is measured separately. Needs a display.
+# Usage: python -m benchmarks.bench_virtual_tree [rows ...]
+
+import resource
+import subprocess
+import sys
+import time
+
+COLUMNS = ("ID", "Name", "Artist", "Rating", "Plays")
+
+def make_row(index):
+    """
+    Build the display values of a synthetic track.
+
+    """
+    return f"{index:02d}", f"Track {index}", f"Artist {index % 5000}", "⭐" * (index % 6), index % 100
+
+def run_case(mode, count):
+    """
+    Fill one tree with count rows and print the time until the window is drawn and the peak RSS.
+
+    """
+    import tkinter as tk
+    from tkinter import ttk
+    from virtual_tree import VirtualTreeview, RowSource
+
+    root = tk.Tk()
+    root.geometry("800x600")
+    start = time.perf_counter()
+    if mode == "treeview":
+        tree = ttk.Treeview(root, columns=COLUMNS, show="headings")
+        tree.pack(fill="both", expand=True)
+        for index in range(count):
+            tree.insert("", "end", values=make_row(index))
+    else:
+        tree = VirtualTreeview(root, columns=COLUMNS)
+        tree.pack(fill="both", expand=True)
+        tree.set_source(RowSource(range(count), make_row))
+    root.update()
+    elapsed = time.perf_counter() - start
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # kB on Linux
+    print(f"{mode:9} {count:9} rows  first paint {elapsed:8.3f} s  peak RSS {rss:8.1f} MiB")
+    root.destroy()
+
+def main():
+    """
+    Run every case in a separate process.
+
+    """
+    if len(sys.argv) > 2 and sys.argv[1] == "--case":
+        run_case(sys.argv[2], int(sys.argv[3]))
+        return
+    counts = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    for count in counts:
+        for mode in ("treeview", "virtual"):
+            subprocess.run([sys.executable, "-m", "benchmarks.bench_virtual_tree", "--case", mode, str(count)])
+
+if __name__ == "__main__":
+    main()
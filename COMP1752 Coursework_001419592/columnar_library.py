@@ -0,0 +1,317 @@
+# Import necessary libraries for compact column storage
+import sys  # For interning repeated artists
+from array import array  # For compact play count storage
+from library_item import clamp_rating  # For validating ratings the same way as LibraryItem
+
+
+class ColumnarItem:
+    """
+    Lightweight view of one row in a ColumnarLibrary.
+    Behaves like a LibraryItem, but reads and writes the library's columns instead of its own fields.
+    """
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store, row):
+        """
+        Create a view of a row in the store.
+
+        """
+        self._store = store
+        self._row = row
+
+    @property
+    def name(self):
+        """
+        Get the track's name.
+
+        """
+        return self._store._get_name(self._row)
+
+    @name.setter
+    def name(self, value):
+        """
+        Set the track's name.
+
+        """
+        self._store._set_name(self._row, value)
+
+    @property
+    def artist(self):
+        """
+        Get the track's artist.
+
+        """
+        return self._store._strings[self._store._artists[self._row]]
+
+    @artist.setter
+    def artist(self, value):
+        """
+        Set the track's artist.
+
+        """
+        self._store._set_artist(self._row, value)
+
+    @property
+    def rating(self):
+        """
+        Get the track's rating.
+
+        """
+        return self._store._ratings[self._row]
+
+    @rating.setter
+    def rating(self, value):
+        """
+        Set the track's rating with the same validation as LibraryItem.
+
+        """
+        self._store._ratings[self._row] = clamp_rating(value)
+
+    @property
+    def play_count(self):
+        """
+        Get the track's play count.
+
+        """
+        return self._store._play_counts[self._row]
+
+    @play_count.setter
+    def play_count(self, value):
+        """
+        Set the track's play count.
+
+        """
+        self._store._play_counts[self._row] = value
+
+
+class ColumnarLibrary:
+    """
+    Compact backing store for the track library.
+    Names are packed as UTF-8 into one name table, so a name costs its bytes plus twelve
+    bytes of offset and length instead of a string object. Artists, which repeat across
+    many tracks, are interned once in an artist table and referenced by index; entries are
+    reference counted and reused once no row uses them. Ratings are kept in a bytearray and
+    play counts in an unsigned int array, so a row has no per-track Python object.
+    Rows of deleted tracks are reused by the next added track, and the space of replaced
+    names is reclaimed by compacting the name table once it outweighs the names in use.
+    Supports the dictionary operations that track_library uses on its library.
+    """
+    def __init__(self):
+        """
+        Create an empty store.
+
+        """
+        self._rows = {}  # Track key -> row number
+        self._free_rows = []  # Rows of deleted tracks, reused before new rows are added
+        self._name_table = bytearray()  # UTF-8 names of the rows, back to back
+        self._name_offsets = array("Q")  # Offset of each row's name in the name table
+        self._name_lengths = array("I")  # Length in bytes of each row's name
+        self._unused_name_bytes = 0  # Bytes of the name table left behind by replaced or deleted names
+        self._strings = []  # Table of distinct artists; None for free entries
+        self._string_ids = {}  # Artist -> index in the artist table
+        self._string_refs = array("I")  # Number of rows that use each artist table entry
+        self._free_strings = []  # Indexes of free artist table entries
+        self._artists = array("I")  # Artist table index of each row
+        self._ratings = bytearray()  # Rating of each row
+        self._play_counts = array("I")  # Play count of each row
+
+    def _get_name(self, row):
+        """
+        Decode the name of a row from the name table.
+
+        """
+        offset = self._name_offsets[row]
+        return self._name_table[offset:offset + self._name_lengths[row]].decode("utf-8")
+
+    def _pack_name(self, value):
+        """
+        Add a name to the end of the name table. Returns its (offset, length).
+
+        """
+        data = value.encode("utf-8")
+        offset = len(self._name_table)
+        self._name_table += data
+        return offset, len(data)
+
+    def _set_name(self, row, value):
+        """
+        Replace the name of a row, compacting the name table if it is mostly unused.
+
+        """
+        self._unused_name_bytes += self._name_lengths[row]
+        self._name_offsets[row], self._name_lengths[row] = self._pack_name(value)
+        self._compact_names()
+
+    def _compact_names(self):
+        """
+        Rewrite the name table without the bytes of replaced and deleted names once they
+        take up more than half of it.
+
+        """
+        if self._unused_name_bytes * 2 <= len(self._name_table):
+            return
+        table, offsets, lengths = self._name_table, self._name_offsets, self._name_lengths
+        compacted = bytearray()
+        for row in self._rows.values():
+            offset = offsets[row]
+            offsets[row] = len(compacted)
+            compacted += table[offset:offset + lengths[row]]
+        self._name_table = compacted
+        self._unused_name_bytes = 0
+
+    def _intern(self, value):
+        """
+        Return the artist table index of a value and count one more use of it,
+        adding it to the table if needed.
+
+        """
+        index = self._string_ids.get(value)
+        if index is None:
+            value = sys.intern(value)
+            if self._free_strings:
+                index = self._free_strings.pop()
+                self._strings[index] = value
+            else:
+                index = len(self._strings)
+                self._strings.append(value)
+                self._string_refs.append(0)
+            self._string_ids[value] = index
+        self._string_refs[index] += 1
+        return index
+
+    def _release(self, index):
+        """
+        Count one less use of an artist table entry, freeing it when it is no longer used.
+
+        """
+        self._string_refs[index] -= 1
+        if not self._string_refs[index]:
+            del self._string_ids[self._strings[index]]
+            self._strings[index] = None
+            self._free_strings.append(index)
+
+    def _set_artist(self, row, value):
+        """
+        Point a row at a new artist.
+
+        """
+        index = self._intern(value)  # Before releasing, so an unchanged artist is not freed
+        self._release(self._artists[row])
+        self._artists[row] = index
+
+    def append(self, key, name, artist, rating=0, play_count=0):
+        """
+        Add a track, or replace the track with the same key.
+        The rating must already be validated.
+
+        """
+        row = self._rows.get(key)
+        if row is not None:
+            self._set_name(row, name)
+            self._set_artist(row, artist)
+        elif self._free_rows:
+            row = self._rows[key] = self._free_rows.pop()
+            self._name_offsets[row], self._name_lengths[row] = self._pack_name(name)
+            self._artists[row] = self._intern(artist)
+        else:
+            self._rows[key] = len(self._ratings)
+            offset, length = self._pack_name(name)
+            self._name_offsets.append(offset)
+            self._name_lengths.append(length)
+            self._artists.append(self._intern(artist))
+            self._ratings.append(rating)
+            self._play_counts.append(play_count)
+            return
+        self._ratings[row] = rating
+        self._play_counts[row] = play_count
+
+    def __setitem__(self, key, item):
+        """
+        Store a LibraryItem (or any object with the same fields) under a key.
+
+        """
+        self.append(key, item.name, item.artist, item.rating, item.play_count)
+
+    def update(self, items):
+        """
+        Store several (key, item) pairs.
+
+        """
+        for key, item in items:
+            self[key] = item
+
+    def __getitem__(self, key):
+        """
+        Get a view of the track with the given key.
+
+        """
+        return ColumnarItem(self, self._rows[key])
+
+    def __delitem__(self, key):
+        """
+        Remove a track. Its row is reused by the next added track.
+
+        """
+        row = self._rows.pop(key)
+        self._unused_name_bytes += self._name_lengths[row]
+        self._name_lengths[row] = 0
+        self._release(self._artists[row])
+        self._free_rows.append(row)
+        self._compact_names()
+
+    def __contains__(self, key):
+        """
+        Check whether a track with the given key exists.
+
+        """
+        return key in self._rows
+
+    def __len__(self):
+        """
+        Get the number of tracks.
+
+        """
+        return len(self._rows)
+
+    def __iter__(self):
+        """
+        Iterate over the track keys in insertion order.
+
+        """
+        return iter(self._rows)
+
+    def keys(self):
+        """
+        Get the keys of all tracks in insertion order.
+
+        """
+        return self._rows.keys()
+
+    def values(self):
+        """
+        Get views of all tracks in insertion order.
+
+        """
+        return (ColumnarItem(self, row) for row in self._rows.values())
+
+    def items(self):
+        """
+        Get (key, view) pairs for all tracks in insertion order.
+
+        """
+        return ((key, ColumnarItem(self, row)) for key, row in self._rows.items())
+
+    def get(self, key, default=None):
+        """
+        Get a view of a track, or the default if the key does not exist.
+
+        """
+        row = self._rows.get(key)
+        return default if row is None else ColumnarItem(self, row)
+
+    def clear(self):
+        """
+        Remove all tracks and release the columns.
+
+        """
+        self.__init__()
@@ -1,23 +1,35 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import track_library as lib
-import csv
-import os
+from virtual_tree import VirtualTreeview, RowSource
+from playlist import Playlist, PlaylistAutosave
+from playlist_catalogue import PlaylistCatalogue, move_legacy_playlists
 
 class TrackList:
     """
     Class for managing playlists in the music player.
     Provides functionality for creating, editing, and playing playlists.
     """
-    def __init__(self, parent):
+    def __init__(self, parent, player=None):
         """
         Initialize the TrackList class for playlist management.
         
         Args:
             parent: The parent widget where this component will be placed
+            player: PlaybackEngine that plays the checked tracks
         """
         self.parent = parent
+        self.player = player
+        self.playlist = Playlist()  # Entries of the selected playlist; the selected tracks list shows it
+        self.playlist_name = None  # Name of the selected playlist
+        move_legacy_playlists()  # Playlists used to be kept next to music.csv
+        self.catalogue = PlaylistCatalogue(on_change=self.on_catalogue_changed)  # Playlists in the playlists directory
+        self.autosave = PlaylistAutosave(parent, on_error=self.show_save_error,  # Saves changes in the background
+                                         on_saved=self.catalogue.file_saved)
         self.setup_ui()
+        self.load_playlist()  # Shows the track IDs at once; names appear as the library loads
+        self.catalogue.watch(parent)  # Notice playlists added, deleted or changed by other programs
+        lib.subscribe(self.on_library_changed)  # Update the lists when the library changes
         
     def setup_ui(self):
         """
@@ -29,9 +41,10 @@ class TrackList:
         playlist_frame.pack(fill="x", padx=5, pady=5)
 
         ttk.Label(playlist_frame, text="Select Playlist:").pack(side="left", padx=5)
-        self.playlist_var = tk.StringVar(value="list1")
+        names = self.catalogue.names
+        self.playlist_var = tk.StringVar(value="list1" if "list1" in names or not names else names[0])
         self.playlist_dropdown = ttk.Combobox(playlist_frame, textvariable=self.playlist_var, 
-                                            values=["list1", "list2", "More List..."])
+                                            values=names + ["More List..."])
         self.playlist_dropdown.pack(side="left", padx=5)
         self.playlist_dropdown.bind("<<ComboboxSelected>>", self.handle_playlist_selection)
 
@@ -41,7 +54,7 @@ class TrackList:
 
         # All tracks tree
         ttk.Label(content_frame, text="All Tracks").grid(row=0, column=0, padx=5)
-        self.all_tree = ttk.Treeview(content_frame, columns=("ID", "Name", "Artist", "Rating", "Plays"), show="headings")
+        self.all_tree = VirtualTreeview(content_frame, columns=("ID", "Name", "Artist", "Rating", "Plays"))
         for col in ("ID", "Name", "Artist", "Rating", "Plays"):
             self.all_tree.heading(col, text=col)
             self.all_tree.column(col, width=100, anchor="center")
@@ -50,8 +63,7 @@ class TrackList:
 
         # Selected tracks tree
         ttk.Label(content_frame, text="Selected Tracks").grid(row=0, column=1, padx=5)
-        self.select_tree = ttk.Treeview(content_frame, columns=("ID", "Name", "Artist", "Rating", "Plays", "Play"), 
-                                      show="headings")
+        self.select_tree = VirtualTreeview(content_frame, columns=("ID", "Name", "Artist", "Rating", "Plays", "Play"))
         for col in ("ID", "Name", "Artist", "Rating", "Plays", "Play"):
             self.select_tree.heading(col, text=col)
             self.select_tree.column(col, width=100, anchor="center")
@@ -64,6 +76,8 @@ class TrackList:
 
         ttk.Button(button_frame, text="▶ Play Selected", command=self.play_selected).pack(side="left", padx=5)
         ttk.Button(button_frame, text="🗑 Remove Selected", command=self.remove_selected).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="▲ Move Up", command=lambda: self.move_selected(-1)).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="▼ Move Down", command=lambda: self.move_selected(1)).pack(side="left", padx=5)
         ttk.Button(button_frame, text="💾 Save Playlist", command=self.save_playlist).pack(side="left", padx=5)
 
         # Configure grid weights
@@ -81,38 +95,63 @@ class TrackList:
             new_list = tk.simpledialog.askstring("New Playlist", "Enter new playlist name:")
             if new_list:
                 self.playlist_var.set(new_list)
-                if new_list not in self.playlist_dropdown['values']:
-                    new_values = list(self.playlist_dropdown['values'])[:-1] + [new_list, "More List..."]
-                    self.playlist_dropdown['values'] = new_values
+            else:
+                self.playlist_var.set(self.playlist_name)  # Cancelled: stay on the current playlist
         self.load_playlist()
+        self.update_dropdown()
 
-    def load_all_tracks(self):
+    def update_dropdown(self):
+        """
+        List the playlists of the catalogue in the dropdown, and the selected one if it has no file yet.
+        """
+        names = self.catalogue.names
+        if self.playlist_name not in names:
+            names = sorted(names + [self.playlist_name])
+        self.playlist_dropdown['values'] = names + ["More List..."]
+
+    def on_catalogue_changed(self, names_changed, changed):
+        """
+        Update the dropdown when playlists were added or deleted, and reload the selected
+        playlist if another program changed its file.
+        """
+        if names_changed:
+            self.update_dropdown()
+        if self.playlist_name in changed:
+            self.playlist = self.catalogue.get(self.playlist_name)
+            self.show_playlist(keep_position=True)
+
+    def load_all_tracks(self, keep_position=False):
         """
         Load all available tracks from the library into the all tracks treeview.
         """
-        self.all_tree.delete(*self.all_tree.get_children())
-        for line in lib.list_all().strip().split("\n"):
-            parts = line.split("\t")
-            if len(parts) == 5:
-                self.all_tree.insert("", "end", values=parts)
+        self.all_tree.set_source(RowSource(lib.get_keys(), lib.get_display_row), keep_position)
 
     def load_playlist(self):
         """
-        Load the selected playlist from file.
+        Load the selected playlist from the catalogue; recently used playlists are not read from file again.
         Displays tracks in the selected tracks treeview.
+        Entries of tracks that are not loaded (yet) are kept and shown with their ID only.
+        """
+        self.autosave.flush()  # Changes still waiting to be saved must be in the file before it is read
+        self.playlist_name = self.playlist_var.get()
+        self.playlist = self.catalogue.get(self.playlist_name)
+        self.show_playlist()
+
+    def show_playlist(self, keep_position=False):
         """
-        self.select_tree.delete(*self.select_tree.get_children())
-        filename = f"{self.playlist_var.get()}.csv"
-        if os.path.exists(filename):
-            with open(filename, "r", encoding="utf-8") as f:
-                reader = csv.reader(f)
-                for row in reader:
-                    if len(row) >= 1 and row[0] in lib.library:
-                        item = lib.library[row[0]]
-                        checked = row[1] if len(row) > 1 else "1"
-                        play_icon = "🎧" if checked == "1" else ""
-                        self.select_tree.insert("", "end", values=(row[0], item.name, item.artist, 
-                                                               "⭐" * item.rating, item.play_count, play_icon))
+        Display the playlist entries in the selected tracks treeview.
+
+        """
+        self.select_tree.set_source(RowSource(self.playlist, self.playlist_row, key=lambda entry: entry[0]),
+                                    keep_position)  # Rows are read from the playlist model as they scroll into view
+
+    def playlist_row(self, entry):
+        """
+        Get the values shown for a playlist entry.
+
+        """
+        key, checked = entry
+        return lib.get_display_row(key) + ("🎧" if checked else "",)
 
     def add_to_playlist(self, event):
         """
@@ -121,26 +160,19 @@ class TrackList:
         
 
         """
-        selected = self.all_tree.selection()
-        for sel in selected:
-            data = self.all_tree.item(sel, "values")
-            track_id = data[0]
-            # Check for duplicates
-            duplicate_found = False
-            for child in self.select_tree.get_children():
-                if self.select_tree.item(child, "values")[0] == track_id:
-                    duplicate_found = True
-                    break
-            
-            if duplicate_found:
-                messagebox.showwarning(
-                    "Duplicate Track",
-                    f"Track '{data[1]}' by '{data[2]}' is already in the playlist."
-                )
-                continue
-                
-            self.select_tree.insert("", "end", values=(track_id, data[1], data[2], data[3], data[4], "🎧"))
-        self.save_playlist()
+        selected = {data[0]: data for data in self.all_tree.selection_values()}
+        duplicates = [selected[key] for key in self.playlist.add(selected)]
+        self.show_playlist(keep_position=True)
+        self.autosave.changed(self.playlist)
+
+        # Warn once for all duplicates instead of once per track
+        if len(duplicates) == 1:
+            messagebox.showwarning(
+                "Duplicate Track",
+                f"Track '{duplicates[0][1]}' by '{duplicates[0][2]}' is already in the playlist."
+            )
+        elif duplicates:
+            messagebox.showwarning("Duplicate Track", f"{len(duplicates)} tracks are already in the playlist.")
 
     def toggle_play_check(self, event):
         """
@@ -152,53 +184,89 @@ class TrackList:
         region = self.select_tree.identify_column(event.x)
         if region != "#6":  # Play column
             return
-        item_id = self.select_tree.identify_row(event.y)
-        if not item_id:
+        index = self.select_tree.index_at(event.y)
+        if index is None:
             return
-        values = list(self.select_tree.item(item_id, "values"))
-        values[5] = "" if values[5] == "🎧" else "🎧"
-        self.select_tree.item(item_id, values=values)
-        self.save_playlist()
+        self.playlist.toggle(index)
+        self.select_tree.refresh()
+        self.autosave.changed(self.playlist)
 
     def save_playlist(self):
         """
         Save the current playlist to a CSV file.
-        Stores track IDs and their play status.
+        Stores track IDs and their play status; small changes are appended to the playlist's log.
+        Other changes are saved automatically shortly after they are made.
         """
-        filename = f"{self.playlist_var.get()}.csv"
-        with open(filename, "w", newline='', encoding="utf-8") as f:
-            writer = csv.writer(f)
-            for child in self.select_tree.get_children():
-                row = self.select_tree.item(child, "values")
-                writer.writerow([row[0], "1" if row[5] == "🎧" else "0"])
+        name = self.playlist_var.get()
+        if name != self.playlist_name:  # A new name was typed in the dropdown: save a copy under it
+            self.playlist = Playlist(self.playlist)
+            self.playlist_name = name
+            self.catalogue.put(name, self.playlist)
+            self.update_dropdown()
+        self.autosave.changed(self.playlist, self.catalogue.path(name))
+        self.autosave.flush()
+
+    def show_save_error(self, error):
+        """
+        Tell the user that saving the playlist failed.
+        """
+        messagebox.showerror("Error", f"Could not save the playlist: {error}")
 
     def play_selected(self):
         """
-        Play all selected tracks in the playlist.
-        Updates play counts for played tracks.
+        Play all checked tracks in the playlist, in order.
+        Play counts are incremented by the player as each track finishes.
         """
-        for child in self.select_tree.get_children():
-            row = self.select_tree.item(child, "values")
-            if row[5] == "🎧":
-                lib.increment_play_count(row[0])
-        self.load_all_tracks()
-        self.load_playlist()
+        if self.player is not None:
+            self.player.play(self.playlist.enabled_keys())
+
+    def on_library_changed(self, changes):
+        """
+        Update both lists after the library changed.
+        Added or removed tracks refresh the track list; changed tracks only update their own rows.
+
+        """
+        if changes.reloaded or changes.added or changes.deleted:
+            self.load_all_tracks(keep_position=not changes.reloaded)
+        if self.playlist.remove(changes.deleted):  # Deleted tracks leave the playlist
+            self.show_playlist(keep_position=True)
+            self.autosave.changed(self.playlist)
+        elif changes.reloaded or changes.added:
+            self.select_tree.refresh()  # Entries of tracks that were not loaded yet get their names
+        self.all_tree.refresh_keys(changes.updated)
+        self.select_tree.refresh_keys(changes.updated)
 
     def remove_selected(self):
         """
         Remove selected tracks from the playlist.
         Updates the playlist file after removal.
         """
-        selected_items = self.select_tree.selection()
-        for item in selected_items:
-            self.select_tree.delete(item)
-        self.save_playlist()
+        self.playlist.remove_at(self.select_tree.selected_indices())
+        self.show_playlist(keep_position=True)
+        self.autosave.changed(self.playlist)
+
+    def move_selected(self, step):
+        """
+        Move the selected tracks of the playlist up or down by one position, keeping them selected.
+        """
+        indices = self.select_tree.selected_indices()
+        if not indices:
+            return
+        moved = self.playlist.move(indices, indices[0] + step)
+        self.show_playlist(keep_position=True)
+        self.select_tree.select_indices(moved)
+        self.autosave.changed(self.playlist)
+
+    def close(self):
+        """
+        Save playlist changes that are still waiting and stop watching the playlist directory.
+        """
+        self.catalogue.stop()
+        self.autosave.close()
 
     def refresh_list(self):
         """
         Refresh the playlist by reloading the library and updating the view.
         """
-        lib.load_library()  # Reload library
-        self.load_all_tracks()  # Update the view
-        self.load_playlist()  # Reload playlist
+        lib.load_library(incremental=True)  # Reload library changes; the lists update from the change events
         messagebox.showinfo("Success", "Playlist refreshed successfully") 
\ No newline at end of file
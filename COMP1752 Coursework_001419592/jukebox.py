@@ -1,17 +1,16 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, font, filedialog
+from tkinter import ttk, messagebox, font
+import queue
+import threading
 import track_library as lib
-import csv
-import os
-from PIL import Image, ImageTk
-import pygame
-import time
-import requests
-import json
-from io import BytesIO
 import view_tracks
 import create_track_list
 import update_tracks
+from play_journal import PlayJournal
+from playback import PlaybackEngine
+
+# Milliseconds between checks for the end of a background library load
+LOAD_POLL_MS = 50
 
 class JukeBox:
     def __init__(self, window):
@@ -19,7 +18,8 @@ class JukeBox:
         Initialize the main JukeBox application.
         
         This class serves as the main controller for the music player application.
-        It sets up the main window, initializes the audio system, and creates the UI components.
+        It sets up the main window and creates the UI components, then loads the library
+        in the background so the window appears without waiting for it.
         
         Args:
             window: The root Tkinter window
@@ -30,9 +30,6 @@ class JukeBox:
         self.window.geometry("1200x700")  # Set window size
         self.window.iconbitmap("spotify.ico")  # Set window icon
 
-        # Initialize pygame mixer for audio playback
-        pygame.mixer.init()
-
         # Setup custom fonts for the application
         self.setup_fonts()
 
@@ -73,18 +70,30 @@ class JukeBox:
                                   command=self.refresh_all)
         self.refresh_btn.pack(side='left', padx=5)
 
+        # Create the audio player; it starts its thread and opens the mixer on the first play
+        self.player = PlaybackEngine(self.window)
+
         # Initialize each module with its corresponding frame
-        self.view_track = view_tracks.ViewTrack(self.view_frame)  # Initialize track viewer
-        self.track_list = create_track_list.TrackList(self.playlist_frame)  # Initialize playlist manager
+        self.view_track = view_tracks.ViewTrack(self.view_frame, self.player)  # Initialize track viewer
+        self.track_list = create_track_list.TrackList(self.playlist_frame, self.player)  # Initialize playlist manager
         self.update_lib = update_tracks.Update(self.update_frame)  # Initialize library updater
 
+        # Deliver library changes to the views in one batch on the next idle tick
+        lib.set_dispatcher(self.window.after_idle)
+
+        # Keep play counts in a journal so they survive reloads, and write it out on exit
+        self.play_journal = PlayJournal("plays.journal")
+        lib.attach_play_journal(self.play_journal)
+        self.window.protocol("WM_DELETE_WINDOW", self.on_close)
+
         # Show the initial frame (View Tracks)
         self.show_frame(self.view_frame)
 
-        # Load initial data
-        lib.load_library()  # Load music library from CSV
-        self.load_all_tracks()  # Load all tracks into the player
-        self.load_playlist()  # Load playlist data
+        # Load the music library once, off the Tk thread, into a library of its own; it is
+        # swapped in on the Tk thread when complete and the views fill in from the reload event
+        self.loading = False  # Whether a background load is running
+        self._loaded = queue.Queue()  # Loaded library or error, handed from the load thread to the Tk thread
+        self.start_loading()
 
     def setup_fonts(self):
         """
@@ -132,33 +141,66 @@ class JukeBox:
         current_index = all_frames.index(frame)
         all_buttons[current_index].state(['pressed'])
 
-    def load_all_tracks(self):
+    def start_loading(self):
+        """
+        Start loading the music library on a background thread, unless a load is running.
+        Refresh is disabled until the load has finished.
         """
-        Load all tracks from the library into the track list.
-        This is called during initialization and when refreshing the library.
+        if self.loading:
+            return
+        self.loading = True
+        self.refresh_btn.state(['disabled'])
+        path = lib.default_library().path
+        threading.Thread(target=self.load_library, args=(path,), name="load-library", daemon=True).start()
+        self.window.after(LOAD_POLL_MS, self.check_loaded)
+
+    def load_library(self, path):
         """
-        self.track_list.load_all_tracks()
+        Load the music library from CSV into a new TrackLibrary. Runs on a background thread,
+        so it never touches the library the views are reading; never calls Tk either.
+        """
+        try:
+            self._loaded.put(lib.open_library(path))
+        except FileNotFoundError as e:
+            self._loaded.put(e)
 
-    def load_playlist(self):
+    def check_loaded(self):
         """
-        Load the current playlist from file.
-        This is called during initialization and when refreshing the library.
+        Swap in the loaded library once the background load has finished, or check again later.
+        Runs on the Tk thread.
         """
-        self.track_list.load_playlist()
+        try:
+            loaded = self._loaded.get_nowait()
+        except queue.Empty:
+            self.window.after(LOAD_POLL_MS, self.check_loaded)
+            return
+        self.loading = False
+        self.refresh_btn.state(['!disabled'])
+        if isinstance(loaded, Exception):
+            messagebox.showerror("Error", str(loaded))
+        else:
+            lib.adopt(loaded)
 
     def refresh_all(self):
         """
         Refresh all data in the application.
-        Reloads library and updates all views.
+        Reloads library changes; the views update themselves from the library's change events.
+        Does nothing while the library is still loading.
         """
-        # Reload library
-        lib.load_library()
-        
-        # Update views
-        self.view_track.list_tracks_clicked()  # Update view tracks
-        self.track_list.load_all_tracks()      # Update playlist all tracks
-        self.track_list.load_playlist()        # Update playlist selected tracks
-        self.update_lib.load_data()            # Update library data
+        if self.loading:
+            return
+        # Reload library, parsing only rows appended since the last load
+        lib.load_library(incremental=True)
+
+    def on_close(self):
+        """
+        Stop playing, save playlist changes and pending plays, and close the application.
+        """
+        self.player.close()
+        self.track_list.close()  # Saves playlist changes made in the last moment
+        self.play_journal.close()
+        self.view_track.thumbnail_loader.close()
+        self.window.destroy()
 
 if __name__ == "__main__":
     """
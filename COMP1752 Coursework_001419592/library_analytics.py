@@ -0,0 +1,198 @@
+# Import necessary libraries for reporting on ratings and play counts
+import sys  # For the report's command line arguments
+import numpy as np  # For the vectorised aggregates; only this module and its users need NumPy
+import track_library as lib  # For the library and its change events
+
+# Reports over a TrackLibrary computed with NumPy instead of looping over LibraryItems.
+# The tracks are exported once into parallel arrays (one row per track):
+#   ratings       uint8,  0-5 stars
+#   plays         uint32, play counts
+#   artist_codes  int32,  index into the artists list (a categorical column)
+# Later library changes only patch the rows of the changed tracks.
+
+# Percentiles of the play counts in the nightly report
+PERCENTILES = (50, 90, 99)
+
+
+class LibraryAnalytics:
+    """
+    Rating histograms, per-artist average ratings and play count percentiles of a TrackLibrary.
+    Changes are collected from the library's change events and applied to the arrays on the
+    next report, so a report after a few edits costs a few row updates plus the aggregate.
+    Must be used on the thread that receives the library's change events.
+    """
+    def __init__(self, library=None):
+        """
+        Create the analytics and start following the library's changes.
+
+        Args:
+            library: TrackLibrary to report on; the default library if None
+        """
+        self.library = library if library is not None else lib.default_library()
+        self.keys = []  # Track key of each row
+        self.row_of = {}  # Track key -> row
+        self.artists = []  # Artist of each artist code
+        self.artist_code = {}  # Artist -> artist code
+        self.ratings = np.zeros(0, dtype=np.uint8)
+        self.plays = np.zeros(0, dtype=np.uint32)
+        self.artist_codes = np.zeros(0, dtype=np.int32)
+        self._stale = True  # Whether the arrays must be exported again
+        self._dirty = set()  # Keys of tracks added, changed or removed since the last refresh
+        self.library.subscribe(self.on_library_changed)
+
+    def close(self):
+        """
+        Stop following the library's changes.
+
+        """
+        self.library.unsubscribe(self.on_library_changed)
+
+    def on_library_changed(self, changes):
+        """
+        Remember which tracks changed; the arrays are updated on the next report.
+
+        """
+        if changes.reloaded:
+            self._stale = True
+            self._dirty.clear()
+        elif not self._stale:
+            self._dirty.update(changes.added, changes.updated, changes.deleted)
+
+    def _code(self, artist):
+        """
+        Get the artist code of an artist, adding it to the categories if it is new.
+
+        """
+        code = self.artist_code.get(artist)
+        if code is None:
+            code = self.artist_code[artist] = len(self.artists)
+            self.artists.append(artist)
+        return code
+
+    def export(self):
+        """
+        Export all tracks into the arrays.
+
+        """
+        tracks = self.library.library
+        count = len(tracks)
+        self.keys = list(tracks)
+        self.row_of = {key: row for row, key in enumerate(self.keys)}
+        self.artists, self.artist_code = [], {}
+        items = list(tracks.values())
+        self.ratings = np.fromiter((item.rating for item in items), dtype=np.uint8, count=count)
+        self.plays = np.fromiter((item.play_count for item in items), dtype=np.uint32, count=count)
+        self.artist_codes = np.fromiter((self._code(item.artist) for item in items), dtype=np.int32, count=count)
+        self._stale = False
+        self._dirty.clear()
+
+    def refresh(self):
+        """
+        Bring the arrays up to date with the library.
+        Changed tracks are updated in place, new tracks appended and removed tracks replaced by the last row.
+
+        """
+        if self._stale:
+            self.export()
+            return
+        if not self._dirty:
+            return
+        tracks = self.library.library
+        dirty, self._dirty = self._dirty, set()
+        removed = [key for key in dirty if key in self.row_of and key not in tracks]
+        for key in removed:
+            self._remove_row(key)
+        added = [key for key in dirty if key in tracks and key not in self.row_of]
+        if added:
+            start = len(self.keys)
+            self.keys.extend(added)
+            self.row_of.update((key, row) for row, key in enumerate(added, start))
+            self.ratings = np.concatenate((self.ratings, np.zeros(len(added), dtype=np.uint8)))
+            self.plays = np.concatenate((self.plays, np.zeros(len(added), dtype=np.uint32)))
+            self.artist_codes = np.concatenate((self.artist_codes, np.zeros(len(added), dtype=np.int32)))
+        for key in dirty:
+            item = tracks.get(key)
+            if item is not None:
+                row = self.row_of[key]
+                self.ratings[row] = item.rating
+                self.plays[row] = item.play_count
+                self.artist_codes[row] = self._code(item.artist)
+
+    def _remove_row(self, key):
+        """
+        Remove a track's row by moving the last row into its place.
+
+        """
+        row = self.row_of.pop(key)
+        last_key = self.keys.pop()
+        if last_key != key:
+            last = len(self.keys)
+            self.keys[row] = last_key
+            self.row_of[last_key] = row
+            self.ratings[row] = self.ratings[last]
+            self.plays[row] = self.plays[last]
+            self.artist_codes[row] = self.artist_codes[last]
+        count = len(self.keys)
+        self.ratings = self.ratings[:count]
+        self.plays = self.plays[:count]
+        self.artist_codes = self.artist_codes[:count]
+
+    def rating_histogram(self):
+        """
+        Get the number of tracks with each rating, as an array indexed by stars (0-5).
+
+        """
+        self.refresh()
+        return np.bincount(self.ratings, minlength=6)
+
+    def artist_average_ratings(self):
+        """
+        Get {artist: average rating} for every artist with at least one track.
+
+        """
+        self.refresh()
+        counts = np.bincount(self.artist_codes, minlength=len(self.artists))
+        totals = np.bincount(self.artist_codes, weights=self.ratings, minlength=len(self.artists))
+        present = np.flatnonzero(counts)
+        averages = totals[present] / counts[present]
+        return dict(zip((self.artists[code] for code in present), averages.tolist()))
+
+    def play_count_percentiles(self, percentiles=PERCENTILES):
+        """
+        Get {percentile: play count} for the given percentiles, e.g. {50: 3.0, 90: 41.0, 99: 310.0}.
+        All values are 0 for an empty library.
+
+        """
+        self.refresh()
+        if not len(self.plays):
+            return {percentile: 0.0 for percentile in percentiles}
+        values = np.percentile(self.plays, percentiles)
+        return dict(zip(percentiles, values.tolist()))
+
+
+def main():
+    """
+    Print the nightly report from the command line.
+    Usage: python library_analytics.py [music.csv] [plays.journal]
+
+    """
+    path = sys.argv[1] if len(sys.argv) > 1 else "music.csv"
+    with lib.open_library(path) as library:
+        if len(sys.argv) > 2:
+            from play_journal import PlayJournal
+            journal = PlayJournal(sys.argv[2])
+            library.attach_play_journal(journal)
+            journal.close()
+        analytics = LibraryAnalytics(library)
+        print("Ratings:")
+        for stars, count in enumerate(analytics.rating_histogram().tolist()):
+            print(f"  {lib.STARS[stars] or '-':10} {count}")
+        print("Average rating by artist:")
+        for artist, average in sorted(analytics.artist_average_ratings().items()):
+            print(f"  {artist:30} {average:.2f}")
+        print("Play count percentiles:")
+        for percentile, plays in analytics.play_count_percentiles().items():
+            print(f"  p{percentile:<3} {plays:.0f}")
+
+if __name__ == "__main__":
+    main()
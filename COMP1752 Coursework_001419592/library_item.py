@@ -1,6 +1,3 @@
-# Import necessary libraries
-import csv
-
 class LibraryItem:
     """
     Represents a single track in the music library.
@@ -33,27 +30,58 @@ class LibraryItem:
         Ensures rating is between 0 and 5.
         
         """
-        try:
-            value = int(value)
-            if value < 0:
-                self._rating = 0
-            elif value > 5:
-                self._rating = 5
-            else:
-                self._rating = value
-        except (TypeError, ValueError):
-            self._rating = 0  # Default to 0 for invalid inputs
-
-# Initialize library list
-library = []
-
-# Load initial data from music.csv
-try:
-    with open("music.csv", "r", encoding="utf-8") as file:
-        reader = csv.reader(file)
-        next(reader)  # Skip header row
-        for row in reader:
-            name, artist, rating = row
-            library.append(LibraryItem(name, artist, rating))
-except FileNotFoundError:
-    print("File music.csv does not exist!")
+        self._rating = clamp_rating(value)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Create tracks in bulk from (name, artist, rating) rows, e.g. rows of music.csv.
+        Ratings are validated and clamped in the same pass without going through the
+        rating property for every track, which makes loading large libraries faster.
+
+        """
+        new_item = cls.__new__
+        known_rating = _RATING_VALUES.get
+        items = []
+        for name, artist, rating in rows:
+            item = new_item(cls)
+            item.name = name
+            item.artist = artist
+            value = known_rating(rating)
+            item._rating = clamp_rating(rating) if value is None else value
+            item.play_count = 0
+            items.append(item)
+        return items
+
+class SlottedLibraryItem:
+    """
+    Memory-saving variant of LibraryItem for large libraries.
+    It has the same fields and rating validation, but stores them in slots instead of a per-instance dictionary.
+    """
+    __slots__ = ("name", "artist", "_rating", "play_count")
+
+    # Share the constructor, rating validation and bulk constructor with LibraryItem
+    __init__ = LibraryItem.__init__
+    rating = LibraryItem.rating
+    from_rows = LibraryItem.__dict__["from_rows"]
+
+def clamp_rating(value):
+    """
+    Convert a value to a valid rating between 0 and 5.
+    Invalid inputs become 0.
+
+    """
+    try:
+        value = int(value)
+        if value < 0:
+            return 0
+        elif value > 5:
+            return 5
+        else:
+            return value
+    except (TypeError, ValueError):
+        return 0  # Default to 0 for invalid inputs
+
+# Ratings as they appear in music.csv, mapped to their validated value without calling int()
+_RATING_VALUES = {str(value): clamp_rating(value) for value in range(-1, 7)}
+_RATING_VALUES.update({value: clamp_rating(value) for value in range(-1, 7)})
@@ -0,0 +1,391 @@
+# Import necessary libraries for querying the music library without the GUI
+import bisect  # For finding and updating positions in the sort orders
+import heapq  # For top-N queries without sorting every track
+import sys  # For the report's command line arguments
+import track_library as lib  # For the library and its change events
+from track_library import key_order  # For ordering tracks by ID
+
+# Queries over a TrackLibrary, shared by the GUI and batch scripts.
+#   query = LibraryQuery(library)
+#   query.select(rating_between(4, 5) & plays_at_least(10), order_by=("-rating", "name"), limit=20)
+#   query.top(10, by="play_count")
+#   query.group_by_artist()
+# Sort orders for the fields used in queries are built on first use and kept up to date
+# from the library's change events, so sorting and range filters do not re-sort the library.
+
+# Sort value of each field, from a track's key and LibraryItem
+FIELDS = {
+    "id": lambda key, item: key_order(key),
+    "name": lambda key, item: item.name.lower(),
+    "artist": lambda key, item: item.artist.lower(),
+    "rating": lambda key, item: item.rating,
+    "play_count": lambda key, item: item.play_count,
+}
+
+# Marks a track that is not in a sort order yet
+_MISSING = object()
+
+
+class Filter:
+    """
+    Condition on tracks, called with a LibraryItem.
+    Filters combine with & (and), | (or) and ~ (not). Filters that accept a range of one
+    field's sort values remember the range, so queries can look up the matching tracks
+    in that field's sort order instead of testing every track.
+    """
+    def __init__(self, test, field=None, low=None, high=None, ranges=None):
+        """
+        Create a filter.
+
+        Args:
+            test: Function of a LibraryItem that returns whether the track matches
+            field: Field whose sort values between low and high (inclusive, None for open) are exactly the matches
+            ranges: (field, low, high) ranges that every match lies in, for combined filters
+        """
+        self.test = test
+        self.ranges = [(field, low, high)] if field is not None else list(ranges or ())
+
+    def __call__(self, item):
+        return self.test(item)
+
+    def __and__(self, other):
+        first, second = self.test, other.test
+        return Filter(lambda item: first(item) and second(item), ranges=self.ranges + other.ranges)
+
+    def __or__(self, other):
+        first, second = self.test, other.test
+        return Filter(lambda item: first(item) or second(item))
+
+    def __invert__(self):
+        test = self.test
+        return Filter(lambda item: not test(item))
+
+def rating_between(low=0, high=5):
+    """
+    Match tracks rated from low to high stars, inclusive.
+
+    """
+    return Filter(lambda item: low <= item.rating <= high, "rating", low, high)
+
+def artist_is(artist):
+    """
+    Match tracks by an artist, ignoring case.
+
+    """
+    artist = artist.lower()
+    return Filter(lambda item: item.artist.lower() == artist, "artist", artist, artist)
+
+def plays_at_least(count):
+    """
+    Match tracks played at least count times.
+
+    """
+    return Filter(lambda item: item.play_count >= count, "play_count", count, None)
+
+def plays_at_most(count):
+    """
+    Match tracks played at most count times.
+
+    """
+    return Filter(lambda item: item.play_count <= count, "play_count", None, count)
+
+
+class SortOrder:
+    """
+    Keys of all tracks sorted by one field, ties in ID order.
+    Keeps each track's sort value so a changed track can be found and moved with a
+    binary search instead of re-sorting.
+    """
+    def __init__(self, field, tracks):
+        """
+        Sort the tracks of a library dictionary by a field.
+
+        """
+        self.value_of = FIELDS[field]
+        self.values = {key: self.value_of(key, item) for key, item in tracks.items()}  # Key -> sort value
+        self.keys = sorted(self.values, key=key_order)
+        self.keys.sort(key=self.values.__getitem__)  # Stable, so ties stay in ID order
+
+    def _sort_key(self, key):
+        return self.values[key], key_order(key)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def update(self, key, item):
+        """
+        Insert a track, or move it if its sort value changed.
+
+        """
+        value = self.value_of(key, item)
+        old = self.values.get(key, _MISSING)
+        if old == value:
+            return
+        if old is not _MISSING:
+            self.remove(key)
+        self.values[key] = value
+        bisect.insort(self.keys, key, key=self._sort_key)
+
+    def remove(self, key):
+        """
+        Remove a track, if it is in the order.
+
+        """
+        if key in self.values:
+            del self.keys[bisect.bisect_left(self.keys, self._sort_key(key), key=self._sort_key)]
+            del self.values[key]
+
+    def range(self, low=None, high=None):
+        """
+        Get the (start, stop) positions of the tracks whose sort values are between low and high, inclusive.
+
+        """
+        start = 0 if low is None else bisect.bisect_left(self.keys, low, key=self.values.__getitem__)
+        stop = len(self.keys) if high is None else bisect.bisect_right(self.keys, high, key=self.values.__getitem__)
+        return start, max(start, stop)
+
+
+def parse_order(order_by):
+    """
+    Turn "field" / "-field" names into (field, descending) pairs, e.g. ("-rating", "name").
+
+    """
+    if isinstance(order_by, str):
+        order_by = (order_by,)
+    order = []
+    for name in order_by:
+        field = name.lstrip("-")
+        if field not in FIELDS:
+            raise ValueError(f"Unknown field: {field}")
+        order.append((field, name.startswith("-")))
+    return order
+
+
+class LibraryQuery:
+    """
+    Filter, sort, top-N and group-by queries over a TrackLibrary.
+    Queries return track keys. Must be used on the thread that receives the library's
+    change events, i.e. the Tk thread in the application.
+    """
+    # Batches that change more than this share of a sort order drop it to be rebuilt on next use
+    REBUILD_FRACTION = 0.125
+
+    def __init__(self, library=None):
+        """
+        Create a query engine and start following the library's changes.
+
+        Args:
+            library: TrackLibrary to query; the default library if None
+        """
+        self.library = library if library is not None else lib.default_library()
+        self._orders = {}  # Field -> SortOrder, built on first use
+        self.library.subscribe(self.on_library_changed)
+
+    def close(self):
+        """
+        Stop following the library's changes and drop the sort orders.
+
+        """
+        self.library.unsubscribe(self.on_library_changed)
+        self._orders.clear()
+
+    def sort_order(self, field):
+        """
+        Get the sort order of a field, building it on first use.
+
+        """
+        order = self._orders.get(field)
+        if order is None:
+            order = self._orders[field] = SortOrder(field, self.library.library)
+        return order
+
+    def on_library_changed(self, changes):
+        """
+        Update the sort orders for a batch of library changes.
+
+        """
+        if changes.reloaded:
+            self._orders.clear()
+            return
+        count = len(changes.added) + len(changes.updated) + len(changes.deleted)
+        tracks = self.library.library
+        for field, order in list(self._orders.items()):
+            if count > len(order) * self.REBUILD_FRACTION + 64:
+                del self._orders[field]  # Cheaper to sort again than to move every track
+                continue
+            for key in changes.deleted:
+                order.remove(key)
+            for key in changes.added | changes.updated:
+                item = tracks.get(key)
+                if item is None:
+                    order.remove(key)
+                else:
+                    order.update(key, item)
+
+    def _candidates(self, where):
+        """
+        Get (field, start, stop) of the narrowest range that contains all matches of a filter, or None.
+
+        """
+        best = None
+        for field, low, high in (where.ranges if where is not None else ()):
+            start, stop = self.sort_order(field).range(low, high)
+            if best is None or stop - start < best[2] - best[1]:
+                best = (field, start, stop)
+        return best
+
+    def _sort(self, keys, order):
+        """
+        Sort keys in place by (field, descending) pairs, ties in ID order.
+
+        """
+        tracks = self.library.library
+        keys.sort(key=key_order)
+        for field, descending in reversed(order):
+            value_of = FIELDS[field]
+            keys.sort(key=lambda key: value_of(key, tracks[key]), reverse=descending)
+
+    def sort(self, keys, order_by):
+        """
+        Get track keys, e.g. search results, sorted like select sorts them.
+
+        """
+        keys = [key for key in keys if key in self.library.library]
+        self._sort(keys, parse_order(order_by))
+        return keys
+
+    def select(self, where=None, order_by=(), offset=0, limit=None):
+        """
+        Get the keys of the tracks that match a filter, sorted by one or more fields.
+        order_by names fields from FIELDS, with "-" for descending, e.g. ("-rating", "name");
+        without it the tracks are in ID order. Ties are in ID order.
+        When the first field or the filter has a sort order, only the tracks needed for the
+        requested page are sorted.
+
+        """
+        order = parse_order(order_by) or [("id", False)]
+        stop = None if limit is None else offset + limit
+        tracks = self.library.library
+        test = where.test if where is not None else None
+        candidates = self._candidates(where)
+        primary, descending = order[0]
+
+        if candidates is not None and candidates[0] != primary:
+            # The filter's range is the smallest set to look at: sort just its matches
+            field, start, end = candidates
+            keys = [key for key in self.sort_order(field).keys[start:end] if test(tracks[key])]
+            self._sort(keys, order)
+            return keys[offset:stop]
+
+        # Walk the first field's sort order, sorting only groups of tied tracks by the other fields
+        sort_order = self.sort_order(primary)
+        start, end = (0, len(sort_order)) if candidates is None else candidates[1:]
+        keys, values = sort_order.keys, sort_order.values
+        positions = range(end - 1, start - 1, -1) if descending else range(start, end)
+        result, group, group_value = [], [], _MISSING
+        for position in positions:
+            key = keys[position]
+            if stop is not None and len(result) >= stop:
+                break
+            if values[key] != group_value:
+                self._flush_group(result, group, order)
+                group, group_value = [], values[key]
+            if test is None or test(tracks[key]):
+                group.append(key)
+        self._flush_group(result, group, order)
+        return result[offset:stop]
+
+    def _flush_group(self, result, group, order):
+        """
+        Sort a group of tracks that tie on the first field and add it to the result.
+
+        """
+        if len(group) > 1:
+            self._sort(group, order[1:])
+        result.extend(group)
+
+    def top(self, count, by="play_count", where=None):
+        """
+        Get the keys of the count tracks with the highest value of a field, e.g. the most played
+        or best rated, highest first. Uses a heap, so only count tracks are ever kept in order.
+        Ties are in library order.
+
+        """
+        value_of = FIELDS[by]
+        tracks = self.library.library
+        candidates = self._candidates(where)
+        if candidates is not None:
+            field, start, stop = candidates
+            keys = self.sort_order(field).keys[start:stop]
+        else:
+            keys = tracks.keys()
+        if where is not None:
+            keys = (key for key in keys if where.test(tracks[key]))
+        return heapq.nlargest(count, keys, key=lambda key: value_of(key, tracks[key]))
+
+    def group_by_artist(self, where=None):
+        """
+        Get {artist: ArtistStats} for the tracks that match a filter, in order of first appearance.
+
+        """
+        groups = {}
+        tracks = self.library.library
+        for key, item in tracks.items():
+            if where is None or where.test(item):
+                stats = groups.get(item.artist)
+                if stats is None:
+                    stats = groups[item.artist] = ArtistStats()
+                stats.tracks += 1
+                stats.plays += item.play_count
+                stats.rating_total += item.rating
+        return groups
+
+
+class ArtistStats:
+    """
+    Totals of one artist's tracks.
+    """
+    __slots__ = ("tracks", "plays", "rating_total")
+
+    def __init__(self):
+        self.tracks = 0  # Number of tracks
+        self.plays = 0  # Plays of all tracks
+        self.rating_total = 0  # Sum of the ratings
+
+    @property
+    def average_rating(self):
+        """
+        Get the average rating of the artist's tracks.
+
+        """
+        return self.rating_total / self.tracks if self.tracks else 0.0
+
+    def __repr__(self):
+        return f"ArtistStats(tracks={self.tracks}, plays={self.plays}, average_rating={self.average_rating:.2f})"
+
+
+def main():
+    """
+    Print a report of the library from the command line: the most played and best rated
+    tracks and the artists with the most plays.
+    Usage: python library_query.py [music.csv] [count]
+
+    """
+    path = sys.argv[1] if len(sys.argv) > 1 else "music.csv"
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    with lib.open_library(path) as library:
+        query = LibraryQuery(library)
+        print("Most played:")
+        for key in query.top(count, by="play_count"):
+            print(f"  {key}\t{library.get_name(key)}\t{library.get_artist(key)}\t{library.get_play_count(key)}")
+        print("Best rated:")
+        for key in query.select(order_by=("-rating", "-play_count", "name"), limit=count):
+            print(f"  {key}\t{library.get_name(key)}\t{library.get_artist(key)}\t{lib.STARS[library.get_rating(key)]}")
+        print("Artists:")
+        artists = query.group_by_artist()
+        for artist in heapq.nlargest(count, artists, key=lambda artist: artists[artist].plays):
+            stats = artists[artist]
+            print(f"  {artist}\t{stats.tracks} tracks\t{stats.plays} plays\t{stats.average_rating:.1f} average rating")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# Import necessary libraries for the play count journal
+import os  # For fsync and atomic replacement of the journal file
+import threading  # For writing the journal in the background
+from collections import Counter  # For adding up play counts
+
+
+class PlayJournal:
+    """
+    Write-behind journal of track plays, so play counts survive reloading the library.
+    Plays are buffered in memory and appended to the journal file by a background
+    thread, which fsyncs it at a configurable interval. Each line holds a track key and
+    a number of plays; once the file has grown by enough lines it is compacted into one
+    line per track. music.csv is never rewritten for plays.
+    """
+    def __init__(self, path="plays.journal", fsync_interval=1.0, compact_after=10000):
+        """
+        Open the journal, reading the play counts it already holds.
+
+        Args:
+            path: Path of the journal file
+            fsync_interval: Seconds between background writes to disk
+            compact_after: Number of lines appended since the last compaction that trigger a new one
+        """
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.compact_after = compact_after
+        self.totals = Counter()  # Track key -> total plays, including buffered ones
+        self.lines = 0  # Lines in the journal file
+        self._buffer = Counter()  # Plays not yet written to the file
+        self._buffer_lock = threading.Lock()  # Guards the buffer and totals; never held during I/O
+        self._file_lock = threading.Lock()  # Serialises writes and compaction
+        self._stop = threading.Event()
+        self._torn_line = False  # Whether the file ends in a line cut short by a crash
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                for line in file:
+                    self._read_line(line, self.totals)
+                    self.lines += 1
+                    self._torn_line = not line.endswith("\n")
+        self.compacted_lines = len(self.totals)  # Lines the file would have after compaction
+
+        self._thread = threading.Thread(target=self._run, name="play-journal", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _read_line(line, counts):
+        """
+        Add the plays of one journal line to counts. Malformed lines, e.g. a line
+        cut short by a crash, are skipped.
+
+        """
+        key, _, plays = line.rstrip("\n").rpartition(",")
+        if key and plays.isdigit():
+            counts[key] += int(plays)
+
+    def record(self, keys):
+        """
+        Record one play of each track key. Returns without doing any I/O.
+
+        """
+        with self._buffer_lock:
+            for key in keys:
+                self._buffer[key] += 1
+                self.totals[key] += 1
+
+    def play_count(self, key):
+        """
+        Get the total plays recorded for a track.
+
+        """
+        with self._buffer_lock:
+            return self.totals.get(key, 0)
+
+    def flush(self):
+        """
+        Append the buffered plays to the journal file and fsync it.
+
+        """
+        with self._file_lock:
+            with self._buffer_lock:
+                buffered, self._buffer = self._buffer, Counter()
+            if not buffered:
+                return
+            with open(self.path, "a", encoding="utf-8") as file:
+                if self._torn_line:
+                    file.write("\n")  # Keep the new lines separate from the torn one
+                    self._torn_line = False
+                file.writelines(f"{key},{plays}\n" for key, plays in buffered.items())
+                file.flush()
+                os.fsync(file.fileno())
+            self.lines += len(buffered)
+
+    def compact(self):
+        """
+        Rewrite the journal with one line per track.
+        The new file is written and fsynced next to the old one and then swapped in,
+        so a crash leaves either the old or the new journal.
+
+        """
+        self.flush()
+        with self._file_lock:
+            counts = Counter()
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as file:
+                    for line in file:
+                        self._read_line(line, counts)
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as file:
+                file.writelines(f"{key},{plays}\n" for key, plays in counts.items())
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.path)
+            self._torn_line = False
+            self.lines = self.compacted_lines = len(counts)
+
+    def _run(self):
+        """
+        Background loop that writes the buffer every fsync_interval seconds and
+        compacts the journal when it has grown enough.
+
+        """
+        while not self._stop.wait(self.fsync_interval):
+            self.flush()
+            if self.lines - self.compacted_lines >= self.compact_after:
+                self.compact()
+
+    def close(self):
+        """
+        Stop the background thread and write any buffered plays.
+
+        """
+        self._stop.set()
+        self._thread.join()
+        self.flush()
@@ -0,0 +1,401 @@
+# Import necessary libraries for playing the audio files of tracks
+import os  # For finding the audio file of a track
+import queue  # For sending commands to the playback thread
+import threading  # For the playback thread
+from collections import deque  # For the queue of tracks to play
+import track_library as lib  # For counting completed plays
+
+# Audio file extensions that are looked for, in order of preference
+AUDIO_EXTENSIONS = (".ogg", ".mp3", ".wav", ".flac")
+
+# Seconds between checks of the mixer's position while a track is playing
+POLL_INTERVAL = 0.1
+
+# Milliseconds between deliveries of the playback thread's reports on the Tk thread
+DELIVERY_INTERVAL_MS = 50
+
+def find_audio(key, audio_dir="audio"):
+    """
+    Get the path of the audio file of a track, e.g. "audio/01.ogg", or None if it has none.
+    Audio files are named after the track key, like the artwork in images/.
+
+    """
+    for extension in AUDIO_EXTENSIONS:
+        path = os.path.join(audio_dir, key + extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+class PygameOutput:
+    """
+    Audio output through pygame.mixer.music, which decodes the file and streams it to the
+    sound card on SDL's audio thread. pygame is imported when the output is created,
+    so it stays out of the application's startup.
+    Created and used only on the playback thread.
+    """
+    def __init__(self):
+        """
+        Import pygame and open the mixer.
+
+        """
+        import pygame
+        pygame.mixer.init()
+        self.mixer = pygame.mixer
+        self.music = pygame.mixer.music
+        self.start = 0.0  # Position in seconds that the current play started from
+
+    def play(self, path, start=0.0):
+        """
+        Start playing a file from a position in seconds.
+
+        """
+        self.music.load(path)
+        self.music.play(start=start)
+        self.start = start
+
+    def seek(self, seconds):
+        """
+        Continue the current file from a position in seconds.
+
+        """
+        self.music.play(start=seconds)
+        self.start = seconds
+
+    def pause(self):
+        self.music.pause()
+
+    def resume(self):
+        self.music.unpause()
+
+    def stop(self):
+        self.music.stop()
+
+    def position(self):
+        """
+        Get the position in the current file in seconds.
+
+        """
+        return self.start + max(0, self.music.get_pos()) / 1000  # get_pos counts from the last play()
+
+    def busy(self):
+        """
+        Check whether the file is still playing; False once it has played to the end.
+
+        """
+        return self.music.get_busy()
+
+    def close(self):
+        self.mixer.quit()
+
+
+class PlaybackEngine:
+    """
+    Plays tracks one after another on a dedicated playback thread.
+    The Tk thread only sends commands (play, pause, seek, ...) and never touches the mixer;
+    the playback thread polls the mixer and reports the state and position to subscribers,
+    on the Tk thread when a widget is given. The playback thread never calls Tk: it queues
+    its reports, and the Tk thread delivers them from an after() poll, so close() can wait
+    for the thread while the main loop is busy. A track's play count is incremented only when
+    it has played to the end, not when it is started, skipped or stopped.
+    The thread and the audio output are started with the first command.
+    """
+    def __init__(self, widget=None, library=None, audio_dir="audio", output=PygameOutput,
+                 poll_interval=POLL_INTERVAL):
+        """
+        Create a stopped engine.
+
+        Args:
+            widget: Any Tk widget, used to run callbacks on the Tk thread; without one they run on the playback thread
+            library: TrackLibrary whose play counts are incremented; the default library if None
+            audio_dir: Directory of the audio files, named after the track keys
+            output: Function that creates the audio output, called on the playback thread
+            poll_interval: Seconds between position reports while playing
+        """
+        self.widget = widget
+        self.library = library if library is not None else lib.default_library()
+        self.audio_dir = audio_dir
+        self.output_factory = output
+        self.poll_interval = poll_interval
+        self._commands = queue.Queue()
+        self._thread = None
+        self._deliveries = queue.Queue()  # (function, args) to call on the Tk thread
+        self._delivery_id = None  # Timer of the next delivery poll
+        self._subscribers = []
+
+        # Written only by the playback thread
+        self.state = "stopped"  # "stopped", "playing", "paused" or "error"
+        self.key = None  # Key of the current track
+        self.position = 0.0  # Position in the current track in seconds
+        self.queue = deque()  # Keys of the tracks to play after the current one
+        self.error = None  # Why the audio output could not be opened
+        self.completed = 0  # Tracks played to the end
+
+    def subscribe(self, callback):
+        """
+        Register a function called with (state, key, position) whenever a track starts,
+        pauses, resumes, seeks or ends, and every poll_interval while playing.
+        The state "missing" reports a track that has no audio file and was skipped.
+
+        """
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """
+        Stop calling a function registered with subscribe.
+
+        """
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def play(self, keys):
+        """
+        Play tracks in order, replacing the current track and queue.
+
+        """
+        self._send("play", list(keys))
+
+    def enqueue(self, keys):
+        """
+        Add tracks to the end of the queue; playing starts if nothing is playing.
+
+        """
+        self._send("enqueue", list(keys))
+
+    def pause(self):
+        self._send("pause")
+
+    def resume(self):
+        self._send("resume")
+
+    def toggle_pause(self):
+        """
+        Pause when playing and resume when paused.
+
+        """
+        self._send("toggle_pause")
+
+    def seek(self, seconds, relative=False):
+        """
+        Move to a position in the current track, in seconds from its start or, with
+        relative=True, from the current position.
+
+        """
+        self._send("seek", seconds, relative)
+
+    def skip(self):
+        """
+        Stop the current track without counting a play and start the next one.
+
+        """
+        self._send("skip")
+
+    def stop(self):
+        """
+        Stop playing and clear the queue.
+
+        """
+        self._send("stop")
+
+    def wait(self, timeout=None):
+        """
+        Wait until the commands sent so far have been carried out. Returns False on timeout.
+
+        """
+        done = threading.Event()
+        self._send("sync", done)
+        return done.wait(timeout)
+
+    def close(self):
+        """
+        Stop playing, close the audio output and end the playback thread.
+        Reports still queued, e.g. a play count, are delivered before it returns.
+
+        """
+        if self._thread is not None:
+            self._commands.put(("close", ()))
+            self._thread.join()
+            self._thread = None
+        if self._delivery_id is not None:
+            self.widget.after_cancel(self._delivery_id)
+            self._delivery_id = None
+        self.deliver_reports()
+
+    def _send(self, command, *args):
+        """
+        Queue a command for the playback thread, starting the thread on first use.
+
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="playback", daemon=True)
+            self._thread.start()
+            if self.widget is not None:
+                self._delivery_id = self.widget.after(DELIVERY_INTERVAL_MS, self._poll_deliveries)
+        self._commands.put((command, args))
+
+    def _poll_deliveries(self):
+        """
+        Deliver the queued reports and poll again. Runs on the Tk thread.
+
+        """
+        self._delivery_id = None
+        self.deliver_reports()
+        if self._thread is not None:
+            self._delivery_id = self.widget.after(DELIVERY_INTERVAL_MS, self._poll_deliveries)
+
+    def deliver_reports(self):
+        """
+        Call the functions queued by the playback thread. Must be called on the Tk thread.
+
+        """
+        while True:
+            try:
+                function, args = self._deliveries.get_nowait()
+            except queue.Empty:
+                return
+            function(*args)
+
+    def _run(self):
+        """
+        Carry out commands and poll the audio output. Runs on the playback thread.
+
+        """
+        output = None
+        while True:
+            try:
+                command, args = self._commands.get(timeout=self.poll_interval if self.state == "playing" else None)
+            except queue.Empty:
+                command, args = None, ()
+            if command == "close":
+                break
+            if command == "sync":
+                done, command = args[0], None
+            else:
+                done = None
+            if output is None and command is not None and self.state != "error":
+                try:
+                    output = self.output_factory()
+                except Exception as error:  # pygame missing, or no audio device
+                    self.error = str(error)
+                    self._set_state("error", None)
+            if output is not None:
+                if command is not None:
+                    getattr(self, "_" + command)(output, *args)
+                if self.state == "playing":
+                    self._poll(output)
+            if done is not None:
+                done.set()  # Commands are handled in order, so all earlier ones are done
+        if output is not None:
+            output.stop()
+            output.close()
+
+    def _poll(self, output):
+        """
+        Report the position, or count the play and start the next track if the current one ended.
+
+        """
+        if output.busy():
+            self.position = output.position()
+            self._report()
+            return
+        key = self.key
+        self.completed += 1
+        self._deliver(self.library.increment_play_count, key)
+        self._start_next(output)
+
+    def _start_next(self, output):
+        """
+        Start the first track of the queue that has an audio file, or stop if there is none.
+
+        """
+        while self.queue:
+            key = self.queue.popleft()
+            path = find_audio(key, self.audio_dir)
+            if path is None:
+                self._set_state("missing", key)
+                continue
+            output.play(path)
+            self.position = 0.0
+            self._set_state("playing", key)
+            return
+        self._set_state("stopped", None)
+
+    def _play(self, output, keys):
+        if self.key is not None:
+            output.stop()
+        self.queue = deque(keys)
+        self._start_next(output)
+
+    def _enqueue(self, output, keys):
+        self.queue.extend(keys)
+        if self.key is None:
+            self._start_next(output)
+
+    def _pause(self, output):
+        if self.state == "playing":
+            self.position = output.position()
+            output.pause()
+            self._set_state("paused", self.key)
+
+    def _resume(self, output):
+        if self.state == "paused":
+            output.resume()
+            self._set_state("playing", self.key)
+
+    def _toggle_pause(self, output):
+        if self.state == "playing":
+            self._pause(output)
+        else:
+            self._resume(output)
+
+    def _seek(self, output, seconds, relative):
+        if self.key is None:
+            return
+        if relative:
+            seconds += output.position() if self.state == "playing" else self.position
+        self.position = max(0.0, seconds)
+        output.seek(self.position)
+        if self.state == "paused":
+            output.pause()  # Seeking restarts the stream
+        self._report()
+
+    def _skip(self, output):
+        if self.key is not None:
+            output.stop()
+            self._start_next(output)
+
+    def _stop(self, output):
+        self.queue.clear()
+        if self.key is not None:
+            output.stop()
+        self.position = 0.0
+        self._set_state("stopped", None)
+
+    def _set_state(self, state, key):
+        """
+        Change the state and report it. The state "missing" is only reported.
+
+        """
+        if state == "missing":
+            self._deliver_report(state, key, 0.0)
+            return
+        self.state = state
+        self.key = key
+        self._report()
+
+    def _report(self):
+        self._deliver_report(self.state, self.key, self.position)
+
+    def _deliver_report(self, state, key, position):
+        for callback in list(self._subscribers):
+            self._deliver(callback, state, key, position)
+
+    def _deliver(self, function, *args):
+        """
+        Queue a function for the Tk thread, or call it right away if there is no widget.
+
+        """
+        if self.widget is None:
+            function(*args)
+        else:
+            self._deliveries.put((function, args))
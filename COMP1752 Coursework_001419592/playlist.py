@@ -0,0 +1,498 @@
+# Import necessary libraries for playlists
+import csv  # For reading and writing playlist files
+import io  # For parsing playlist files read as bytes
+import os  # For fsync and atomic replacement of playlist files
+import queue  # For handing finished writes back to the Tk thread
+import threading  # For counting writes made on the autosave thread
+import zlib  # For checksums that tie a log to the playlist file it was written against
+import storage  # For making renames of playlist files durable
+
+# Playlist files hold one "key,enabled" row per entry, e.g. "04,1", in playlist order.
+# Small changes are appended to a log file next to the playlist instead of rewriting it:
+#   +,key,enabled    add a track at the end
+#   -,key            remove a track
+#   =,key,enabled    check or uncheck a track
+# A log starts with an "@,checksum" row holding the CRC-32 of the playlist file it applies to.
+# Playlist.load replays the log after reading the rows, unless the checksum shows the log belongs
+# to an earlier version of the file. Reordering, or a log that has grown larger than the playlist,
+# rewrites the playlist file through a temporary file and drops the log.
+
+# Number of log rows that are always allowed before the playlist is rewritten
+LOG_COMPACT_ROWS = 256
+
+# Milliseconds that changes to a playlist are collected before they are saved together
+AUTOSAVE_DELAY_MS = 1000
+
+# Milliseconds between checks for finished autosave writes while writes are running
+AUTOSAVE_POLL_MS = 50
+
+def log_path(path):
+    """
+    Get the path of the log file that belongs to a playlist file.
+
+    """
+    return path + ".log"
+
+
+class Playlist:
+    """
+    Ordered track keys with a checked (enabled) flag each, and a set of the keys for
+    constant-time membership checks; a track appears at most once.
+    Only keys are stored: names and artists are looked up in the library when rows are shown.
+    Changes are remembered until save(), which appends them to the log when it can.
+    Entries are (key, enabled) tuples, so a Playlist can be the items of a RowSource.
+    """
+    def __init__(self, entries=(), path=None):
+        """
+        Create a playlist from (key, enabled) entries.
+
+        Args:
+            entries: Initial entries; repeated keys are skipped
+            path: Playlist file the entries were read from, if any
+        """
+        self.keys = []  # Track keys in playlist order
+        self.enabled = []  # Whether each entry is checked for playing
+        self._members = set()  # Keys in the playlist
+        for key, enabled in entries:
+            if key not in self._members:
+                self._append(key, enabled)
+        self.path = path
+        self.log_rows = 0  # Rows in the log file of path
+        self._pending = []  # Log rows of changes that are not saved yet
+        self._rewrite = path is None  # Whether the next save must rewrite the whole file
+        self._has_file = False  # Whether the playlist has been saved to, or loaded from, a file
+        self.saving = 0  # Jobs from save_job that have not finished yet
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, index):
+        return self.keys[index], self.enabled[index]
+
+    def __iter__(self):
+        return zip(self.keys, self.enabled)
+
+    def __contains__(self, key):
+        return key in self._members
+
+    @property
+    def dirty(self):
+        """
+        Check whether there are changes that are not on disk yet, including changes being written.
+        An empty playlist that was never saved has nothing to lose and is not dirty.
+
+        """
+        if self._pending or self.saving > 0:
+            return True
+        return self._rewrite and (bool(self.keys) or self._has_file)
+
+    def _append(self, key, enabled):
+        self.keys.append(key)
+        self.enabled.append(enabled)
+        self._members.add(key)
+
+    def index(self, key):
+        """
+        Get the position of a track in the playlist.
+
+        """
+        return self.keys.index(key)
+
+    def enabled_keys(self):
+        """
+        Get the keys of the checked tracks in order.
+
+        """
+        return [key for key, enabled in zip(self.keys, self.enabled) if enabled]
+
+    def add(self, keys, enabled=True):
+        """
+        Add tracks to the end of the playlist.
+        Returns the keys that were already in the playlist and were not added again.
+
+        """
+        duplicates = []
+        for key in keys:
+            if key in self._members:
+                duplicates.append(key)
+            else:
+                self._append(key, enabled)
+                self._pending.append(["+", key, "1" if enabled else "0"])
+        return duplicates
+
+    def remove(self, keys):
+        """
+        Remove tracks by key, in one pass over the playlist. Returns the removed keys.
+
+        """
+        removed = [key for key in dict.fromkeys(keys) if key in self._members]
+        if removed:
+            self._filter(set(removed))
+        return removed
+
+    def remove_at(self, indices):
+        """
+        Remove the entries at the given positions, in one pass over the playlist. Returns the removed keys.
+
+        """
+        return self.remove([self.keys[index] for index in sorted(set(indices))])
+
+    def _filter(self, removed):
+        """
+        Drop the entries of a set of keys.
+
+        """
+        entries = [(key, enabled) for key, enabled in zip(self.keys, self.enabled) if key not in removed]
+        self.keys = [key for key, enabled in entries]
+        self.enabled = [enabled for key, enabled in entries]
+        self._members.difference_update(removed)
+        self._pending.extend(["-", key] for key in removed)
+
+    def set_enabled(self, index, enabled):
+        """
+        Check or uncheck the entry at a position.
+
+        """
+        if self.enabled[index] != enabled:
+            self.enabled[index] = enabled
+            self._pending.append(["=", self.keys[index], "1" if enabled else "0"])
+
+    def toggle(self, index):
+        """
+        Flip the checked flag of the entry at a position. Returns the new flag.
+
+        """
+        self.set_enabled(index, not self.enabled[index])
+        return self.enabled[index]
+
+    def move(self, indices, to):
+        """
+        Move the entries at the given positions, keeping their order, so that the first
+        of them ends up at position to (counted without the moved entries).
+        Returns the new positions of the moved entries.
+
+        """
+        indices = sorted(set(indices))
+        if not indices:
+            return []
+        moved = set(indices)
+        block = [self[index] for index in indices]
+        rest = [entry for index, entry in enumerate(self) if index not in moved]
+        to = max(0, min(to, len(rest)))
+        entries = rest[:to] + block + rest[to:]
+        self.keys = [key for key, enabled in entries]
+        self.enabled = [enabled for key, enabled in entries]
+        self._rewrite = True  # The log has no rows for reordering
+        return list(range(to, to + len(block)))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a playlist file and replay its log. A missing file gives an empty playlist.
+
+        """
+        entries = {}  # Key -> enabled, in playlist order
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+            exists = True
+        except FileNotFoundError:
+            data, exists = b"", False
+        for row in csv.reader(io.StringIO(data.decode("utf-8"), newline="")):
+            if row and row[0] not in entries:
+                entries[row[0]] = len(row) < 2 or row[1] == "1"
+        try:
+            with open(log_path(path), "r", encoding="utf-8", newline="") as file:
+                rows = list(csv.reader(file))
+        except FileNotFoundError:
+            rows = []
+        stale = False
+        if rows and rows[0] and rows[0][0] == "@":
+            header = rows.pop(0)
+            if len(header) < 2 or header[1] != str(zlib.crc32(data)):
+                stale, rows = True, []  # Left by a crash after the file was rewritten
+        for row in rows:
+            if len(row) == 3 and row[0] == "+":
+                entries.setdefault(row[1], row[2] == "1")  # Added at the end, unless already there
+            elif len(row) == 2 and row[0] == "-":
+                entries.pop(row[1], None)
+            elif len(row) == 3 and row[0] == "=" and row[1] in entries:
+                entries[row[1]] = row[2] == "1"
+        playlist = cls(entries.items(), path)
+        playlist.log_rows = len(rows)
+        playlist._rewrite = not exists or stale  # Rewriting drops a stale log
+        playlist._has_file = exists
+        return playlist
+
+    def save(self, path=None):
+        """
+        Save the changes to a playlist file, by default the one it was loaded from.
+        Returns the number of bytes written.
+        Changes are appended to the log unless the playlist was reordered, is saved to a new
+        file, or the log would outgrow the playlist; then the file is rewritten atomically.
+
+        """
+        job = self.save_job(path)
+        if job is None:
+            return 0
+        try:
+            return job()
+        finally:
+            self.saving -= 1
+
+    def save_job(self, path=None):
+        """
+        Take the unsaved changes, like save(), but return a function that writes them instead
+        of writing them, or None if there is nothing to save. The function returns the number
+        of bytes written and can run on another thread while the playlist keeps changing.
+        The caller must decrement saving when the function has finished.
+
+        """
+        path = self.path if path is None else path
+        if path != self.path:
+            self._rewrite = True
+        if self._rewrite or self.log_rows + len(self._pending) > max(LOG_COMPACT_ROWS, len(self)):
+            entries = list(zip(self.keys, self.enabled))
+            job = lambda: write_playlist(path, entries)
+            self.log_rows = 0
+        elif self._pending:
+            rows = self._pending
+            job = lambda: append_log(path, rows)
+            self.log_rows += len(rows)
+        else:
+            job = None
+        if job is not None:
+            self.saving += 1
+            self._has_file = True
+        self.path = path
+        self._pending = []
+        self._rewrite = False
+        return job
+
+    def mark_unsaved(self):
+        """
+        Make the next save rewrite the whole file, e.g. because a write failed.
+
+        """
+        self._rewrite = True
+
+
+def write_playlist(path, entries):
+    """
+    Atomically replace a playlist file with (key, enabled) entries and drop its log.
+    Returns the number of bytes written; 0 when the file already had these entries.
+
+    """
+    text = io.StringIO(newline="")
+    csv.writer(text).writerows([key, "1" if enabled else "0"] for key, enabled in entries)
+    data = text.getvalue().encode("utf-8")
+    written = 0
+    if data != _read_bytes(path):
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+        storage.fsync_directory(path)
+        written = len(data)
+    # Drop the log only once the new file is durable. A crash before this leaves a log whose
+    # checksum does not match the new file, so load ignores it. When the content did not change
+    # the file is not replaced at all, since a matching checksum would make load replay the log
+    if os.path.exists(log_path(path)):
+        os.remove(log_path(path))
+    return written
+
+def _read_bytes(path):
+    """
+    Get the contents of a file, or None if it does not exist.
+
+    """
+    try:
+        with open(path, "rb") as file:
+            return file.read()
+    except FileNotFoundError:
+        return None
+
+def append_log(path, rows):
+    """
+    Append change rows to the log of a playlist file and fsync it. Returns the number of bytes written.
+    A new log starts with the checksum of the playlist file.
+
+    """
+    with open(log_path(path), "a", newline="", encoding="utf-8") as file:
+        start = file.tell()
+        writer = csv.writer(file)
+        if start == 0:
+            writer.writerow(["@", zlib.crc32(_read_bytes(path) or b"")])
+        writer.writerows(rows)
+        file.flush()
+        os.fsync(file.fileno())
+        return file.tell() - start
+
+
+class PlaylistAutosave:
+    """
+    Saves changed playlists in the background.
+    The first change starts a time window; all changes made within it are saved with one
+    write when it ends, on a single writer thread so writes to a file never overlap or
+    reorder. flush() saves everything at once, e.g. before a playlist is read again or on exit.
+    The writer thread never calls Tk: it queues the results of its writes, and the Tk thread
+    takes them from the queue, so flush() can wait for the writer without a deadlock.
+    Counters report how many writes the coalescing avoided and how many bytes were written.
+    """
+    def __init__(self, widget, delay_ms=AUTOSAVE_DELAY_MS, on_error=None, on_saved=None):
+        """
+        Create an idle autosave.
+
+        Args:
+            widget: Any Tk widget, used for the timer and to report errors on the Tk thread
+            delay_ms: Length of the window in which changes are collected
+            on_error: Function called on the Tk thread with the OSError of a failed write
+            on_saved: Function called on the Tk thread with the path of each file written
+        """
+        self.widget = widget
+        self.delay_ms = delay_ms
+        self.on_error = on_error
+        self.on_saved = on_saved
+        self._waiting = {}  # Path -> playlist with changes that are not saved yet
+        self._after_id = None  # Timer of the current window
+        self._executor = None  # Writer thread, started with the first write
+        self._results = queue.Queue()  # (function, args) of finished writes, run on the Tk thread
+        self._running = 0  # Writes handed to the writer thread whose results were not handled yet
+        self._poll_id = None  # Timer of the next check for finished writes
+        self._lock = threading.Lock()  # Guards the counters, which the writer thread updates
+        self.changes = 0  # Changes reported
+        self.writes = 0  # Files written
+        self.writes_avoided = 0  # Changes saved by the write of an earlier change in the same window
+        self.bytes_written = 0  # Bytes written to playlist files and logs
+        self.errors = 0  # Failed writes
+
+    def stats(self):
+        """
+        Get the change, write and byte counters.
+
+        """
+        with self._lock:
+            return {"changes": self.changes, "writes": self.writes, "writes_avoided": self.writes_avoided,
+                    "bytes_written": self.bytes_written, "errors": self.errors}
+
+    def changed(self, playlist, path=None):
+        """
+        Note that a playlist changed, to be saved to path (by default its own file) when the window ends.
+        Must be called on the Tk thread.
+
+        """
+        path = playlist.path if path is None else path
+        with self._lock:
+            self.changes += 1
+            if self._waiting.get(path) is playlist:
+                self.writes_avoided += 1
+        self._waiting[path] = playlist
+        if self._after_id is None:
+            self._after_id = self.widget.after(self.delay_ms, self.save_now)
+
+    def save_now(self):
+        """
+        End the window: take the changes of the waiting playlists and hand them to the writer thread.
+        Must be called on the Tk thread.
+
+        """
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+        waiting, self._waiting = self._waiting, {}
+        for path, playlist in waiting.items():
+            job = playlist.save_job(path)
+            if job is not None:
+                if self._executor is None:
+                    from concurrent.futures import ThreadPoolExecutor  # Imported on first use to keep it out of startup
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="autosave")
+                self._executor.submit(self._write, job, playlist, path)
+                self._running += 1
+        if self._running and self._poll_id is None:
+            self._poll_id = self.widget.after(AUTOSAVE_POLL_MS, self._poll)
+
+    def _write(self, job, playlist, path):
+        """
+        Write a playlist's changes. Runs on the writer thread.
+
+        """
+        try:
+            written = job()
+        except OSError as error:
+            with self._lock:
+                self.errors += 1
+            self._results.put((self._failed, (playlist, error)))
+            return
+        with self._lock:
+            self.writes += 1
+            self.bytes_written += written
+        self._results.put((self._saved, (playlist, path)))
+
+    def _handle_results(self):
+        """
+        Run the callbacks of the writes that have finished. Runs on the Tk thread.
+
+        """
+        while True:
+            try:
+                function, args = self._results.get_nowait()
+            except queue.Empty:
+                return
+            self._running -= 1
+            function(*args)
+
+    def _poll(self):
+        """
+        Handle finished writes, and check again while writes are running. Runs on the Tk thread.
+
+        """
+        self._poll_id = None
+        self._handle_results()
+        if self._running:
+            self._poll_id = self.widget.after(AUTOSAVE_POLL_MS, self._poll)
+
+    def _saved(self, playlist, path):
+        """
+        Note that a write has finished. Runs on the Tk thread.
+
+        """
+        playlist.saving -= 1
+        if self.on_saved is not None:
+            self.on_saved(path)
+
+    def _failed(self, playlist, error):
+        """
+        Report a failed write; the next save of the playlist rewrites its whole file.
+        Runs on the Tk thread.
+
+        """
+        playlist.saving -= 1
+        playlist.mark_unsaved()
+        if self.on_error is not None:
+            self.on_error(error)
+
+    def flush(self):
+        """
+        Save all waiting changes, wait until every write has finished and handle the results.
+        Must be called on the Tk thread.
+
+        """
+        self.save_now()
+        if self._executor is not None:
+            self._executor.submit(lambda: None).result()  # The writer thread handles jobs in order
+        self._handle_results()
+        if self._poll_id is not None:
+            self.widget.after_cancel(self._poll_id)
+            self._poll_id = None
+
+    def close(self):
+        """
+        Flush and stop the writer thread.
+
+        """
+        self.flush()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
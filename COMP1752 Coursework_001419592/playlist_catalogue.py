@@ -0,0 +1,190 @@
+# Import necessary libraries for finding and caching playlists
+import os  # For scanning the playlist directory and checking files for changes
+from collections import OrderedDict  # For the least recently used order of the parsed playlists
+from playlist import Playlist, log_path  # For reading playlists and finding their logs
+
+# Milliseconds between checks of the playlist directory for changes
+WATCH_INTERVAL_MS = 2000
+
+# Directory of the NAME.csv playlist files; only playlists live there, so no other CSV file is taken for one
+PLAYLIST_DIR = "playlists"
+
+def move_legacy_playlists(directory=PLAYLIST_DIR, legacy_dir="."):
+    """
+    Move the listN.csv playlists and their logs, which older versions kept next to music.csv,
+    into the playlist directory. Playlists that already exist there are left alone.
+    Returns the names of the moved playlists.
+
+    """
+    os.makedirs(directory, exist_ok=True)
+    moved = []
+    for filename in sorted(os.listdir(legacy_dir)):
+        name, extension = os.path.splitext(filename)
+        if extension != ".csv" or not name.startswith("list") or os.path.exists(os.path.join(directory, filename)):
+            continue
+        for path in (filename, log_path(filename)):
+            if os.path.exists(os.path.join(legacy_dir, path)):
+                os.replace(os.path.join(legacy_dir, path), os.path.join(directory, path))
+        moved.append(name)
+    return moved
+
+
+class PlaylistCatalogue:
+    """
+    Index of the playlists in a directory, with the most recently used ones kept parsed in memory.
+    The directory is scanned once; after that, get() of a cached playlist needs no disk I/O.
+    watch() checks the directory and the cached playlists' files periodically: new or
+    deleted playlists update names, and cached playlists changed by someone else are read
+    again on next use. Playlists with unsaved changes are never dropped.
+    """
+    def __init__(self, directory=PLAYLIST_DIR, capacity=8, on_change=None):
+        """
+        Scan a playlist directory, creating it if it does not exist.
+
+        Args:
+            directory: Directory that holds the NAME.csv playlist files and nothing else
+            capacity: Number of parsed playlists kept in memory; playlists with unsaved changes may exceed it
+            on_change: Function called with (names_changed, changed names) when watch() finds changes
+        """
+        self.directory = directory
+        self.capacity = capacity
+        self.on_change = on_change
+        self.names = []  # Names of the playlists, sorted
+        self._directory_stamp = None  # Modification time of the directory at the last scan
+        self._cache = OrderedDict()  # Name -> (file stamp, Playlist), least recently used first
+        self._after_id = None  # Timer of the next watch() check
+        self._widget = None
+        self.hits = 0  # get() calls served from memory
+        self.misses = 0  # get() calls that read the playlist file
+        os.makedirs(directory, exist_ok=True)
+        self.scan()
+
+    def stats(self):
+        """
+        Get the cache counters.
+
+        """
+        return {"hits": self.hits, "misses": self.misses, "cached": len(self._cache), "playlists": len(self.names)}
+
+    def path(self, name):
+        """
+        Get the file of a playlist.
+
+        """
+        return os.path.join(self.directory, f"{name}.csv")
+
+    def scan(self):
+        """
+        List the playlists in the directory. Returns whether the names changed.
+
+        """
+        self._directory_stamp = os.stat(self.directory).st_mtime_ns
+        names = sorted(entry.name[:-4] for entry in os.scandir(self.directory)
+                       if entry.name.endswith(".csv") and entry.is_file())
+        changed = names != self.names
+        self.names = names
+        return changed
+
+    def _stamp(self, name):
+        """
+        Get the sizes and modification times of a playlist's file and log, to notice changes.
+
+        """
+        stamp = []
+        for path in (self.path(name), log_path(self.path(name))):
+            try:
+                stat = os.stat(path)
+                stamp.append((stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def get(self, name):
+        """
+        Get a playlist by name, from memory if it was used recently. A playlist without a
+        file is created empty; it is written by its first save.
+
+        """
+        entry = self._cache.get(name)
+        if entry is not None:
+            self._cache.move_to_end(name)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        playlist = Playlist.load(self.path(name))
+        self.put(name, playlist)
+        return playlist
+
+    def put(self, name, playlist):
+        """
+        Keep a playlist in the catalogue under a name, e.g. a copy saved under a new name.
+
+        """
+        self._cache[name] = (self._stamp(name), playlist)
+        self._cache.move_to_end(name)
+        self._evict(keep=name)
+
+    def _evict(self, keep=None):
+        """
+        Drop the least recently used playlists beyond capacity. Playlists with unsaved changes
+        or a save in flight are skipped, and dropped later once they are saved.
+
+        """
+        excess = len(self._cache) - self.capacity
+        if excess <= 0:
+            return
+        victims = [name for name, (stamp, playlist) in self._cache.items() if name != keep and not playlist.dirty]
+        for name in victims[:excess]:
+            del self._cache[name]
+
+    def file_saved(self, path):
+        """
+        Note that a cached playlist was saved to path by this application, so watch()
+        does not take the write for a change made by someone else.
+
+        """
+        for name, (stamp, playlist) in self._cache.items():
+            if playlist.path == path:
+                self._cache[name] = (self._stamp(name), playlist)
+                if name not in self.names:
+                    self.names = sorted(self.names + [name])  # A new playlist's first save
+                self._evict()  # It may have been kept over capacity while it was being saved
+                return
+
+    def check(self):
+        """
+        Look for added or deleted playlists and for cached playlists that were changed on disk.
+        Changed playlists are dropped from the cache unless they have unsaved changes.
+        Returns (names_changed, changed names).
+
+        """
+        try:
+            names_changed = os.stat(self.directory).st_mtime_ns != self._directory_stamp and self.scan()
+        except FileNotFoundError:
+            names_changed, self.names = bool(self.names), []
+        changed = []
+        for name, (stamp, playlist) in list(self._cache.items()):
+            if not playlist.dirty and self._stamp(name) != stamp:
+                del self._cache[name]
+                changed.append(name)
+        return names_changed, changed
+
+    def watch(self, widget, interval_ms=WATCH_INTERVAL_MS):
+        """
+        Check for changes every interval_ms on the Tk thread and report them to on_change.
+
+        """
+        self._widget = widget
+        names_changed, changed = self.check()
+        if (names_changed or changed) and self.on_change is not None:
+            self.on_change(names_changed, changed)
+        self._after_id = widget.after(interval_ms, self.watch, widget, interval_ms)
+
+    def stop(self):
+        """
+        Stop watching for changes.
+
+        """
+        if self._after_id is not None:
+            self._widget.after_cancel(self._after_id)
+            self._after_id = None
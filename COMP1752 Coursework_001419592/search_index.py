@@ -0,0 +1,220 @@
+# Import necessary libraries for indexing track names and artists
+import bisect  # For prefix search over the sorted token list
+import re  # For splitting values into words
+from collections import defaultdict  # For posting sets that are created on first use
+
+# Length of the substrings (n-grams) used for substring search. Shorter substrings are
+# indexed too, so terms of one or two characters are looked up instead of scanned for
+GRAM_SIZE = 3
+
+# Fields of a track that are indexed
+FIELDS = ("name", "artist")
+
+def tokenize(value):
+    """
+    Split a lowercased value into words.
+
+    """
+    return re.findall(r"\w+", value)
+
+def grams(value, size=GRAM_SIZE):
+    """
+    Get the distinct substrings of size characters in a lowercased value.
+
+    """
+    return {value[i:i + size] for i in range(len(value) - size + 1)}
+
+def indexed_grams(value):
+    """
+    Get the distinct substrings of one up to GRAM_SIZE characters in a lowercased value.
+
+    """
+    return {value[i:i + size] for size in range(1, GRAM_SIZE + 1) for i in range(len(value) - size + 1)}
+
+
+class _FieldIndex:
+    """
+    Index over one field (name or artist) of all tracks.
+    Postings point to distinct lowercased values rather than to tracks, so values shared
+    by many tracks, like an artist's name, are indexed only once.
+    """
+    def __init__(self):
+        """
+        Create an empty field index.
+
+        """
+        self.value_of = {}  # Track key -> lowercased value
+        self.keys_by_value = {}  # Lowercased value -> keys of the tracks with that value
+        self.values_by_gram = defaultdict(set)  # N-gram, or shorter substring -> values containing it
+        self.values_by_token = defaultdict(set)  # Word -> values containing it
+        self.sorted_tokens = []  # All words in sorted order, for prefix search
+        self.tokens_changed = False  # Whether sorted_tokens must be rebuilt
+
+    def add(self, key, value):
+        """
+        Index the value of a track.
+
+        """
+        value = value.lower()
+        self.value_of[key] = value
+        keys = self.keys_by_value.get(value)
+        if keys is not None:
+            keys.add(key)  # Value is already indexed
+            return
+        self.keys_by_value[value] = {key}
+        for gram in indexed_grams(value):
+            self.values_by_gram[gram].add(value)
+        for token in tokenize(value):
+            values = self.values_by_token[token]
+            if not values:
+                self.tokens_changed = True  # New word
+            values.add(value)
+
+    def remove(self, key):
+        """
+        Remove a track from the index.
+
+        """
+        value = self.value_of.pop(key, None)
+        if value is None:
+            return
+        keys = self.keys_by_value[value]
+        keys.discard(key)
+        if keys:
+            return  # Other tracks still have this value
+        del self.keys_by_value[value]
+        for gram in indexed_grams(value):
+            self._discard(self.values_by_gram, gram, value)
+        for token in tokenize(value):
+            if self._discard(self.values_by_token, token, value):
+                self.tokens_changed = True  # Word no longer used
+
+    @staticmethod
+    def _discard(postings, term, value):
+        """
+        Remove a value from a posting set, dropping the set when it becomes empty.
+        Returns True if the set was dropped.
+
+        """
+        values = postings.get(term)
+        if values is None:
+            return False
+        values.discard(value)
+        if not values:
+            del postings[term]
+            return True
+        return False
+
+    def _keys_for(self, values):
+        """
+        Collect the keys of the tracks with any of the values.
+
+        """
+        keys = set()
+        for value in values:
+            keys.update(self.keys_by_value[value])
+        return keys
+
+    def substring(self, term):
+        """
+        Find the tracks whose value contains the term.
+
+        """
+        if not term:
+            values = self.keys_by_value  # Every value contains the empty string
+        elif len(term) < GRAM_SIZE:
+            values = self.values_by_gram.get(term, ())  # Short substrings are indexed whole
+        else:
+            postings = sorted((self.values_by_gram.get(gram, ()) for gram in grams(term)), key=len)
+            candidates = postings[0]
+            for other in postings[1:]:
+                if not candidates:
+                    break
+                candidates = candidates & other
+            values = (value for value in candidates if term in value)  # N-grams may match out of order
+        return self._keys_for(values)
+
+    def words(self, term):
+        """
+        Find the tracks whose value contains every word of the term.
+
+        """
+        postings = sorted((self.values_by_token.get(token, ()) for token in tokenize(term)), key=len)
+        if not postings:
+            return set()
+        values = set(postings[0])
+        for other in postings[1:]:
+            values &= other
+        return self._keys_for(values)
+
+    def prefix(self, term):
+        """
+        Find the tracks with a word that starts with the term.
+
+        """
+        if self.tokens_changed:
+            self.sorted_tokens = sorted(self.values_by_token)
+            self.tokens_changed = False
+        values = set()
+        start = bisect.bisect_left(self.sorted_tokens, term)
+        for token in self.sorted_tokens[start:]:
+            if not token.startswith(term):
+                break
+            values.update(self.values_by_token[token])
+        return self._keys_for(values)
+
+
+class SearchIndex:
+    """
+    Search index over the names and artists of the tracks in the library.
+    Combines a word inverted index, with prefix search over its sorted words,
+    and an n-gram index for substring search. Tracks are added, updated and
+    removed one at a time, so the index never has to be rebuilt.
+    """
+    def __init__(self):
+        """
+        Create an empty search index.
+
+        """
+        self._fields = {field: _FieldIndex() for field in FIELDS}
+
+    def add(self, key, name, artist):
+        """
+        Index a track.
+
+        """
+        self._fields["name"].add(key, name)
+        self._fields["artist"].add(key, artist)
+
+    def remove(self, key):
+        """
+        Remove a track from the index.
+
+        """
+        for index in self._fields.values():
+            index.remove(key)
+
+    def update(self, key, name, artist):
+        """
+        Re-index a track after its name or artist changed.
+
+        """
+        self.remove(key)
+        self.add(key, name, artist)
+
+    def search(self, term, field="name", match="substring"):
+        """
+        Find the keys of the tracks whose field matches the term, ignoring case.
+        match is "substring" (the term appears anywhere), "prefix" (a word starts
+        with the term) or "words" (every word of the term appears as a word).
+
+        """
+        index = self._fields[field]
+        term = term.lower()
+        if match == "substring":
+            return index.substring(term)
+        elif match == "prefix":
+            return index.prefix(term)
+        elif match == "words":
+            return index.words(term)
+        raise ValueError(f"Unknown match type: {match}")
@@ -0,0 +1,349 @@
+# Import necessary libraries for storing the music library in SQLite
+import csv  # For importing and exporting CSV files
+import os  # For finding playlist files
+import sqlite3  # For the SQLite database
+from library_item import clamp_rating  # For validating imported ratings
+import playlist  # For reading playlist files with their logs
+
+# Storage backends for track_library.
+# A backend is any object with these methods, used by track_library.load_storage:
+#   load_tracks()                      -> iterable of (id, name, artist, rating, play_count)
+#   add_track(name, artist, rating)    -> integer id of the new track
+#   update_track(id, **fields)         change name, artist and/or rating of one track
+#   delete_track(id)                   remove one track
+#   add_plays(counts)                  add plays from a {id: plays} mapping
+#   next_id()                          -> id the next added track will get
+# Track ids are stable integers that are never reused, even after the track with the
+# highest id is deleted; track_library shows them as zero-padded keys.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    artist TEXT NOT NULL,
+    rating INTEGER NOT NULL DEFAULT 0,
+    play_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS tracks_name ON tracks (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS tracks_artist ON tracks (artist COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS tracks_rating ON tracks (rating);
+CREATE TABLE IF NOT EXISTS playlist_entries (
+    playlist TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    track_id INTEGER NOT NULL REFERENCES tracks (id) ON DELETE CASCADE,
+    enabled INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (playlist, position)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Columns that update_track may change
+TRACK_FIELDS = ("name", "artist", "rating")
+
+
+class SqliteStorage:
+    """
+    Music library stored in a SQLite database.
+    Tracks have stable integer primary keys, so deleting a track never renumbers the others.
+    Name, artist and rating are indexed, the database runs in WAL mode, and every change
+    is a single-row statement instead of a rewrite of the whole library.
+    """
+    def __init__(self, path="music.db"):
+        """
+        Open (or create) the database.
+
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        """
+        Close the database.
+
+        """
+        self.connection.close()
+
+    def load_tracks(self):
+        """
+        Get all tracks as (id, name, artist, rating, play_count) rows in id order.
+
+        """
+        return self.connection.execute("SELECT id, name, artist, rating, play_count FROM tracks ORDER BY id")
+
+    def next_id(self):
+        """
+        Get the id the next added track will get: one past the highest id ever handed out,
+        so the id of a deleted track is never given to a new one.
+
+        """
+        (next_id,) = self.connection.execute(
+            "SELECT MAX(COALESCE((SELECT value FROM meta WHERE key = 'next_id'), 1),"
+            " COALESCE((SELECT MAX(id) FROM tracks), 0) + 1)").fetchone()
+        return next_id
+
+    def set_next_id(self, next_id):
+        """
+        Raise the id the next added track will get, e.g. to the high-water mark of an imported file.
+
+        """
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('next_id', ?)",
+                                    (max(next_id, self.next_id()),))
+
+    def add_track(self, name, artist, rating=0):
+        """
+        Add a track and return its id.
+
+        """
+        with self.connection:
+            track_id = self.next_id()
+            self.connection.execute("INSERT INTO tracks (id, name, artist, rating) VALUES (?, ?, ?, ?)",
+                                    (track_id, name, artist, clamp_rating(rating)))
+            self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('next_id', ?)",
+                                    (track_id + 1,))
+        return track_id
+
+    def update_track(self, track_id, **fields):
+        """
+        Change the name, artist and/or rating of a track.
+
+        """
+        if "rating" in fields:
+            fields["rating"] = clamp_rating(fields["rating"])
+        columns = [column for column in TRACK_FIELDS if column in fields]
+        if not columns:
+            return
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        with self.connection:
+            self.connection.execute(f"UPDATE tracks SET {assignments} WHERE id = ?",
+                                    [fields[column] for column in columns] + [track_id])
+
+    def delete_track(self, track_id):
+        """
+        Remove a track, and its playlist entries.
+
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM tracks WHERE id = ?", (track_id,))
+
+    def add_plays(self, counts):
+        """
+        Add plays to tracks from a {id: plays} mapping.
+
+        """
+        with self.connection:
+            self.connection.executemany("UPDATE tracks SET play_count = play_count + ? WHERE id = ?",
+                                        [(plays, track_id) for track_id, plays in counts.items()])
+
+    def search(self, term, field="name", match="substring"):
+        """
+        Get the ids of tracks whose name or artist matches the term, ignoring case.
+        Prefix searches use the name and artist indexes.
+
+        """
+        if field not in ("name", "artist"):
+            raise ValueError(f"Unknown field: {field}")
+        escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        pattern = f"{escaped}%" if match == "prefix" else f"%{escaped}%"
+        rows = self.connection.execute(f"SELECT id FROM tracks WHERE {field} LIKE ? ESCAPE '\\' ORDER BY id",
+                                       (pattern,))
+        return [track_id for (track_id,) in rows]
+
+    def load_playlist(self, name):
+        """
+        Get the (track id, enabled) entries of a playlist in order.
+
+        """
+        rows = self.connection.execute(
+            "SELECT track_id, enabled FROM playlist_entries WHERE playlist = ? ORDER BY position", (name,))
+        return [(track_id, bool(enabled)) for track_id, enabled in rows]
+
+    def save_playlist(self, name, entries):
+        """
+        Replace a playlist with (track id, enabled) entries.
+
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM playlist_entries WHERE playlist = ?", (name,))
+            self.connection.executemany(
+                "INSERT INTO playlist_entries (playlist, position, track_id, enabled) VALUES (?, ?, ?, ?)",
+                [(name, position, track_id, int(enabled)) for position, (track_id, enabled) in enumerate(entries)])
+
+    def playlist_names(self):
+        """
+        Get the names of all playlists.
+
+        """
+        return [name for (name,) in self.connection.execute(
+            "SELECT DISTINCT playlist FROM playlist_entries ORDER BY playlist")]
+
+
+def import_csv(storage, music_csv="music.csv", playlist_dir="playlists"):
+    """
+    One-shot import of music.csv and the playlists in the playlist directory into an empty SqliteStorage.
+    Tracks keep their ids from music.csv (or their row numbers in legacy files without
+    an id column), so playlist entries like "04" still point at the same tracks.
+
+    """
+    next_id = 1
+    with open(music_csv, "r", encoding="utf-8") as file:
+        reader = csv.reader(file)
+        header = next(reader, None)  # Skip header row
+        if header and header[0] == "id":
+            rows = list(reader)
+            tracks = [(int(row[0]), row[1], row[2], clamp_rating(row[3]))
+                      for row in rows if len(row) == 4 and row[0].isdigit()]
+            next_id = max((read_next_id(row) or 1 for row in rows), default=1)
+        else:
+            tracks = [(index, row[0], row[1], clamp_rating(row[2]))
+                      for index, row in enumerate(reader, start=1) if len(row) == 3]
+    with storage.connection:
+        storage.connection.executemany("INSERT INTO tracks (id, name, artist, rating) VALUES (?, ?, ?, ?)", tracks)
+    storage.set_next_id(next_id)
+
+    track_ids = {track[0] for track in tracks}
+    for filename in sorted(os.listdir(playlist_dir)):
+        name, extension = os.path.splitext(filename)
+        if extension != ".csv":
+            continue
+        entries = [(int(key), enabled) for key, enabled in playlist.Playlist.load(os.path.join(playlist_dir, filename))
+                   if key.isdigit() and int(key) in track_ids]
+        storage.save_playlist(name, entries)
+
+
+def export_csv(storage, music_csv):
+    """
+    Write the tracks of a storage backend to a CSV file in the music.csv format.
+
+    """
+    with open(music_csv, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADER)
+        writer.writerow(next_id_row(storage.next_id()))
+        writer.writerows((track_id, name, artist, rating) for track_id, name, artist, rating, plays in storage.load_tracks())
+
+
+# Saving music.csv.
+# Rows are (id, name, artist, rating). Small edits are appended to a patch file next to the
+# CSV file instead of rewriting it: a (key, name, artist, rating) row sets a track's fields
+# and a (key,) row deletes it. track_library.load_library applies the patch after reading
+# the CSV rows. Full rewrites go through a temporary file so a crash never leaves a truncated
+# library behind.
+# A rewrite drops deleted rows, so it also writes a ("#next_id", id) row after the header:
+# the high-water mark of handed-out ids. Loaders skip it as a track row but never give a
+# new track an id below it, so the id of a deleted track is not reused.
+
+# Header of music.csv; legacy files have no id column
+CSV_HEADER = ["id", "name", "artist", "rating"]
+
+# First cell of the row holding the high-water mark of track ids
+NEXT_ID_MARKER = "#next_id"
+
+def next_id_row(next_id):
+    """
+    Get the CSV row that records the id the next added track will get.
+
+    """
+    return [NEXT_ID_MARKER, str(next_id)]
+
+def read_next_id(row):
+    """
+    Get the id recorded by a high-water mark row, or None for any other row.
+
+    """
+    if len(row) == 2 and row[0] == NEXT_ID_MARKER and row[1].isdigit():
+        return int(row[1])
+    return None
+
+def patch_path(music_csv):
+    """
+    Get the path of the patch file that belongs to a CSV file.
+
+    """
+    return music_csv + ".patch"
+
+def fsync_directory(path):
+    """
+    Make a rename in the directory of path durable. Not supported on Windows.
+
+    """
+    if os.name == "posix":
+        descriptor = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+def has_id_column(music_csv):
+    """
+    Check whether a CSV file has the id column; legacy files number their tracks by row.
+
+    """
+    try:
+        with open(music_csv, "r", encoding="utf-8", newline="") as file:
+            return next(csv.reader(file), None) == CSV_HEADER
+    except FileNotFoundError:
+        return False
+
+def rewrite_csv(music_csv, rows, next_id=None):
+    """
+    Atomically replace a CSV file with (id, name, artist, rating) rows.
+    The rows are written to a temporary file, fsynced and renamed over the old file,
+    and the patch file is dropped because the new file already contains its edits.
+    next_id, if given, is recorded as the high-water mark of track ids.
+
+    """
+    temp_path = music_csv + ".tmp"
+    with open(temp_path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADER)
+        if next_id is not None:
+            writer.writerow(next_id_row(next_id))
+        writer.writerows(rows)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, music_csv)
+    fsync_directory(music_csv)
+    # Drop the patch only once the new file is durable. A crash before this leaves a patch whose
+    # entries are already in the new file; they set absolute values under the same keys, so
+    # applying them again on the next load changes nothing
+    if os.path.exists(patch_path(music_csv)):
+        os.remove(patch_path(music_csv))
+
+def append_csv_rows(music_csv, rows):
+    """
+    Append (id, name, artist, rating) rows to a CSV file with an id column and fsync it.
+
+    """
+    with open(music_csv, "a", newline="", encoding="utf-8") as file:
+        csv.writer(file).writerows(rows)
+        file.flush()
+        os.fsync(file.fileno())
+
+def append_patch(music_csv, rows):
+    """
+    Record edited (key, name, artist, rating) rows and deleted (key,) rows in the patch file
+    of a CSV file and fsync it. Later entries for the same key win.
+
+    """
+    with open(patch_path(music_csv), "a", newline="", encoding="utf-8") as file:
+        csv.writer(file).writerows(rows)
+        file.flush()
+        os.fsync(file.fileno())
+
+def read_patch(music_csv):
+    """
+    Get the edited and deleted rows recorded for a CSV file, in order.
+
+    """
+    try:
+        with open(patch_path(music_csv), "r", encoding="utf-8", newline="") as file:
+            return [row for row in csv.reader(file) if len(row) in (1, 4)]
+    except FileNotFoundError:
+        return []
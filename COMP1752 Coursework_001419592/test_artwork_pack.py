@@ -0,0 +1,81 @@
+# Unit Tests for the artwork pack file
+# Tests cover writing and reading packs, missing entries and converting an artwork directory
+
+import io
+import pytest
+from artwork_pack import MAGIC, ArtworkPack, artwork_name, open_pack, pack_directory, write_pack
+
+def test_write_and_read(tmp_path):
+    """Test entries are read back as views of the mapped file"""
+    path = str(tmp_path / "artwork.pack")
+    write_pack(path, [("02", b"second"), ("01", b"first"), ("120", b"")])
+    with ArtworkPack(path) as pack:
+        assert len(pack) == 3
+        assert sorted(pack.names()) == ["01", "02", "120"]
+        view = pack.get("01")
+        assert isinstance(view, memoryview)
+        assert bytes(view) == b"first"
+        view.release()
+        assert bytes(pack.get("02")) == b"second"
+        assert bytes(pack.get("120")) == b""
+        assert pack.get("03") is None
+        assert "03" not in pack
+
+def test_open_pack(tmp_path):
+    """Test a missing pack is None and a file that is not a pack is rejected"""
+    assert open_pack(str(tmp_path / "missing.pack")) is None
+    path = tmp_path / "music.csv"
+    path.write_bytes(b"id,name,artist,rating\n")
+    with pytest.raises(ValueError):
+        ArtworkPack(str(path))
+
+def test_damaged_pack(tmp_path, caplog):
+    """Test empty, truncated and damaged packs are ignored with a warning instead of failing"""
+    path = str(tmp_path / "artwork.pack")
+    write_pack(path, [("01", b"first"), ("02", b"second")])
+    with open(path, "rb") as file:
+        data = file.read()
+    damaged = {
+        "empty": b"",
+        "truncated index": data[:20],
+        "truncated data": data[:-3],
+        "bad name": data[:len(MAGIC) + 6] + b"\xff\xff" + data[len(MAGIC) + 8:],
+    }
+    for contents in damaged.values():
+        with open(path, "wb") as file:
+            file.write(contents)
+        with pytest.raises(ValueError):
+            ArtworkPack(path)
+        assert open_pack(path) is None
+    assert len(caplog.records) == len(damaged)
+
+def test_artwork_name():
+    """Test entry names are the file names without extension"""
+    assert artwork_name("images/01.gif") == "01"
+    assert artwork_name("120.gif") == "120"
+
+def test_pack_directory(tmp_path):
+    """Test converting a directory of images into resized thumbnails"""
+    Image = pytest.importorskip("PIL.Image")
+    images = tmp_path / "images"
+    images.mkdir()
+    Image.new("RGB", (300, 150), "red").save(images / "01.gif")
+    (images / "notes.txt").write_text("not an image")
+    path = str(tmp_path / "artwork.pack")
+    assert pack_directory(str(images), path) == 1
+    with ArtworkPack(path) as pack:
+        with Image.open(io.BytesIO(pack.get("01"))) as image:
+            assert image.size == (120, 60)
+
+def test_discard(tmp_path):
+    """Test a discarded entry is no longer served and released views let the pack close"""
+    path = str(tmp_path / "artwork.pack")
+    write_pack(path, [("01", b"first"), ("02", b"second")])
+    pack = ArtworkPack(path)
+    pack.discard("01")
+    pack.discard("03")  # Not in the pack
+    assert "01" not in pack and pack.get("01") is None
+    assert list(pack.names()) == ["02"]
+    with pack.get("02") as view:
+        assert bytes(view) == b"second"
+    pack.close()
@@ -0,0 +1,77 @@
+# Unit Tests for the compact columnar track store
+# Tests cover storing tracks, the LibraryItem-like views and using the store behind track_library
+
+import pytest
+import track_library as lib
+from columnar_library import ColumnarLibrary
+from library_item import LibraryItem
+
+@pytest.fixture
+def store():
+    """Fixture to create a store with two tracks"""
+    store = ColumnarLibrary()
+    store["01"] = LibraryItem("Song A", "Artist", 3)
+    store["02"] = LibraryItem("Song B", "Artist", 7)  # Rating 7 is clamped to 5
+    return store
+
+def test_store_fields(store):
+    """Test reading the fields of stored tracks"""
+    assert len(store) == 2
+    assert "01" in store
+    assert store["01"].name == "Song A"
+    assert store["02"].artist == "Artist"
+    assert store["02"].rating == 5
+    assert store["01"].play_count == 0
+
+def test_store_shares_strings(store):
+    """Test that repeated artists are stored once and names are packed into the name table"""
+    assert store._strings.count("Artist") == 1
+    assert bytes(store._name_table) == b"Song ASong B"
+    store["03"] = LibraryItem("Café", "Other", 1)
+    assert store["03"].name == "Café"
+
+def test_store_reuses_rows_and_strings(store):
+    """Test deleted rows, unused artists and replaced names are reclaimed"""
+    store["03"] = LibraryItem("Song C", "Other", 2)
+    del store["03"]
+    assert "Other" not in store._strings
+    store["04"] = LibraryItem("Song D", "Another", 1)
+    assert len(store._ratings) == 3  # Took the row of "03"
+    assert store["04"].name == "Song D" and store["04"].rating == 1 and store["04"].play_count == 0
+    assert len(store._strings) == 2  # The entry of "Other" was reused
+    store["01"].name = "Renamed"
+    store["02"].name = "Renamed too"
+    assert len(store._name_table) == 42  # 18 unused bytes are kept until they are over half
+    store["04"].name = "D"
+    assert [item.name for item in store.values()] == ["Renamed", "Renamed too", "D"]
+    assert bytes(store._name_table) == b"RenamedRenamed tooD"  # Compacted
+    assert list(store) == ["01", "02", "04"]
+
+def test_store_updates(store):
+    """Test updating fields through the views"""
+    store["01"].rating = -2  # Should be converted to 0
+    assert store["01"].rating == 0
+    store["01"].play_count += 1
+    assert store["01"].play_count == 1
+    del store["02"]
+    assert "02" not in store
+    assert list(store) == ["01"]
+
+def test_track_library_on_columnar_store():
+    """Test the track_library API on top of the columnar store"""
+    lib.load_library("music.csv")
+    lib.set_backing_store(ColumnarLibrary())
+    try:
+        assert isinstance(lib.library, ColumnarLibrary)
+        assert lib.get_name("01") == "Smells Like Teen Spirit"
+        assert lib.get_artist("01") == "Nirvana"
+        assert lib.get_rating("01") == 5
+        lib.set_rating("01", 2)
+        assert lib.get_rating("01") == 2
+        lib.increment_play_count("01")
+        assert lib.get_play_count("01") == 1
+        lib.load_library("music.csv")  # Reloading keeps the store
+        assert isinstance(lib.library, ColumnarLibrary)
+        assert lib.get_rating("43") == 0
+    finally:
+        lib.set_backing_store({})
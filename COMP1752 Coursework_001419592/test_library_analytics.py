@@ -0,0 +1,60 @@
+# Unit Tests for the NumPy analytics
+# Tests cover the rating histogram, per-artist average ratings, play count percentiles
+# and refreshing the arrays after tracks are added, changed and removed
+
+import pytest
+
+np = pytest.importorskip("numpy")
+from track_library import TrackLibrary
+from library_analytics import LibraryAnalytics
+
+@pytest.fixture
+def analytics():
+    """Fixture to create analytics over a small library with play counts"""
+    library = TrackLibrary()
+    for index, (artist, rating) in enumerate([("Artist X", 5), ("Artist Y", 3), ("Artist X", 4), ("Artist Z", 5)]):
+        key = library.add_track(f"Song {index}", artist, rating)
+        library.library[key].play_count = index * 10
+    analytics = LibraryAnalytics(library)
+    yield analytics
+    analytics.close()
+
+def test_export_dtypes(analytics):
+    """Test the columns are exported with compact types and artists as categorical codes"""
+    analytics.refresh()
+    assert analytics.ratings.dtype == np.uint8 and analytics.plays.dtype == np.uint32
+    assert analytics.artist_codes.tolist() == [0, 1, 0, 2]
+    assert analytics.artists == ["Artist X", "Artist Y", "Artist Z"]
+
+def test_aggregates(analytics):
+    """Test the histogram, averages and percentiles"""
+    assert analytics.rating_histogram().tolist() == [0, 0, 0, 1, 1, 2]
+    assert analytics.artist_average_ratings() == {"Artist X": 4.5, "Artist Y": 3.0, "Artist Z": 5.0}
+    assert analytics.play_count_percentiles((0, 50, 100)) == {0: 0.0, 50: 15.0, 100: 30.0}
+
+def test_refresh_after_changes(analytics):
+    """Test changed, added and removed tracks only patch their rows"""
+    library = analytics.library
+    analytics.refresh()
+    library.remove_track("01")
+    library.set_rating("02", 1)
+    library.increment_play_count("04")
+    library.add_track("Song 4", "Artist W", 2)
+    analytics.export = None  # A refresh must not export everything again
+    assert sorted(analytics.keys) == ["01", "02", "03", "04"]  # Not applied until the next report
+    assert analytics.rating_histogram().tolist() == [0, 1, 1, 0, 1, 1]
+    assert analytics.artist_average_ratings() == {"Artist X": 4.0, "Artist Y": 1.0, "Artist Z": 5.0, "Artist W": 2.0}
+    assert analytics.play_count_percentiles((100,)) == {100: 31.0}
+    assert sorted(analytics.keys) == ["02", "03", "04", "05"]
+
+def test_reload_exports_again(analytics):
+    """Test a reload of the library exports the arrays again"""
+    analytics.refresh()
+    analytics.library.load_storage(EmptyStorage())
+    assert analytics.rating_histogram().tolist() == [0] * 6
+    assert analytics.play_count_percentiles() == {50: 0.0, 90: 0.0, 99: 0.0}
+
+class EmptyStorage:
+    """Storage backend without tracks"""
+    def load_tracks(self):
+        return []
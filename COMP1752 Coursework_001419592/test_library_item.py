@@ -1,6 +1,6 @@
 # test_library_item.py
 import pytest
-from library_item import LibraryItem
+from library_item import LibraryItem, SlottedLibraryItem
 import csv
 
 # Test data setup
@@ -10,7 +10,7 @@ def sample_library_item():
     with open("music.csv", "r", encoding="utf-8") as file:
         reader = csv.reader(file)
         next(reader)  # Skip header
-        name, artist, rating = next(reader)
+        track_id, name, artist, rating = next(reader)
         return LibraryItem(name, artist, rating)
 
 def test_library_item_creation(sample_library_item):
@@ -45,4 +45,33 @@ def test_library_item_play_count(sample_library_item):
     sample_library_item.play_count += 1
     assert sample_library_item.play_count == 1
     sample_library_item.play_count += 5
-    assert sample_library_item.play_count == 6 
\ No newline at end of file
+    assert sample_library_item.play_count == 6 
+
+def test_from_rows():
+    """Test bulk creation with rating validation"""
+    items = LibraryItem.from_rows([("Song A", "Artist A", "3"), ("Song B", "Artist B", "6"),
+                                   ("Song C", "Artist C", "-1"), ("Song D", "Artist D", "bad"),
+                                   ("Song E", "Artist E", "12")])
+    assert [item.rating for item in items] == [3, 5, 0, 0, 5]
+    assert items[0].name == "Song A"
+    assert items[0].artist == "Artist A"
+    assert all(item.play_count == 0 for item in items)
+    assert all(type(item) is LibraryItem for item in items)
+
+def test_slotted_library_item():
+    """Test the slotted variant behaves like LibraryItem"""
+    item = SlottedLibraryItem("Test Song", "Test Artist", 7)
+    assert item.rating == 5
+    item.rating = "invalid"
+    assert item.rating == 0
+    item.play_count += 1
+    assert item.play_count == 1
+    assert not hasattr(item, "__dict__")
+    with pytest.raises(AttributeError):
+        item.extra = 1
+
+def test_slotted_from_rows():
+    """Test bulk creation of slotted items"""
+    items = SlottedLibraryItem.from_rows([("Song A", "Artist A", "4"), ("Song B", "Artist B", 9)])
+    assert all(type(item) is SlottedLibraryItem for item in items)
+    assert [item.rating for item in items] == [4, 5]
@@ -0,0 +1,66 @@
+# Unit Tests for the library query engine
+# Tests cover composable filters, multi-key sorting with paging, top-N queries,
+# group-by-artist totals and keeping the sort orders up to date as the library changes
+
+import pytest
+from track_library import TrackLibrary
+from library_query import LibraryQuery, artist_is, plays_at_least, plays_at_most, rating_between
+
+TRACKS = [("Song A", "Artist X", 5, 3), ("Song B", "Artist Y", 3, 10), ("Song C", "artist x", 4, 0),
+          ("Song D", "Artist Z", 5, 7), ("Song E", "Artist Y", 1, 7)]
+
+@pytest.fixture
+def query():
+    """Fixture to create a query engine over a small library with play counts"""
+    library = TrackLibrary()
+    for name, artist, rating, plays in TRACKS:
+        key = library.add_track(name, artist, rating)
+        library.library[key].play_count = plays
+    query = LibraryQuery(library)
+    yield query
+    query.close()
+
+def test_filters(query):
+    """Test range filters, artist matching and combining filters"""
+    assert query.select(rating_between(4, 5)) == ["01", "03", "04"]
+    assert query.select(artist_is("ARTIST X")) == ["01", "03"]
+    assert query.select(plays_at_least(7) & rating_between(4)) == ["04"]
+    assert query.select(plays_at_most(0) | artist_is("Artist Z")) == ["03", "04"]
+    assert query.select(~rating_between(4, 5)) == ["02", "05"]
+
+def test_multi_key_sort_and_paging(query):
+    """Test sorting by several fields in mixed directions, ties in ID order, and paging"""
+    assert query.select(order_by=("-rating", "-play_count")) == ["04", "01", "03", "02", "05"]
+    assert query.select(order_by=("artist", "-name")) == ["03", "01", "05", "02", "04"]
+    assert query.select(order_by="-play_count") == ["02", "04", "05", "01", "03"]  # 04 and 05 tie
+    assert query.select(order_by="-play_count", offset=1, limit=2) == ["04", "05"]
+    assert query.select(rating_between(5), order_by="name", limit=1) == ["01"]
+    assert query.select(plays_at_least(1), order_by="-play_count") == ["02", "04", "05", "01"]
+    with pytest.raises(ValueError):
+        query.select(order_by="tempo")
+
+def test_top(query):
+    """Test the most played and best rated tracks, with and without a filter"""
+    assert query.top(2) == ["02", "04"]
+    assert query.top(2, by="rating") == ["01", "04"]
+    assert query.top(5, where=artist_is("artist y")) == ["02", "05"]
+
+def test_group_by_artist(query):
+    """Test per-artist track counts, plays and average ratings"""
+    groups = query.group_by_artist()
+    assert list(groups) == ["Artist X", "Artist Y", "artist x", "Artist Z"]
+    assert (groups["Artist Y"].tracks, groups["Artist Y"].plays, groups["Artist Y"].average_rating) == (2, 17, 2.0)
+    assert list(query.group_by_artist(rating_between(5))) == ["Artist X", "Artist Z"]
+
+def test_sort_orders_follow_changes(query):
+    """Test sort orders built by earlier queries are updated for added, changed and removed tracks"""
+    library = query.library
+    assert query.select(order_by="-rating") == ["01", "04", "03", "02", "05"]
+    library.set_rating("05", 5)
+    library.remove_track("01")
+    key = library.add_track("Song F", "Artist W", 4)
+    library.increment_play_counts(["03"] * 20)
+    assert query.select(order_by="-rating") == ["04", "05", "03", key, "02"]
+    assert query.select(order_by="-play_count", limit=1) == ["03"]
+    assert query.select(plays_at_least(7)) == ["02", "03", "04", "05"]
+    assert query.sort(["02", "01", "05"], "name") == ["02", "05"]  # Removed tracks are dropped
@@ -0,0 +1,64 @@
+# Unit Tests for the play count journal
+# Tests cover recording plays, persistence across reloads and compaction
+
+import pytest
+import track_library as lib
+from play_journal import PlayJournal
+
+@pytest.fixture
+def journal_path(tmp_path):
+    """Fixture for the path of a journal file"""
+    return str(tmp_path / "plays.journal")
+
+def test_record_and_reopen(journal_path):
+    """Test plays are written to disk and read back"""
+    journal = PlayJournal(journal_path, fsync_interval=60)
+    journal.record(["01", "02", "01"])
+    assert journal.play_count("01") == 2
+    journal.close()
+
+    journal = PlayJournal(journal_path, fsync_interval=60)
+    assert journal.play_count("01") == 2
+    assert journal.play_count("02") == 1
+    assert journal.play_count("03") == 0
+    journal.close()
+
+def test_compact(journal_path):
+    """Test compaction keeps the totals with one line per track"""
+    journal = PlayJournal(journal_path, fsync_interval=60)
+    for _ in range(5):
+        journal.record(["01", "02"])
+        journal.flush()
+    journal.compact()
+    journal.close()
+    with open(journal_path, encoding="utf-8") as file:
+        assert sorted(file.read().splitlines()) == ["01,5", "02,5"]
+
+def test_torn_line_is_skipped(journal_path):
+    """Test a line cut short by a crash does not corrupt later plays"""
+    with open(journal_path, "w", encoding="utf-8") as file:
+        file.write("01,2\n02,")
+    journal = PlayJournal(journal_path, fsync_interval=60)
+    journal.record(["03"])
+    journal.close()
+    journal = PlayJournal(journal_path, fsync_interval=60)
+    assert journal.play_count("01") == 2
+    assert journal.play_count("02") == 0
+    assert journal.play_count("03") == 1
+    journal.close()
+
+def test_play_counts_survive_reload(journal_path):
+    """Test play counts recorded through track_library survive reloading"""
+    lib.load_library("music.csv")
+    journal = PlayJournal(journal_path, fsync_interval=60)
+    lib.attach_play_journal(journal)
+    try:
+        lib.increment_play_counts(["01", "02", "01", "99"])
+        assert lib.get_play_count("01") == 2
+        lib.load_library("music.csv")
+        assert lib.get_play_count("01") == 2
+        assert lib.get_play_count("02") == 1
+        assert lib.get_play_count("03") == 0
+    finally:
+        lib.attach_play_journal(None)
+        journal.close()
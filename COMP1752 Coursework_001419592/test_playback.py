@@ -0,0 +1,163 @@
+# Unit Tests for the playback engine
+# Tests cover playing a queue in order, pausing and seeking, skipping tracks without audio files
+# and counting plays only for tracks that played to the end
+# A fake audio output stands in for pygame.mixer, which needs a sound card
+
+import os
+import subprocess
+import sys
+import pytest
+from playback import PlaybackEngine, find_audio
+from track_library import TrackLibrary
+
+class FakeOutput:
+    """Audio output that plays until the test marks the current file as finished"""
+    def __init__(self):
+        self.played = []
+        self.paused = False
+        self.finished = False
+        self.start = 0.0
+        self.closed = False
+
+    def play(self, path, start=0.0):
+        self.played.append(path)
+        self.finished = False
+        self.start = start
+
+    def seek(self, seconds):
+        self.start = seconds
+        self.paused = False
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+    def stop(self):
+        self.finished = True
+
+    def position(self):
+        return self.start
+
+    def busy(self):
+        return not self.finished and not self.paused
+
+    def close(self):
+        self.closed = True
+
+def make_engine(tmp_path, names=("01.ogg", "02.wav")):
+    """Create an engine with three tracks, audio files for some of them and a recording subscriber"""
+    for name in names:
+        (tmp_path / name).write_bytes(b"")
+    library = TrackLibrary()
+    for index in range(3):
+        library.add_track(f"Song {index}", "Artist")
+    output = FakeOutput()
+    engine = PlaybackEngine(library=library, audio_dir=str(tmp_path), output=lambda: output, poll_interval=60)
+    reports = []
+    engine.subscribe(lambda *report: reports.append(report))
+    return engine, library, output, reports
+
+def test_find_audio(tmp_path):
+    """Test audio files are found by track key with any supported extension"""
+    (tmp_path / "01.mp3").write_bytes(b"")
+    assert find_audio("01", str(tmp_path)) == str(tmp_path / "01.mp3")
+    assert find_audio("02", str(tmp_path)) is None
+
+def test_plays_queue_and_counts_completed_tracks(tmp_path):
+    """Test tracks play in order, missing files are skipped and only finished tracks count as plays"""
+    engine, library, output, reports = make_engine(tmp_path)
+    engine.play(["01", "03", "02"])
+    assert engine.wait(5)
+    assert (engine.state, engine.key) == ("playing", "01")
+    assert library.get_play_count("01") == 0  # Starting a track is not a play
+
+    output.finished = True
+    assert engine.wait(5)  # Polled after the command, which notices the end of the file
+    assert library.get_play_count("01") == 1
+    assert ("missing", "03", 0.0) in reports
+    assert (engine.state, engine.key) == ("playing", "02")
+    assert output.played == [str(tmp_path / "01.ogg"), str(tmp_path / "02.wav")]
+
+    engine.skip()  # Skipped tracks are not counted
+    assert engine.wait(5)
+    assert engine.state == "stopped" and engine.key is None
+    assert library.get_play_count("02") == 0
+    assert engine.completed == 1
+    engine.close()
+    assert output.closed
+
+def test_pause_seek_and_stop(tmp_path):
+    """Test pausing keeps the track, seeking moves the position and stopping clears the queue"""
+    engine, library, output, reports = make_engine(tmp_path)
+    engine.play(["01", "02"])
+    engine.toggle_pause()
+    engine.seek(30)
+    engine.seek(-10, relative=True)
+    assert engine.wait(5)
+    assert engine.state == "paused" and output.paused
+    assert engine.position == 20
+    assert reports[-1] == ("paused", "01", 20)
+
+    engine.resume()
+    engine.stop()
+    assert engine.wait(5)
+    assert engine.state == "stopped" and not engine.queue
+    assert library.get_play_count("01") == 0
+    engine.close()
+
+def test_output_error(tmp_path):
+    """Test an audio output that cannot be opened is reported once and commands are ignored"""
+    def broken_output():
+        raise ImportError("No module named 'pygame'")
+    engine = PlaybackEngine(library=TrackLibrary(), audio_dir=str(tmp_path), output=broken_output)
+    reports = []
+    engine.subscribe(lambda *report: reports.append(report))
+    engine.play(["01"])
+    engine.pause()
+    assert engine.wait(5)
+    assert reports == [("error", None, 0.0)]
+    assert "pygame" in engine.error
+    engine.close()
+
+# Plays a track that never ends inside a real Tcl event loop and closes the engine from a Tk
+# callback that keeps the loop busy; the playback thread used to block in after() until
+# close() gave up waiting for it
+TCL_CLOSE_SCRIPT = """
+import sys, time, tkinter
+from playback import PlaybackEngine
+from track_library import TrackLibrary
+class BusyOutput:
+    closed = False
+    def play(self, path, start=0.0): pass
+    def stop(self): pass
+    def position(self): return 1.0
+    def busy(self): return True
+    def close(self): self.closed = True
+tcl = tkinter.Tcl()
+library = TrackLibrary()
+library.add_track("Song", "Artist")
+output = BusyOutput()
+engine = PlaybackEngine(tcl, library, audio_dir=sys.argv[1], output=lambda: output, poll_interval=0.001)
+reports = []
+engine.subscribe(lambda *report: reports.append(report))
+def close():
+    time.sleep(0.1)  # Other work on the Tk thread first, as in JukeBox.on_close
+    start = time.perf_counter()
+    engine.close()
+    print(output.closed, time.perf_counter() - start < 0.5, reports[0][:2] == ("playing", "01"))
+    tcl.quit()
+engine.play(["01"])
+tcl.after(200, close)
+tcl.mainloop(-1)  # Keep dispatching without any windows
+"""
+
+def test_close_in_tcl_main_loop(tmp_path):
+    """Test close() ends the playback thread and closes the output while a real Tcl main loop is blocked"""
+    pytest.importorskip("tkinter")
+    (tmp_path / "01.ogg").write_bytes(b"")
+    result = subprocess.run([sys.executable, "-c", TCL_CLOSE_SCRIPT, str(tmp_path)], capture_output=True,
+                            text=True, timeout=30, cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["True", "True", "True"]
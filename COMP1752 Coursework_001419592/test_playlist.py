@@ -0,0 +1,176 @@
+# Unit Tests for the playlist model
+# Tests cover membership and duplicate checks, bulk add, remove and reorder,
+# saving changes to the log and replaying it on load, and coalesced background autosaves
+
+import os
+import subprocess
+import sys
+import pytest
+from playlist import Playlist, PlaylistAutosave, log_path
+
+def test_bulk_operations():
+    """Test adding skips duplicates, removing and moving work on several entries at once"""
+    playlist = Playlist([("01", True), ("02", False), ("01", False)])
+    assert list(playlist) == [("01", True), ("02", False)]
+    assert playlist.add(["03", "01", "04", "05"]) == ["01"]
+    assert "04" in playlist and len(playlist) == 5
+    assert playlist.remove_at([0, 3]) == ["01", "04"]
+    assert "01" not in playlist
+    assert playlist.move([2], 0) == [0]
+    assert playlist.keys == ["05", "02", "03"]
+    assert playlist.move([0, 1], 1) == [1, 2]
+    assert playlist.keys == ["03", "05", "02"]
+    assert playlist.toggle(2) is True
+    assert playlist.enabled_keys() == ["03", "05", "02"]
+
+def test_save_appends_to_log(tmp_path):
+    """Test small changes are appended to the log and replayed on load"""
+    path = str(tmp_path / "list1.csv")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("01,1\n02,0\n03\n")
+    playlist = Playlist.load(path)
+    assert list(playlist) == [("01", True), ("02", False), ("03", True)]
+    playlist.add(["04"])
+    playlist.remove(["01"])
+    playlist.toggle(playlist.index("02"))
+    size = os.path.getsize(path)
+    assert playlist.save() == os.path.getsize(log_path(path))
+    assert os.path.getsize(path) == size  # Not rewritten
+    assert not playlist.dirty and playlist.save() == 0
+
+    playlist.remove(["04"])
+    playlist.add(["04", "01"], enabled=False)  # Added back, now at the end
+    playlist.save()
+    assert list(Playlist.load(path)) == [("02", True), ("03", True), ("04", False), ("01", False)]
+
+def test_reorder_and_big_logs_rewrite(tmp_path):
+    """Test reordering or an outgrown log rewrites the playlist file and drops the log"""
+    path = str(tmp_path / "list1.csv")
+    playlist = Playlist([("01", True), ("02", True)])
+    playlist.save(path)  # New file
+    assert not os.path.exists(log_path(path))
+    playlist.add(["03"])
+    playlist.save()
+    assert os.path.exists(log_path(path))
+    playlist.move([2], 0)
+    playlist.save()
+    assert not os.path.exists(log_path(path))
+    with open(path, encoding="utf-8") as file:
+        assert file.read().split() == ["03,1", "01,1", "02,1"]
+
+    for _ in range(200):
+        playlist.toggle(0)
+        playlist.toggle(0)
+    playlist.save()
+    assert not os.path.exists(log_path(path))  # 400 log rows would outgrow a 3-track playlist
+    assert list(Playlist.load(path)) == [("03", True), ("01", True), ("02", True)]
+
+def test_log_left_by_interrupted_rewrite(tmp_path):
+    """Test a log that outlived a rewrite (a crash before it was dropped) is ignored and dropped by the next save"""
+    path = str(tmp_path / "list1.csv")
+    playlist = Playlist([("01", True), ("02", True)])
+    playlist.save(path)
+    playlist.remove(["02"])
+    playlist.save()
+    with open(log_path(path), encoding="utf-8") as file:
+        stale_log = file.read()
+    playlist.add(["02"])
+    playlist.move([1], 0)
+    playlist.save()  # Rewrites the file as 02, 01 and drops the log
+    with open(log_path(path), "w", encoding="utf-8") as file:
+        file.write(stale_log)  # As if the process died before dropping it
+
+    loaded = Playlist.load(path)
+    assert list(loaded) == [("02", True), ("01", True)]  # Replaying "-,02" would lose track 02
+    assert loaded.dirty
+    loaded.save()
+    assert not os.path.exists(log_path(path))
+    assert list(Playlist.load(path)) == [("02", True), ("01", True)]
+
+class FakeWidget:
+    """Stand-in for a Tk widget whose timers and after() callbacks run when the test calls run()"""
+    def __init__(self):
+        self.timers = {}
+
+    def after(self, delay, function, *args):
+        timer = f"after#{len(self.timers)}"
+        self.timers[timer] = (function, args)
+        return timer
+
+    def after_cancel(self, timer):
+        self.timers.pop(timer, None)
+
+    def run(self):
+        while self.timers:
+            function, args = self.timers.pop(next(iter(self.timers)))
+            function(*args)
+
+def test_autosave_coalesces_changes(tmp_path):
+    """Test changes within one window are saved with one write and flush saves waiting changes"""
+    path = str(tmp_path / "list1.csv")
+    widget = FakeWidget()
+    autosave = PlaylistAutosave(widget)
+    playlist = Playlist.load(path)
+    for key in ("01", "02", "03"):
+        playlist.add([key])
+        autosave.changed(playlist)
+    playlist.toggle(0)
+    autosave.changed(playlist)
+    assert len(widget.timers) == 1 and not os.path.exists(path)  # One window for all changes
+    widget.run()
+    autosave.flush()
+    assert list(Playlist.load(path)) == [("01", False), ("02", True), ("03", True)]
+
+    playlist.remove(["02"])
+    autosave.changed(playlist)
+    autosave.close()  # Flushes without waiting for the window
+    assert list(Playlist.load(path)) == [("01", False), ("03", True)]
+    assert not playlist.dirty and not widget.timers
+    assert autosave.stats() == {"changes": 5, "writes": 2, "writes_avoided": 3, "errors": 0,
+                                "bytes_written": os.path.getsize(path) + os.path.getsize(log_path(path))}
+
+def test_autosave_reports_errors(tmp_path):
+    """Test a failed write is reported on the widget's thread and the next save rewrites the file"""
+    widget = FakeWidget()
+    errors = []
+    autosave = PlaylistAutosave(widget, on_error=errors.append)
+    playlist = Playlist.load(str(tmp_path / "missing" / "list1.csv"))
+    playlist.add(["01"])
+    autosave.changed(playlist)
+    autosave.flush()
+    widget.run()
+    assert autosave.errors == 1 and isinstance(errors[0], OSError)
+    assert playlist.dirty
+    autosave.close()
+
+# Runs an autosave inside a real Tcl event loop; flush() used to deadlock there when the
+# writer thread called after() while the Tk thread waited for it
+TCL_FLUSH_SCRIPT = """
+import sys, tkinter
+from playlist import Playlist, PlaylistAutosave
+tcl = tkinter.Tcl()
+playlist = Playlist.load(sys.argv[1])
+autosave = PlaylistAutosave(tcl, delay_ms=10_000)
+def edit():
+    for key in ("01", "02", "03"):
+        playlist.add([key])
+        autosave.changed(playlist)
+        autosave.save_now()  # Each write runs while the next change is made
+    playlist.add(["04"])
+    autosave.changed(playlist)
+    autosave.close()
+    print(playlist.dirty)
+    tcl.quit()
+tcl.after(0, edit)
+tcl.mainloop(-1)  # Keep dispatching without any windows
+"""
+
+def test_autosave_flush_in_tcl_main_loop(tmp_path):
+    """Test flush and close do not wait for the Tk thread while a real Tcl main loop is running"""
+    pytest.importorskip("tkinter")
+    path = str(tmp_path / "list1.csv")
+    result = subprocess.run([sys.executable, "-c", TCL_FLUSH_SCRIPT, path], capture_output=True, text=True,
+                            timeout=30, cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["False"]
+    assert [key for key, enabled in Playlist.load(path)] == ["01", "02", "03", "04"]
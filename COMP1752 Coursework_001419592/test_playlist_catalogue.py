@@ -0,0 +1,118 @@
+# Unit Tests for the playlist catalogue
+# Tests cover scanning the playlist directory, serving recently used playlists from memory,
+# evicting the least recently used ones, moving legacy playlists and noticing playlists changed by other programs
+
+import os
+from playlist import Playlist, log_path
+from playlist_catalogue import PlaylistCatalogue, move_legacy_playlists
+
+def write_playlist_file(path, text):
+    """Write a playlist file and make sure its directory looks modified"""
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(text)
+    directory = os.path.dirname(path)
+    stat = os.stat(directory)
+    os.utime(directory, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))  # Coarse clocks may not tick
+
+def test_scan_and_lru(tmp_path):
+    """Test the index lists the playlist directory only and recently used playlists are not read again"""
+    directory = tmp_path / "playlists"
+    assert PlaylistCatalogue(str(directory)).names == []  # Created when missing
+    (tmp_path / "music.csv").write_text("id,name,artist,rating\n", encoding="utf-8")  # Not in the directory
+    for name in ("list1.csv", "list2.csv", "rock.csv", "list1.csv.log", "notes.txt"):
+        (directory / name).write_text("01,1\n", encoding="utf-8")
+    catalogue = PlaylistCatalogue(str(directory), capacity=2)
+    assert catalogue.names == ["list1", "list2", "rock"]
+
+    first = catalogue.get("list1")
+    assert catalogue.get("list1") is first
+    catalogue.get("list2")
+    catalogue.get("rock")  # Evicts list1, the least recently used
+    assert catalogue.get("list2") is not None and catalogue.get("list1") is not first
+    assert catalogue.stats() == {"hits": 2, "misses": 4, "cached": 2, "playlists": 3}
+    assert len(catalogue.get("new")) == 0  # No file yet
+
+def test_eviction_keeps_unsaved_playlists(tmp_path):
+    """Test playlists with unsaved changes or a save in flight stay cached past capacity until saved"""
+    catalogue = PlaylistCatalogue(str(tmp_path), capacity=2)
+    edited = catalogue.get("list1")
+    edited.add(["01"])  # Unsaved
+    job = edited.save_job()  # Being saved by the autosave
+    edited.add(["02"])
+    for name in ("list2", "list3", "list4"):
+        catalogue.get(name)
+    assert catalogue.get("list1") is edited
+    assert catalogue.stats()["cached"] == 2  # list1 and the most recent playlist
+
+    job()
+    edited.saving -= 1  # As the autosave does when the write has finished
+    assert catalogue.get("list1") is edited
+    edited.save()
+    catalogue.file_saved(edited.path)
+    catalogue.get("list2")
+    catalogue.get("list3")
+    assert catalogue.get("list1") is not edited  # Saved, so it could be dropped
+    assert catalogue.get("list1").keys == ["01", "02"]
+
+def test_move_legacy_playlists(tmp_path):
+    """Test listN.csv playlists and their logs move into the playlist directory without overwriting"""
+    directory = tmp_path / "playlists"
+    directory.mkdir()
+    (directory / "list2.csv").write_text("05,1\n", encoding="utf-8")
+    for name in ("list1.csv", "list1.csv.log", "list2.csv", "music.csv", "export.csv"):
+        (tmp_path / name).write_text("01,1\n", encoding="utf-8")
+    assert move_legacy_playlists(str(directory), str(tmp_path)) == ["list1"]
+    assert sorted(os.listdir(directory)) == ["list1.csv", "list1.csv.log", "list2.csv"]
+    assert (directory / "list2.csv").read_text(encoding="utf-8") == "05,1\n"
+    assert sorted(os.listdir(tmp_path)) == ["export.csv", "list2.csv", "music.csv", "playlists"]
+
+def test_check_notices_changes(tmp_path):
+    """Test added playlists and files changed by other programs are found, but not own saves"""
+    write_playlist_file(str(tmp_path / "list1.csv"), "01,1\n")
+    catalogue = PlaylistCatalogue(str(tmp_path))
+    playlist = catalogue.get("list1")
+    assert catalogue.check() == (False, [])
+
+    playlist.add(["02"])
+    playlist.save()
+    catalogue.file_saved(playlist.path)
+    assert catalogue.check() == (False, [])  # Own save
+
+    write_playlist_file(str(tmp_path / "list2.csv"), "03,1\n")
+    with open(tmp_path / "list1.csv", "a", encoding="utf-8") as file:
+        file.write("04,1\n")  # Changed by another program
+    assert catalogue.check() == (True, ["list1"])
+    assert catalogue.names == ["list1", "list2"]
+    assert "04" in catalogue.get("list1").keys  # Read again
+
+    edited = catalogue.get("list2")
+    edited.add(["05"])  # Unsaved changes are never dropped
+    write_playlist_file(str(tmp_path / "list2.csv"), "06,1\n")
+    assert catalogue.check() == (False, [])
+    assert catalogue.get("list2") is edited
+
+def test_watch_reports_changes(tmp_path):
+    """Test watch() reports changes and schedules the next check until stopped"""
+    class Widget:
+        def __init__(self):
+            self.timers = []
+
+        def after(self, delay, function, *args):
+            self.timers.append((function, args))
+            return len(self.timers)
+
+        def after_cancel(self, timer):
+            self.timers.clear()
+
+    widget = Widget()
+    reports = []
+    catalogue = PlaylistCatalogue(str(tmp_path), on_change=lambda *report: reports.append(report))
+    catalogue.watch(widget)
+    write_playlist_file(str(tmp_path / "list1.csv"), "01,1\n")
+    function, args = widget.timers.pop()
+    function(*args)
+    assert reports == [(True, [])]
+    assert len(widget.timers) == 1
+    catalogue.stop()
+    assert widget.timers == []
+    assert isinstance(catalogue.get("list1"), Playlist)
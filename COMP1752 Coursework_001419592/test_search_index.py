@@ -0,0 +1,74 @@
+# Unit Tests for the track search index
+# Tests cover substring, prefix and word searches and keeping the index up to date
+
+import pytest
+import track_library as lib
+from search_index import SearchIndex
+
+@pytest.fixture
+def index():
+    """Fixture to create an index with a few tracks"""
+    index = SearchIndex()
+    index.add("01", "Bad Guy", "Billie Eilish")
+    index.add("02", "bad guy", "Billie Eilish")
+    index.add("03", "Badlands", "Halsey")
+    index.add("04", "Shake It Off", "Taylor Swift")
+    return index
+
+def test_substring_search(index):
+    """Test substring search ignores case and word boundaries"""
+    assert index.search("bad") == {"01", "02", "03"}
+    assert index.search("DLAN") == {"03"}
+    assert index.search("ke it o") == {"04"}
+    assert index.search("ad") == {"01", "02", "03"}  # Shorter than an n-gram
+    assert index.search("xyz") == set()
+    assert index.search("eilish", field="artist") == {"01", "02"}
+
+def test_short_substring_search(index):
+    """Test terms shorter than an n-gram are found through their own postings, not a scan"""
+    assert index.search("k") == {"04"}
+    assert index.search("y") == {"01", "02"}
+    assert index.search("y ") == set()
+    assert index.search("") == {"01", "02", "03", "04"}
+    assert "k" in index._fields["name"].values_by_gram
+    index.remove("04")
+    assert index.search("k") == set()
+    assert "k" not in index._fields["name"].values_by_gram
+
+def test_substring_search_checks_order(index):
+    """Test that n-grams appearing out of order do not match"""
+    assert index.search("guy bad") == set()
+
+def test_prefix_and_word_search(index):
+    """Test prefix search on words and whole word search"""
+    assert index.search("ba", match="prefix") == {"01", "02", "03"}
+    assert index.search("of", match="prefix") == {"04"}
+    assert index.search("bad", match="words") == {"01", "02"}
+    assert index.search("guy bad", match="words") == {"01", "02"}
+    assert index.search("sw", field="artist", match="prefix") == {"04"}
+    with pytest.raises(ValueError):
+        index.search("bad", match="fuzzy")
+
+def test_update_and_remove(index):
+    """Test the index follows edits and deletes"""
+    index.update("03", "Good Lands", "Halsey")
+    assert index.search("badlands") == set()
+    assert index.search("good", match="prefix") == {"03"}
+    index.remove("01")
+    assert index.search("bad guy") == {"02"}
+    index.remove("02")
+    assert index.search("bad") == set()
+    assert index.search("billie", field="artist", match="prefix") == set()
+
+def test_search_tracks():
+    """Test searching the loaded library"""
+    lib.load_library("music.csv")
+    assert lib.search_tracks("bad guy") == ["09", "35"]
+    assert "01" in lib.search_tracks("nirvana", field="artist")
+    key = lib.add_track("Bad Moon Rising", "Creedence Clearwater Revival", 4)
+    assert key in lib.search_tracks("bad", match="prefix")
+    lib.update_track(key, name="Fortunate Son")
+    assert lib.search_tracks("fortunate") == [key]
+    lib.remove_track(key)
+    assert lib.search_tracks("fortunate") == []
+    assert lib.get_name(key) is None
@@ -0,0 +1,110 @@
+# Unit Tests for the SQLite storage backend
+# Tests cover importing the CSV files, loading into track_library and single-row updates
+
+import csv
+import pytest
+import track_library as lib
+from storage import SqliteStorage, import_csv, export_csv, rewrite_csv, append_patch, patch_path, has_id_column
+
+@pytest.fixture
+def storage(tmp_path):
+    """Fixture to create a database imported from music.csv and the playlists"""
+    storage = SqliteStorage(str(tmp_path / "music.db"))
+    import_csv(storage, "music.csv", "playlists")
+    yield storage
+    lib.load_library("music.csv")  # Detach the storage from track_library
+    storage.close()
+
+def test_import(storage):
+    """Test tracks and playlists are imported with their IDs"""
+    tracks = list(storage.load_tracks())
+    assert tracks[0] == (1, "Smells Like Teen Spirit", "Nirvana", 5, 0)
+    assert (43, "Epilogue", "YOASOBI", 0, 0) in tracks
+    assert "list1" in storage.playlist_names()
+    with open("playlists/list1.csv", encoding="utf-8") as file:
+        first = next(csv.reader(file))
+    assert storage.load_playlist("list1")[0] == (int(first[0]), first[1] == "1")
+
+def test_wal_mode(storage):
+    """Test the database runs in WAL mode"""
+    assert storage.connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+def test_search(storage):
+    """Test searching by substring and prefix"""
+    assert storage.search("bad guy") == [9, 35]
+    assert storage.search("nirv", field="artist", match="prefix") == [1]
+    assert storage.search("100%") == []
+    with pytest.raises(ValueError):
+        storage.search("x", field="rating")
+
+def test_track_library_writes_through(storage):
+    """Test changes made through track_library are stored one row at a time"""
+    lib.load_storage(storage)
+    assert lib.get_name("01") == "Smells Like Teen Spirit"
+    lib.set_rating("01", 2)
+    lib.increment_play_counts(["01", "01"])
+    lib.update_track("02", name="Downtown Funk")
+    key = lib.add_track("New Song", "New Artist", 3)
+    lib.remove_track("03")
+
+    lib.load_storage(storage)  # Reload from the database
+    assert lib.get_rating("01") == 2
+    assert lib.get_play_count("01") == 2
+    assert lib.get_name("02") == "Downtown Funk"
+    assert lib.get_name(key) == "New Song"
+    assert lib.get_name("03") is None
+    assert lib.get_name("04") == "Viva La Vida"  # IDs are not renumbered
+
+def test_export(storage, tmp_path):
+    """Test exporting back to the music.csv format"""
+    path = tmp_path / "export.csv"
+    export_csv(storage, path)
+    lib.load_library(path)
+    assert lib.get_name("01") == "Smells Like Teen Spirit"
+    assert lib.get_rating("43") == 0
+
+def test_rewrite_csv(tmp_path):
+    """Test a rewrite replaces the file and drops the patch without leaving a temporary file"""
+    path = str(tmp_path / "music.csv")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("name,artist,rating\nOld,Artist,1\n")
+    assert not has_id_column(path)
+    append_patch(path, [["01", "Edited", "Artist", "2"]])
+    rewrite_csv(path, [("01", "Song A", "Artist A", "3"), ("07", "Song B", "Artist B", "4")])
+    with open(path, "r", encoding="utf-8") as file:
+        assert list(csv.reader(file)) == [["id", "name", "artist", "rating"], ["01", "Song A", "Artist A", "3"],
+                                          ["07", "Song B", "Artist B", "4"]]
+    assert has_id_column(path)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["music.csv"]
+    assert not (tmp_path / patch_path("music.csv")).exists()
+
+def test_patch_left_by_interrupted_rewrite(tmp_path):
+    """Test a patch still present after a rewrite (a crash before it was dropped) changes nothing on load"""
+    path = str(tmp_path / "music.csv")
+    edits = [["01", "Song A", "Artist A", "3"], ["02"]]
+    rewrite_csv(path, [("01", "Song A", "Artist A", "3"), ("03", "Song C", "Artist C", "5")])
+    append_patch(path, edits)  # The edits the rewrite already contains
+    with lib.TrackLibrary(path) as library:
+        library.load_library()
+        assert library.get_keys() == ["01", "03"]
+        assert library.get_track("01") == ("01", "Song A", "Artist A", 3, 0)
+
+def test_deleted_ids_not_reused(tmp_path):
+    """Test the ID of a deleted last track is not handed out again after a rewrite or in SQLite"""
+    path = str(tmp_path / "music.csv")
+    rewrite_csv(path, [("01", "Song A", "Artist A", "3")], next_id=3)  # Track 02 was deleted
+    with lib.TrackLibrary(path) as library:
+        assert library.load_library() == ["01"]
+        assert library.next_track_id() == 3
+        assert library.add_track("Song C", "Artist C") == "03"
+
+    database = SqliteStorage(str(tmp_path / "music.db"))
+    import_csv(database, path, str(tmp_path))
+    assert database.next_id() == 3
+    database.delete_track(database.add_track("Song C", "Artist C"))
+    assert database.add_track("Song D", "Artist D") == 4
+    export_csv(database, path)
+    with lib.TrackLibrary(path) as library:
+        library.load_library()
+        assert library.next_track_id() == 5
+    database.close()
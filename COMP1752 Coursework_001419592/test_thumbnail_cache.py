@@ -0,0 +1,133 @@
+# Unit Tests for the thumbnail cache
+# Tests cover fitting thumbnails in their box, the on-disk cache keyed by path and modification time
+# and background loading with superseded requests and prefetching
+# Creating PhotoImages needs a display, so PIL images stand in for them
+
+import io
+import os
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+from thumbnail_cache import ThumbnailCache, ThumbnailLoader, fit_size
+
+@pytest.fixture
+def artwork(tmp_path):
+    """Fixture to create a 300x150 source image"""
+    path = str(tmp_path / "01.gif")
+    Image.new("RGB", (300, 150), "red").save(path)
+    return path
+
+def test_fit_size():
+    """Test thumbnails keep their aspect ratio inside the box"""
+    assert fit_size(300, 150) == (120, 60)
+    assert fit_size(150, 300) == (60, 120)
+    assert fit_size(500, 500) == (120, 120)
+    assert fit_size(1000, 1, size=10) == (10, 1)  # Never zero pixels high
+
+def test_disk_cache(artwork, tmp_path):
+    """Test cold loads resize once and later loads read the thumbnail from disk"""
+    cache = ThumbnailCache(str(tmp_path / "thumbnails"))
+    mtime = os.stat(artwork).st_mtime_ns
+    assert cache.load_thumbnail(artwork, mtime).size == (120, 60)
+    assert (cache.misses, cache.disk_hits) == (1, 0)
+
+    assert ThumbnailCache(str(tmp_path / "thumbnails")).load_thumbnail(artwork, mtime).size == (120, 60)
+    assert cache.load_thumbnail(artwork, mtime).size == (120, 60)
+    assert (cache.misses, cache.disk_hits) == (1, 1)
+
+def test_changed_source_replaces_thumbnail(artwork, tmp_path):
+    """Test a new modification time resizes again and removes the old thumbnail"""
+    cache = ThumbnailCache(str(tmp_path / "thumbnails"))
+    cache.load_thumbnail(artwork, 1)
+    Image.new("RGB", (150, 300), "blue").save(artwork)
+    assert cache.load_thumbnail(artwork, 2).size == (60, 120)
+    assert cache.misses == 2
+    assert os.listdir(cache.cache_dir) == [os.path.basename(cache.thumbnail_path(artwork, 2))]
+
+class FakeWidget:
+    """Stand-in for a Tk widget that queues after() callbacks until run() is called"""
+    def __init__(self):
+        self.queue = []
+        self.calls = 0
+
+    def after(self, delay, function, *args):
+        self.calls += 1
+        self.queue.append((function, args))
+        return f"after#{self.calls}"
+
+    def after_cancel(self, timer):
+        pass
+
+    def run(self):
+        while self.queue:
+            function, args = self.queue.pop(0)
+            function(*args)
+
+class PlainCache(ThumbnailCache):
+    """ThumbnailCache that keeps PIL images instead of PhotoImages, which need a display"""
+    def put(self, key, image):
+        self._photos[key] = (image, 0)
+        return image
+
+def test_loader_supersedes_and_prefetches(artwork, tmp_path):
+    """Test only the latest show() is displayed and prefetched thumbnails are served from memory"""
+    other = str(tmp_path / "02.gif")
+    Image.new("RGB", (150, 300), "blue").save(other)
+    widget = FakeWidget()
+    loader = ThumbnailLoader(PlainCache(str(tmp_path / "thumbnails")), widget)
+    shown = []
+    assert not loader.show(artwork, shown.append)
+    assert not loader.show(other, shown.append)  # Supersedes the first request
+    loader.prefetch([artwork, str(tmp_path / "missing.gif")])
+    loader.executor.shutdown(wait=True)
+    widget.run()
+    assert [image.size for image in shown] == [(60, 120)]
+    assert loader.show(artwork, shown.append)  # Cached by the first request or the prefetch
+    assert shown[-1].size == (120, 60)
+    assert loader.show(str(tmp_path / "missing.gif"), shown.append)
+    assert shown[-1] is None
+
+def test_loader_shows_no_image_for_rejected_artwork(artwork, tmp_path):
+    """Test artwork that PIL refuses to decode is shown as no image instead of staying on Loading..."""
+    class RejectingCache(PlainCache):
+        def load_thumbnail(self, path, mtime):
+            raise Image.DecompressionBombError("too many pixels")
+
+    widget = FakeWidget()
+    loader = ThumbnailLoader(RejectingCache(str(tmp_path / "thumbnails")), widget)
+    shown = []
+    assert not loader.show(artwork, shown.append)
+    loader.executor.shutdown(wait=True)
+    widget.run()
+    assert shown == [None]
+
+def test_loader_polls_once_for_many_thumbnails(tmp_path):
+    """Test decoded thumbnails are picked up by one Tk-thread poll instead of one callback each"""
+    paths = []
+    for index in range(10):
+        paths.append(str(tmp_path / f"{index:02d}.gif"))
+        Image.new("RGB", (30, 30), "green").save(paths[-1])
+    widget = FakeWidget()
+    loader = ThumbnailLoader(PlainCache(str(tmp_path / "thumbnails")), widget)
+    loader.prefetch(paths)
+    loader.executor.shutdown(wait=True)
+    assert widget.calls == 1
+    widget.run()
+    assert widget.calls == 1 and not loader.prefetched
+    assert all(loader.cache.cached(loader.cache.key_of(path)) is not None for path in paths)
+
+def test_pack_artwork(tmp_path):
+    """Test artwork is decoded from a pack without holding on to its memory and discarded artwork is not served"""
+    from artwork_pack import ArtworkPack, write_pack
+    buffer = io.BytesIO()
+    Image.new("RGB", (120, 60), "blue").save(buffer, format="PNG")
+    write_pack(str(tmp_path / "artwork.pack"), [("01", buffer.getvalue())])
+    pack = ArtworkPack(str(tmp_path / "artwork.pack"))
+    cache = ThumbnailCache(str(tmp_path / "thumbnails"), pack=pack)
+    key = cache.key_of("images/01.gif")
+    assert key == ("images/01.gif", pack.mtime)
+    assert cache.load_thumbnail(*key).size == (120, 60)
+    assert cache.pack_hits == 1
+    cache.discard(["images/01.gif"])
+    assert cache.key_of("images/01.gif") is None  # No loose file either
+    pack.close()  # No views of the mapped file are left
@@ -4,6 +4,7 @@
 
 import pytest
 import track_library as lib
+import storage
 import csv
 import os
 
@@ -102,4 +103,225 @@ def test_track_duplicates():
     
     assert lib.get_name("44") == "Epilogue"
     assert lib.get_artist("44") == "YOASOBI"
-    assert lib.get_rating("44") == 1
\ No newline at end of file
+    assert lib.get_rating("44") == 1
+
+def test_find_duplicates():
+    """Test the duplicate index ignores case and follows adds, updates and removals"""
+    lib.load_library("music.csv")
+    assert lib.find_duplicates("bad guy", "billie eilish") == ["09", "35"]
+    assert lib.find_duplicates(" EPILOGUE ", "yoasobi") == ["43", "44"]
+    assert lib.find_duplicates("No Such Song", "Nobody") == []
+
+    key = lib.add_track("No Such Song", "Nobody", 2)
+    assert lib.find_duplicates("no such song", "nobody") == [key]
+    lib.update_track("44", name="Prologue")
+    assert lib.find_duplicates("Epilogue", "YOASOBI") == ["43"]
+    assert lib.find_duplicates("Prologue", "YOASOBI") == ["44"]
+    lib.remove_track("09")
+    assert lib.find_duplicates("Bad Guy", "Billie Eilish") == ["35"]
+    lib.load_library("music.csv")
+
+def write_csv(path, rows):
+    """Write a music CSV file with a header and the given rows"""
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["name", "artist", "rating"])
+        writer.writerows(rows)
+
+def append_csv(path, rows):
+    """Append rows to an existing music CSV file"""
+    with open(path, "a", newline="", encoding="utf-8") as file:
+        csv.writer(file).writerows(rows)
+
+def test_incremental_load_appended_rows(tmp_path):
+    """Test incremental load parses only appended rows"""
+    path = tmp_path / "music.csv"
+    write_csv(path, [["Song A", "Artist A", "3"], ["Song B", "Artist B", "4"]])
+    assert lib.load_library(path) == ["01", "02"]
+    lib.increment_play_count("01")
+
+    append_csv(path, [["Song C", "Artist C", "5"]])
+    assert lib.load_library(path, incremental=True) == ["03"]
+    assert lib.get_name("03") == "Song C"
+    assert lib.get_play_count("01") == 1  # Existing tracks are kept
+    assert lib.load_library(path, incremental=True) == []  # Nothing appended
+
+def test_incremental_load_rewrite_falls_back(tmp_path):
+    """Test incremental load reloads everything when the file was rewritten"""
+    path = tmp_path / "music.csv"
+    write_csv(path, [["Song A", "Artist A", "3"], ["Song B", "Artist B", "4"]])
+    lib.load_library(path)
+    lib.increment_play_count("01")
+
+    write_csv(path, [["Song X", "Artist X", "1"]])
+    assert lib.load_library(path, incremental=True) == ["01"]
+    assert lib.get_name("01") == "Song X"
+    assert lib.get_play_count("01") == 0
+    assert lib.get_name("02") is None
+
+def test_load_applies_patch(tmp_path):
+    """Test edits saved to the patch file are applied on full and incremental loads"""
+    path = tmp_path / "music.csv"
+    write_csv(path, [["Song A", "Artist A", "3"], ["Song B", "Artist B", "4"]])
+    storage.append_patch(str(path), [["02", "Song B2", "Artist B", "1"]])
+    lib.load_library(path)
+    assert lib.get_name("02") == "Song B2"
+    assert lib.get_rating("02") == 1
+
+    storage.append_patch(str(path), [["01", "Song A", "Artist A", "5"], ["02", "Song B3", "Artist B", "2"]])
+    assert lib.load_library(path, incremental=True) == []
+    assert lib.get_rating("01") == 5
+    assert lib.get_name("02") == "Song B3"  # Later entries win
+    assert lib.search_tracks("b3") == ["02"]
+
+def test_stable_ids(tmp_path):
+    """Test IDs are read from the id column and deleted IDs leave gaps instead of renumbering"""
+    path = tmp_path / "music.csv"
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        csv.writer(file).writerows([["id", "name", "artist", "rating"], ["01", "Song A", "Artist A", "3"],
+                                    ["05", "Song B", "Artist B", "4"], ["120", "Song C", "Artist C", "5"]])
+    assert lib.load_library(path) == ["01", "05", "120"]
+    assert lib.next_track_id() == 121
+
+    storage.append_patch(str(path), [["05"]])  # Deleted in the Update pane
+    storage.append_csv_rows(str(path), [["121", "Song D", "Artist D", "1"]])
+    assert lib.load_library(path, incremental=True) == ["121"]
+    assert lib.get_name("05") is None
+    assert lib.get_name("120") == "Song C"
+    assert lib.add_track("Song E", "Artist E") == "122"
+    assert lib.get_keys() == ["01", "120", "121", "122"]
+
+def test_iter_library_chunks(tmp_path):
+    """Test streaming load yields the keys in chunks"""
+    path = tmp_path / "music.csv"
+    write_csv(path, [[f"Song {i}", "Artist", "2"] for i in range(5)])
+    chunks = list(lib.iter_library_chunks(path, chunk_size=2))
+    assert chunks == [["01", "02"], ["03", "04"], ["05"]]
+    assert len(lib.library) == 5
+
+def test_iter_tracks():
+    """Test iterating over typed track tuples"""
+    lib.load_library("music.csv")
+    tracks = list(lib.iter_tracks())
+    assert len(tracks) == len(lib.library)
+    assert tracks[0] == ("01", "Smells Like Teen Spirit", "Nirvana", 5, 0)
+    assert lib.get_track("02") == ("02", "Uptown Funk", "Bruno Mars", 4, 0)
+    assert lib.get_track("99") is None
+
+def test_iter_tracks_paged_and_sorted():
+    """Test paging and sorting the track iterator"""
+    lib.load_library("music.csv")
+    page = list(lib.iter_tracks(offset=2, limit=3))
+    assert [track[0] for track in page] == ["03", "04", "05"]
+
+    by_rating = list(lib.iter_tracks(sort_by="rating", reverse=True))
+    assert [track[3] for track in by_rating] == sorted((track[3] for track in by_rating), reverse=True)
+    by_name = [track[1].lower() for track in lib.iter_tracks(sort_by="name", limit=5)]
+    assert by_name == sorted(by_name)
+    assert len(by_name) == 5
+
+def test_subscribe_to_changes():
+    """Test subscribers are told which tracks changed"""
+    lib.load_library("music.csv")
+    changes = []
+    lib.subscribe(changes.append)
+    try:
+        lib.increment_play_count("01")
+        lib.set_rating("02", 1)
+        lib.increment_play_count("99")  # Non-existent track, no notification
+    finally:
+        lib.unsubscribe(changes.append)
+    lib.increment_play_count("01")
+    assert [change.updated for change in changes] == [{"01"}, {"02"}]
+
+def test_changes_are_coalesced():
+    """Test changes made before the next dispatch are delivered as one batch"""
+    lib.load_library("music.csv")
+    scheduled = []
+    changes = []
+    lib.set_dispatcher(scheduled.append)
+    lib.subscribe(changes.append)
+    try:
+        lib.increment_play_count("01")
+        lib.increment_play_count("01")
+        lib.set_rating("02", 3)
+        key = lib.add_track("New Song", "New Artist", 2)
+        lib.update_track(key, rating=4)  # Reported only as added
+        lib.remove_track("03")
+        temporary = lib.add_track("Temporary", "Nobody")
+        lib.remove_track(temporary)  # Added and removed, never reported
+        assert len(scheduled) == 1  # One delivery scheduled for all changes
+        scheduled.pop()()
+    finally:
+        lib.unsubscribe(changes.append)
+        lib.set_dispatcher(None)
+    assert len(changes) == 1
+    assert changes[0].updated == {"01", "02"}
+    assert changes[0].added == {key}
+    assert changes[0].deleted == {"03"}
+    assert not changes[0].reloaded
+
+def test_reload_replaces_other_changes():
+    """Test a reload supersedes the changes recorded before and after it"""
+    lib.load_library("music.csv")
+    scheduled = []
+    changes = []
+    lib.set_dispatcher(scheduled.append)
+    lib.subscribe(changes.append)
+    try:
+        lib.increment_play_count("01")
+        lib.load_library("music.csv")
+        lib.flush_changes()
+    finally:
+        lib.unsubscribe(changes.append)
+        lib.set_dispatcher(None)
+    assert len(changes) == 1
+    assert changes[0].reloaded
+    assert not changes[0].updated and not changes[0].added
+
+def test_libraries_are_independent(tmp_path):
+    """Test libraries opened on different files keep their own tracks, IDs and subscribers"""
+    first_path, second_path = tmp_path / "first.csv", tmp_path / "second.csv"
+    write_csv(first_path, [["Song A", "Artist A", "3"]])
+    write_csv(second_path, [["Song B", "Artist B", "4"], ["Song C", "Artist C", "5"]])
+    changes = []
+    with lib.open_library(first_path) as first, lib.TrackLibrary(second_path) as second:
+        assert second.get_keys() == []  # Nothing is read until the library is loaded
+        assert second.load_library() == ["01", "02"]
+        second.subscribe(changes.append)
+        first.set_rating("01", 1)
+        assert changes == []
+        assert first.get_name("01") == "Song A" and second.get_name("01") == "Song B"
+        assert first.add_track("Song D", "Artist D") == "02"
+        assert second.add_track("Song E", "Artist E") == "03"
+        assert second.search_tracks("song a") == []
+    assert first.get_keys() == [] and second._subscribers == []  # Closed on exit
+
+def test_default_library():
+    """Test the module-level functions follow the default library"""
+    other = lib.TrackLibrary()
+    previous = lib.set_default_library(other)
+    try:
+        assert lib.library is other.library
+        other.add_track("Song A", "Artist A")
+        assert lib.get_name("01") == "Song A"
+    finally:
+        lib.set_default_library(previous)
+    assert lib.default_library() is previous
+
+def test_adopt_loaded_library(tmp_path):
+    """Test a library loaded separately is swapped in with one reload and keeps its load state"""
+    path = tmp_path / "music.csv"
+    write_csv(path, [["Song A", "Artist A", "3"], ["Song B", "Artist B", "4"]])
+    changes = []
+    with lib.TrackLibrary(path) as target:
+        target.subscribe(changes.append)
+        loaded = lib.open_library(path)  # As on the background thread
+        assert changes == [] and target.get_keys() == []
+        target.adopt(loaded)
+        assert len(changes) == 1 and changes[0].reloaded
+        assert target.get_keys() == ["01", "02"] and loaded.get_keys() == []
+        assert target.find_duplicates("song a", "artist a") == ["01"]
+
+        append_csv(path, [["Song C", "Artist C", "5"]])
+        assert target.load_library(incremental=True) == ["03"]  # Resumes where the loaded library stopped
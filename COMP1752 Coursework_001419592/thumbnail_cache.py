@@ -0,0 +1,359 @@
+# Import necessary libraries for caching resized track artwork
+import hashlib  # For naming the thumbnails on disk after their source path
+import io  # For decoding thumbnails read from an artwork pack
+import os  # For file modification times and atomic replacement of thumbnails
+import queue  # For handing decoded thumbnails to the Tk thread
+import threading  # For counting hits and misses from the decoding threads
+from collections import OrderedDict  # For the least recently used order of the memory cache
+from artwork_pack import artwork_name  # For finding artwork in an artwork pack
+
+# Largest width or height of a thumbnail in pixels
+THUMBNAIL_SIZE = 120
+
+# Milliseconds between checks for decoded thumbnails while decoding is running
+DELIVERY_POLL_MS = 20
+
+def fit_size(width, height, size=THUMBNAIL_SIZE):
+    """
+    Get the dimensions of an image scaled to fit a size x size box, keeping its aspect ratio.
+
+    """
+    aspect_ratio = width / height
+    if aspect_ratio > 1:  # Width is greater than height
+        return size, max(1, int(size / aspect_ratio))
+    return max(1, int(size * aspect_ratio)), size  # Height is greater than width
+
+
+class ThumbnailCache:
+    """
+    Two-level cache of track artwork thumbnails.
+    Ready PhotoImages are kept in memory in least recently used order, bounded by their
+    size in bytes. Resized thumbnails are also saved to a directory on disk, named after
+    the source path and its modification time, so a cold view only reads a small file
+    and never resizes again until the artwork changes. Artwork found in an ArtworkPack
+    is read from the pack instead, without touching the loose files at all.
+    """
+    def __init__(self, cache_dir=".thumbnails", max_bytes=8 * 1024 * 1024, size=THUMBNAIL_SIZE, pack=None):
+        """
+        Create an empty cache.
+
+        Args:
+            cache_dir: Directory for the thumbnails on disk; created when first needed
+            max_bytes: Bound on the decoded size of the PhotoImages kept in memory
+            size: Largest width or height of a thumbnail in pixels
+            pack: ArtworkPack with pre-sized thumbnails, looked up before the loose files
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.size = size
+        self.pack = pack
+        self._photos = OrderedDict()  # (path, mtime) -> (PhotoImage, bytes), least recently used first
+        self.bytes = 0  # Decoded size of the PhotoImages in memory
+        self.hits = 0  # Lookups served from memory
+        self.disk_hits = 0  # Lookups served from a thumbnail on disk
+        self.misses = 0  # Lookups that had to resize the source image
+        self.pack_hits = 0  # Lookups served from the artwork pack
+        self._lock = threading.Lock()  # Guards the counters, which load_thumbnail updates from any thread
+
+    def stats(self):
+        """
+        Get the hit and miss counters and the memory use of the cache.
+
+        """
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "pack_hits": self.pack_hits,
+                "misses": self.misses, "entries": len(self._photos), "bytes": self.bytes}
+
+    def thumbnail_path(self, path, mtime):
+        """
+        Get the path of the thumbnail on disk for a source image and modification time.
+
+        """
+        digest = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{digest}-{mtime}-{self.size}.png")
+
+    def load_thumbnail(self, path, mtime):
+        """
+        Get the resized image for a source image as a PIL image, from disk if possible.
+        Does not touch Tk, so it can run on any thread.
+
+        """
+        from PIL import Image  # Imported on first use to keep it out of the application's startup
+        if self.pack is not None:
+            data = self.pack.get(artwork_name(path))
+            if data is not None:
+                with data, Image.open(io.BytesIO(data)) as image:  # BytesIO copies, so the view is released here
+                    image.load()
+                with self._lock:
+                    self.pack_hits += 1
+                return image
+
+        thumbnail_path = self.thumbnail_path(path, mtime)
+        try:
+            with Image.open(thumbnail_path) as image:
+                image.load()
+            with self._lock:
+                self.disk_hits += 1
+            return image
+        except OSError:
+            pass  # Not cached yet, or a damaged file that is rewritten below
+
+        with self._lock:
+            self.misses += 1
+        with Image.open(path) as image:
+            image = image.convert("RGBA")
+            image = image.resize(fit_size(image.width, image.height, self.size), Image.Resampling.LANCZOS)
+        self._save_thumbnail(image, thumbnail_path)
+        return image
+
+    def _save_thumbnail(self, image, thumbnail_path):
+        """
+        Save a thumbnail to disk, replacing thumbnails of older versions of the same source.
+        Failing to write the cache is not an error; the thumbnail is just resized again next time.
+
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            prefix = os.path.basename(thumbnail_path).split("-", 1)[0] + "-"
+            for name in os.listdir(self.cache_dir):
+                if name.startswith(prefix):
+                    os.remove(os.path.join(self.cache_dir, name))
+            temp_path = thumbnail_path + ".tmp"
+            image.save(temp_path, format="PNG")
+            os.replace(temp_path, thumbnail_path)
+        except OSError:
+            pass
+
+    def key_of(self, path):
+        """
+        Get the (path, mtime) cache key of a source image, or None if the image does not exist.
+        Artwork in the pack uses the pack's modification time, so the loose file is never checked.
+
+        """
+        if self.pack is not None and artwork_name(path) in self.pack:
+            return path, self.pack.mtime
+        try:
+            return path, os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def __contains__(self, key):
+        """
+        Check whether the PhotoImage for a cache key is in memory, without counting a hit.
+
+        """
+        return key in self._photos
+
+    def cached(self, key):
+        """
+        Get the PhotoImage kept in memory for a cache key, or None.
+        Must be called on the Tk thread.
+
+        """
+        entry = self._photos.get(key)
+        if entry is None:
+            return None
+        self._photos.move_to_end(key)
+        with self._lock:
+            self.hits += 1
+        return entry[0]
+
+    def get(self, path):
+        """
+        Get a PhotoImage thumbnail of a source image, or None if the image does not exist.
+        Must be called on the Tk thread.
+
+        """
+        key = self.key_of(path)
+        if key is None:
+            return None
+        photo = self.cached(key)
+        if photo is None:
+            photo = self.put(key, self.load_thumbnail(*key))
+        return photo
+
+    def put(self, key, image):
+        """
+        Turn a PIL thumbnail into a PhotoImage and keep it in memory under a (path, mtime) key,
+        evicting the least recently used thumbnails beyond max_bytes.
+        Must be called on the Tk thread.
+
+        """
+        from PIL import ImageTk  # Imported on first use to keep it out of the application's startup
+        photo = ImageTk.PhotoImage(image)
+        size = image.width * image.height * 4  # Tk keeps photos as 32-bit pixels
+        old = self._photos.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        self._photos[key] = (photo, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes and len(self._photos) > 1:
+            evicted_key, (evicted_photo, evicted_size) = self._photos.popitem(last=False)
+            self.bytes -= evicted_size
+        return photo
+
+    def discard(self, paths):
+        """
+        Forget the artwork of source images, e.g. of deleted tracks: their pack entries are no
+        longer served and their PhotoImages are dropped from memory.
+        Must be called on the Tk thread.
+
+        """
+        paths = set(paths)
+        if self.pack is not None:
+            for path in paths:
+                self.pack.discard(artwork_name(path))
+        for key in [key for key in self._photos if key[0] in paths]:
+            self.bytes -= self._photos.pop(key)[1]
+
+    def clear(self):
+        """
+        Drop the PhotoImages kept in memory. The thumbnails on disk are kept.
+
+        """
+        self._photos.clear()
+        self.bytes = 0
+
+
+class ThumbnailLoader:
+    """
+    Loads thumbnails from a ThumbnailCache on a thread pool, so decoding and resizing
+    never block the Tk thread; only the final PhotoImage is created on the Tk thread.
+    Each show() supersedes the previous one: its pending work is cancelled and a late
+    result is cached but not displayed. Thumbnails of nearby tracks can be prefetched.
+    The decoding threads never call Tk: finished work is queued and picked up by a single
+    after() poll on the Tk thread, however many thumbnails finish at once.
+    """
+    def __init__(self, cache, widget, workers=2):
+        """
+        Create a loader.
+
+        Args:
+            cache: ThumbnailCache that holds the thumbnails
+            widget: Any Tk widget, used to run callbacks on the Tk thread
+            workers: Number of decoding threads
+        """
+        self.cache = cache
+        self.widget = widget
+        self.workers = workers
+        self._executor = None  # Thread pool, started with the first request
+        self.generation = 0  # Increases with every show(), so superseded results are not displayed
+        self.shown = None  # Future of the thumbnail that should be displayed next
+        self.prefetched = {}  # Cache key -> future of a prefetched thumbnail
+        self._finished = queue.Queue()  # (future, key, generation, callback) of finished or cancelled work
+        self._outstanding = 0  # Work whose result has not been taken from _finished yet
+        self._poll_id = None  # Timer of the next check for finished work
+
+    @property
+    def executor(self):
+        """
+        Get the thread pool that decodes thumbnails, starting it on first use.
+
+        """
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor  # Imported on first use to keep it out of startup
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="thumbnails")
+        return self._executor
+
+    def show(self, path, callback):
+        """
+        Call callback with the PhotoImage thumbnail of a source image, or with None if it
+        does not exist. A thumbnail in memory is passed at once; otherwise it is decoded in
+        the background and this returns False so the caller can show a placeholder.
+        Must be called on the Tk thread.
+
+        """
+        self.generation += 1
+        if self.shown is not None:
+            self.shown.cancel()  # Not started yet: never decode it
+            self.shown = None
+        key = self.cache.key_of(path)
+        photo = None if key is None else self.cache.cached(key)
+        if key is None or photo is not None:
+            callback(photo)
+            return True
+        future = self.prefetched.pop(key, None)
+        if future is None or future.cancelled():
+            future = self.executor.submit(self.cache.load_thumbnail, *key)
+        self.shown = future
+        generation = self.generation
+        self._watch(future, key, generation, callback)
+        return False
+
+    def prefetch(self, paths):
+        """
+        Decode the thumbnails of source images in the background, e.g. of the tracks next to
+        the selection, so showing them later is instant. Prefetches of images that are not
+        in paths and have not started yet are cancelled.
+        Must be called on the Tk thread.
+
+        """
+        keys = [key for key in map(self.cache.key_of, paths) if key is not None]
+        wanted = set(keys)
+        for key, future in list(self.prefetched.items()):
+            if key not in wanted and future.cancel():
+                del self.prefetched[key]
+        for key in keys:
+            if key not in self.prefetched and key not in self.cache:
+                future = self.executor.submit(self.cache.load_thumbnail, *key)
+                self.prefetched[key] = future
+                self._watch(future, key)
+
+    def _watch(self, future, key, generation=None, callback=None):
+        """
+        Queue a future's result for the Tk thread when it finishes, and make sure the queue is
+        being polled. Must be called on the Tk thread.
+
+        """
+        self._outstanding += 1
+        future.add_done_callback(lambda done: self._finished.put((done, key, generation, callback)))
+        if self._poll_id is None:
+            self._poll_id = self.widget.after(DELIVERY_POLL_MS, self._poll)
+
+    def _poll(self):
+        """
+        Store the thumbnails decoded since the last poll, and poll again while work is
+        outstanding. Runs on the Tk thread.
+
+        """
+        self._poll_id = None
+        while True:
+            try:
+                future, key, generation, callback = self._finished.get_nowait()
+            except queue.Empty:
+                break
+            self._outstanding -= 1
+            if not future.cancelled():
+                self._store(future, key, generation, callback)
+        if self._outstanding:
+            self._poll_id = self.widget.after(DELIVERY_POLL_MS, self._poll)
+
+    def _store(self, future, key, generation, callback):
+        """
+        Create the PhotoImage of a decoded thumbnail, cache it and display it if it is still wanted.
+        Runs on the Tk thread.
+
+        """
+        if self.prefetched.get(key) is future:
+            del self.prefetched[key]
+        try:
+            image = future.result()
+        except Exception:
+            image = None  # Unreadable artwork, or PIL refused it, e.g. DecompressionBombError
+        if key in self.cache:
+            photo = self.cache.cached(key)  # Already stored by an earlier prefetch of the same image
+        else:
+            photo = None if image is None else self.cache.put(key, image)
+        if callback is not None and generation == self.generation:
+            self.shown = None
+            callback(photo)
+
+    def close(self):
+        """
+        Cancel the pending work and stop the decoding threads.
+
+        """
+        if self._poll_id is not None:
+            self.widget.after_cancel(self._poll_id)
+            self._poll_id = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,85 +1,739 @@
 # Import necessary libraries for CSV handling and track management
 import csv  # For reading and writing CSV files
-from library_item import LibraryItem  # Import LibraryItem class for track representation
+import io  # For decoding the byte stream read from the CSV file
+import itertools  # For paging through the tracks
+import os  # For checking the size and modification time of the CSV file
+import threading  # For searching from background threads
+from collections import Counter  # For counting plays per track
+from library_item import SlottedLibraryItem  # Import the slotted LibraryItem variant for track representation
+from search_index import SearchIndex  # For fast searches by name and artist
+import storage  # For the patch file of edits saved next to the CSV file
 
-# Initialize global library dictionary to store all tracks
-library = {}
+# Importing this module does not read any file. The module-level functions (load_library,
+# get_name, ...) and the library attribute belong to a default TrackLibrary, so the
+# application can keep using "import track_library as lib"; other code can open its own
+# TrackLibrary objects, each with its own path, tracks and subscribers.
 
-def load_library(filename="music.csv"):
+# Number of bytes before the last read position that are remembered to detect rewrites
+_SIGNATURE_SIZE = 64
+
+# Star strings for each rating value, built once instead of for every row
+STARS = tuple("⭐" * rating for rating in range(6))
+
+def key_order(key):
     """
-    Load the music library from a CSV file.
-    Each track is stored as a LibraryItem object in the global library dictionary.
-    
+    Sort key that puts zero-padded track IDs in numeric order.
+
     """
-    global library
-    library.clear()  # Clear existing library
-    try:
-        with open(filename, "r", encoding="utf-8") as file:
-            reader = csv.reader(file)
-            next(reader)  # Skip header row
-            for index, row in enumerate(reader, start=1):
-                if len(row) == 3:  # Ensure row has name, artist, and rating
-                    name, artist, rating = row
-                    library[f"{index:02d}"] = LibraryItem(name, artist, int(rating))
-    except FileNotFoundError:
-        raise FileNotFoundError(f"File {filename} does not exist!")
+    return len(key), key
 
-def list_all():
+def track_key(track_id):
     """
-    Generate a formatted string containing all tracks in the library.
-    The string includes track ID, name, artist, rating (as stars), and play count.
-    
+    Get the key of a track from its integer ID.
+    Keys are zero-padded to at least two digits, like the names of the images and the playlist
+    entries; larger IDs simply get more digits.
+
     """
-    output = ""
-    for key, item in library.items():
-        stars = "⭐" * item.rating  # Convert rating to stars
-        output += f"{key}\t{item.name}\t{item.artist}\t{stars}\t{item.play_count}\n"
-    return output
+    return f"{track_id:02d}"
 
-def get_name(key):
+# Sort keys for iter_tracks, by field name
+_SORT_KEYS = {
+    "id": lambda track: key_order(track[0]),
+    "name": lambda track: track[1].lower(),
+    "artist": lambda track: track[2].lower(),
+    "rating": lambda track: track[3],
+    "play_count": lambda track: track[4],
+}
+
+def _title(name, artist):
     """
-    Get the name of a track by its key.
-    
+    Normalise a name and artist for duplicate checks: surrounding spaces and case are ignored.
 
     """
-    return library[key].name if key in library else None
+    return (name.strip().casefold(), artist.strip().casefold())
+
 
-def get_artist(key):
+class LibraryChanges:
     """
-    Get the artist of a track by its key.
-    
+    Batch of library changes delivered to subscribers.
+    Changes made between two deliveries are coalesced: a track that was added and then
+    updated is only reported as added, and a reload replaces all other changes.
     """
-    return library[key].artist if key in library else None
+    def __init__(self):
+        """
+        Create an empty batch.
+
+        """
+        self.added = set()  # Keys of new tracks
+        self.updated = set()  # Keys of tracks whose fields changed
+        self.deleted = set()  # Keys of removed tracks
+        self.reloaded = False  # Whether the whole library was reloaded
 
-def get_rating(key):
+    def record(self, kind, keys):
+        """
+        Merge an "add", "update", "delete" or "reload" event into the batch.
+
+        """
+        if self.reloaded:
+            return  # Subscribers re-read everything anyway
+        if kind == "reload":
+            self.reloaded = True
+            self.added.clear()
+            self.updated.clear()
+            self.deleted.clear()
+        elif kind == "add":
+            self.added.update(keys)
+            self.deleted.difference_update(keys)
+        elif kind == "update":
+            self.updated.update(key for key in keys if key not in self.added)
+        elif kind == "delete":
+            for key in keys:
+                if key in self.added:
+                    self.added.discard(key)  # Subscribers never saw it
+                else:
+                    self.updated.discard(key)
+                    self.deleted.add(key)
+
+    def __bool__(self):
+        """
+        Check whether the batch contains any change.
+
+        """
+        return bool(self.reloaded or self.added or self.updated or self.deleted)
+
+
+class TrackLibrary:
     """
-    Get the rating of a track by its key.
-    
+    A music library: the tracks loaded from one CSV file or storage backend, with their
+    search and duplicate indexes, play journal and change subscribers.
+    Nothing is read until load_library (or load_storage) is called. Libraries are
+    independent, so several can be open at once, e.g. one per worker.
+    Can be used as a context manager that closes the library on exit.
     """
-    return library[key].rating if key in library else -1
+    def __init__(self, path="music.csv"):
+        """
+        Create an empty library.
+
+        Args:
+            path: CSV file that load_library reads when no other file is given
+        """
+        self.path = path
+        self.library = {}  # Track key -> LibraryItem
+
+        # Search index over names and artists, built on the first search and then kept up to date
+        self._search_index = None
+        self._index_lock = threading.RLock()  # Guards the indexes, which are also used from search threads
+
+        # Normalised (name, artist) -> keys of the tracks with that name and artist, for duplicate checks
+        self._keys_by_title = {}
+
+        # Functions called with each batch of library changes
+        self._subscribers = []
+
+        # Storage backend (e.g. storage.SqliteStorage) that changes are written to, if the
+        # library was loaded from one; None when it was loaded from a CSV file
+        self._storage = None
+
+        # Journal that keeps play counts across reloads, if one is attached
+        self._play_journal = None
+
+        # Remember what was read from the CSV file so later loads can parse only appended rows
+        self._load_state = {
+            "filename": None,  # Path of the file the library was loaded from
+            "size": 0,  # File size at the last load
+            "mtime": 0,  # File modification time at the last load
+            "offset": 0,  # Byte offset just after the last parsed row
+            "signature": b"",  # Bytes just before the offset, used to detect rewrites
+            "next_index": 1,  # ID that the next track without an ID will get
+            "has_ids": False,  # Whether the file has an id column; legacy files use row numbers as IDs
+            "patch": None,  # Size and modification time of the patch file when it was applied
+        }
+
+        # Changes waiting to be delivered, and the function that schedules their delivery
+        self._pending_changes = LibraryChanges()
+        self._dispatcher = None
+        self._flush_scheduled = False
+        self._changes_lock = threading.Lock()  # Changes may be made on a background thread, e.g. while loading
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Drop the tracks, indexes and subscribers. The storage backend and play journal
+        belong to the caller and are only detached, not closed.
+
+        """
+        with self._index_lock:
+            self.library.clear()
+            self._search_index = None
+            self._keys_by_title.clear()
+        self._subscribers.clear()
+        self._storage = None
+        self._play_journal = None
+
+    def _reset_load_state(self, filename):
+        """
+        Forget the previous load so that the next read starts from the beginning of the file.
+
+        """
+        with self._index_lock:
+            self.library.clear()  # Clear existing library
+            self._search_index = None  # Rebuilt on the next search
+            self._keys_by_title.clear()
+        self._storage = None
+        self._load_state.update(filename=filename, size=0, mtime=0, offset=0, signature=b"", next_index=1,
+                                has_ids=False, patch=None)
+
+    def _can_resume(self, filename, stat, file):
+        """
+        Check whether the file only grew since the last load, so reading can resume at the saved offset.
+
+        """
+        offset = self._load_state["offset"]
+        if self._load_state["filename"] != filename or offset == 0 or stat.st_size < offset:
+            return False
+        signature = self._load_state["signature"]
+        file.seek(offset - len(signature))
+        return file.read(len(signature)) == signature  # A different tail means the file was rewritten
+
+    def _add_rows(self, keys, rows):
+        """
+        Create tracks for the parsed rows in one pass and store them under the given keys.
+
+        """
+        items = SlottedLibraryItem.from_rows(rows)
+        with self._index_lock:
+            self.library.update(zip(keys, items))
+            for key, (name, artist, rating) in zip(keys, rows):
+                self._keys_by_title.setdefault(_title(name, artist), set()).add(key)
+            if self._search_index is not None:
+                for key, (name, artist, rating) in zip(keys, rows):
+                    self._search_index.add(key, name, artist)
+        if self._play_journal is not None:
+            self._apply_play_counts(keys)
+
+    def iter_library_chunks(self, filename=None, chunk_size=1000, incremental=False):
+        """
+        Load the music library from a CSV file, by default the library's path, yielding the
+        keys of the added tracks in chunks.
+        Callers can display each chunk as soon as it is parsed instead of waiting for the whole file.
+        With incremental=True only the rows appended since the previous load are parsed,
+        falling back to a full reload when the file was rewritten.
+        Edits saved in the file's patch file are applied at the end.
+
+        """
+        filename = self.path if filename is None else filename
+        path = os.path.abspath(filename)  # Compare loads by absolute path
+        yield from self._iter_csv_chunks(path, filename, chunk_size, incremental)
+        self._apply_patch(path)
+
+    def _apply_patch(self, path):
+        """
+        Apply the edits recorded in the patch file of a CSV file, if it changed since it was last applied.
+        Patch entries set absolute values, so applying the whole file again is safe.
+
+        """
+        try:
+            stat = os.stat(storage.patch_path(path))
+        except FileNotFoundError:
+            return
+        stamp = (stat.st_size, stat.st_mtime)
+        if self._load_state["patch"] == stamp:
+            return
+        for row in storage.read_patch(path):
+            if len(row) == 1:
+                self.remove_track(row[0])
+            else:
+                self.update_track(*row)
+        self._load_state["patch"] = stamp
+
+    def _iter_csv_chunks(self, path, filename, chunk_size, incremental):
+        """
+        Parse the rows of a CSV file, or the rows appended since the last load, in chunks.
+
+        """
+        load_state = self._load_state
+        try:
+            file = open(path, "rb")
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File {filename} does not exist!")
+        with file:
+            stat = os.fstat(file.fileno())
+            resume = incremental and self._can_resume(path, stat, file)
+            if resume and stat.st_size == load_state["offset"]:
+                if stat.st_mtime == load_state["mtime"]:
+                    return  # Nothing changed since the last load
+                resume = False  # Same size but modified: rewritten in place
+            if resume:
+                file.seek(load_state["offset"])
+            else:
+                self._reset_load_state(path)
+                self._emit("reload")
+                file.seek(0)
+            start = file.tell()
+
+            text = io.TextIOWrapper(file, encoding="utf-8", newline="")
+            reader = csv.reader(text)
+            if start == 0:
+                header = next(reader, None)  # Skip header row
+                load_state["has_ids"] = bool(header) and header[0] == "id"
+            has_ids = load_state["has_ids"]
+            index = load_state["next_index"]
+            chunk, rows = [], []
+            for row in reader:
+                if has_ids and len(row) == 4 and row[0].isdigit():  # Row with a stable ID
+                    track_id = int(row[0])
+                    chunk.append(track_key(track_id))
+                    rows.append(row[1:])
+                    index = max(index, track_id + 1)
+                elif has_ids and row[:1] == [storage.NEXT_ID_MARKER]:  # High-water mark of IDs
+                    index = max(index, storage.read_next_id(row) or 0)
+                elif len(row) == 3:  # Ensure row has name, artist, and rating
+                    chunk.append(track_key(index))
+                    rows.append(row)
+                    index += 1
+                elif not has_ids:
+                    index += 1  # Legacy files number every row, even invalid ones
+                if len(chunk) >= chunk_size:
+                    self._add_rows(chunk, rows)
+                    self._emit("add", chunk)
+                    yield chunk
+                    chunk, rows = [], []
+            self._add_rows(chunk, rows)
+            self._emit("add", chunk)
+
+            # Remember where reading stopped so the next incremental load can resume here
+            text.detach()  # Hand the file back without closing it
+            end = file.tell()
+            file.seek(max(0, end - _SIGNATURE_SIZE))
+            load_state.update(size=stat.st_size, mtime=stat.st_mtime, offset=end,
+                              signature=file.read(end - file.tell()), next_index=index)
+        if chunk:
+            yield chunk
+
+    def next_track_id(self):
+        """
+        Get the ID that the next added track will get. IDs of deleted tracks are not reused.
+
+        """
+        return self._load_state["next_index"]
+
+    def load_library(self, filename=None, incremental=False):
+        """
+        Load the music library from a CSV file, by default the library's path.
+        Files with an id column keep each track's ID; legacy files without one
+        number the tracks by row.
+        Each track is stored as a slotted LibraryItem object in the library dictionary.
+        With incremental=True only rows appended since the previous load are parsed.
+        Returns the keys of the tracks that were added.
+
+        """
+        added = []
+        for chunk in self.iter_library_chunks(filename, incremental=incremental):
+            added.extend(chunk)
+        return added
+
+    def adopt(self, other):
+        """
+        Take over the tracks, indexes and load state of another library, e.g. one loaded on a
+        background thread, and report a reload. The other library is left empty.
+        Loading into a separate library and adopting it on the thread that uses this library
+        means readers never see the dictionary change size while it is being filled.
+
+        """
+        with self._index_lock:
+            self.library, other.library = other.library, {}
+            self._keys_by_title, other._keys_by_title = other._keys_by_title, {}
+            self._search_index, other._search_index = other._search_index, None
+        self._storage, other._storage = other._storage, None
+        self._load_state = dict(other._load_state)
+        if self._play_journal is not None:
+            self._apply_play_counts(list(self.library))
+        self._emit("reload")
+
+    def load_storage(self, storage):
+        """
+        Load the music library from a storage backend such as storage.SqliteStorage.
+        Later changes made through this library are written to the backend one row at a time.
+        Track keys are the backend's stable ids, zero-padded like the CSV keys.
+
+        """
+        self._reset_load_state(None)
+        self._emit("reload")
+        keys, rows, plays = [], [], []
+        last_id = 0
+        for track_id, name, artist, rating, play_count in storage.load_tracks():
+            keys.append(track_key(track_id))
+            rows.append((name, artist, rating))
+            plays.append(play_count)
+            last_id = max(last_id, track_id)
+        self._add_rows(keys, rows)
+        for key, play_count in zip(keys, plays):
+            self.library[key].play_count = play_count  # The backend keeps the play counts
+        self._load_state["next_index"] = max(last_id + 1, storage.next_id())
+        self._storage = storage
+        self._emit("add", keys)
+        return keys
+
+    def set_backing_store(self, store):
+        """
+        Replace the container that holds the tracks, e.g. with a ColumnarLibrary to save memory.
+        The store must support the dictionary operations used by this class.
+        The current tracks are copied into the new store.
+
+        """
+        if store is self.library:
+            return
+        store.clear()
+        for key, item in self.library.items():
+            store[key] = item
+        self.library = store
+        self._emit("reload")
+
+    def get_track(self, key):
+        """
+        Get a track as an (id, name, artist, rating, play_count) tuple, or None if it does not exist.
+
+        """
+        item = self.library.get(key)
+        return None if item is None else (key, item.name, item.artist, item.rating, item.play_count)
+
+    def get_display_row(self, key):
+        """
+        Get the values shown for a track in the track lists: ID, name, artist, rating as stars and play count.
+        A track that no longer exists is shown with empty fields.
+
+        """
+        item = self.library.get(key)
+        if item is None:
+            return key, "", "", "", ""
+        return key, item.name, item.artist, STARS[item.rating], item.play_count
+
+    def get_keys(self):
+        """
+        Get the keys of all tracks in library order.
+
+        """
+        return list(self.library)
 
-def set_rating(key, rating):
+    def iter_tracks(self, sort_by=None, reverse=False, offset=0, limit=None):
+        """
+        Iterate over the tracks as (id, name, artist, rating, play_count) tuples.
+        Tracks can be sorted by one of "id", "name", "artist", "rating" or "play_count",
+        and paged by skipping offset tracks and yielding at most limit tracks.
+
+        """
+        tracks = ((key, item.name, item.artist, item.rating, item.play_count)
+                  for key, item in self.library.items())
+        if sort_by is not None:
+            tracks = sorted(tracks, key=_SORT_KEYS[sort_by], reverse=reverse)
+        stop = None if limit is None else offset + limit
+        return itertools.islice(tracks, offset, stop)
+
+    def list_all(self):
+        """
+        Generate a formatted string containing all tracks in the library.
+        The string includes track ID, name, artist, rating (as stars), and play count.
+
+        """
+        return "".join(f"{key}\t{name}\t{artist}\t{STARS[rating]}\t{plays}\n"
+                       for key, name, artist, rating, plays in self.iter_tracks())
+
+    def get_name(self, key):
+        """
+        Get the name of a track by its key.
+
+        """
+        return self.library[key].name if key in self.library else None
+
+    def get_artist(self, key):
+        """
+        Get the artist of a track by its key.
+
+        """
+        return self.library[key].artist if key in self.library else None
+
+    def get_rating(self, key):
+        """
+        Get the rating of a track by its key.
+
+        """
+        return self.library[key].rating if key in self.library else -1
+
+    def subscribe(self, callback):
+        """
+        Register a function to be called with a LibraryChanges batch after tracks are
+        added, updated, deleted or reloaded, so views can update just the affected rows.
+
+        """
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """
+        Stop calling a function registered with subscribe.
+
+        """
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def set_dispatcher(self, schedule):
+        """
+        Set how change batches are delivered. schedule is called with a function to run
+        later, e.g. a Tk window's after_idle, so changes made in one event handler are
+        delivered together on the next idle tick. With None, changes are delivered immediately.
+
+        """
+        self._dispatcher = schedule
+
+    def _emit(self, kind, keys=()):
+        """
+        Record a change and make sure it will be delivered.
+
+        """
+        with self._changes_lock:
+            self._pending_changes.record(kind, keys)
+            schedule = self._dispatcher is not None and not self._flush_scheduled
+            if schedule:
+                self._flush_scheduled = True
+        if self._dispatcher is None:
+            self.flush_changes()
+        elif schedule:
+            self._dispatcher(self.flush_changes)
+
+    def flush_changes(self):
+        """
+        Deliver the pending changes to the subscribers now.
+
+        """
+        with self._changes_lock:
+            changes, self._pending_changes = self._pending_changes, LibraryChanges()
+            self._flush_scheduled = False
+        if changes:
+            for callback in list(self._subscribers):
+                callback(changes)
+
+    def set_rating(self, key, rating):
+        """
+        Set the rating for a track.
+
+        """
+        if key in self.library:
+            self.library[key].rating = rating
+            if self._storage is not None:
+                self._storage.update_track(int(key), rating=rating)
+            self._emit("update", (key,))
+
+    def get_play_count(self, key):
+        """
+        Get the play count of a track by its key.
+
+        """
+        return self.library[key].play_count if key in self.library else -1
+
+    def increment_play_count(self, key):
+        """
+        Increment the play count for a track.
+
+        """
+        self.increment_play_counts((key,))
+
+    def increment_play_counts(self, keys):
+        """
+        Increment the play counts of several tracks at once.
+        Tracks that do not exist are ignored. The plays are recorded in the play journal,
+        if one is attached, and subscribers get a single update for all of them.
+
+        """
+        played = [key for key in keys if key in self.library]
+        for key in played:
+            self.library[key].play_count += 1
+        if played:
+            if self._play_journal is not None:
+                self._play_journal.record(played)
+            if self._storage is not None:
+                self._storage.add_plays(Counter(int(key) for key in played))
+            self._emit("update", played)
+
+    def attach_play_journal(self, journal):
+        """
+        Keep play counts in a PlayJournal so they survive reloading the library.
+        The counts recorded in the journal are applied to the loaded tracks now and after every load.
+        Pass None to detach the journal.
+
+        """
+        self._play_journal = journal
+        if journal is not None:
+            keys = list(self.library)
+            self._apply_play_counts(keys)
+            self._emit("update", keys)
+
+    def _apply_play_counts(self, keys):
+        """
+        Set the play counts of the given tracks from the play journal.
+
+        """
+        for key in keys:
+            plays = self._play_journal.play_count(key)
+            if plays:
+                self.library[key].play_count = plays
+
+    def add_track(self, name, artist, rating=0):
+        """
+        Add a new track to the library after the loaded tracks.
+        Returns the key of the new track.
+
+        """
+        if self._storage is not None:
+            key = track_key(self._storage.add_track(name, artist, rating))  # The backend assigns the id
+        else:
+            key = track_key(self._load_state["next_index"])
+            self._load_state["next_index"] += 1
+        self.library[key] = SlottedLibraryItem(name, artist, rating)
+        with self._index_lock:
+            self._keys_by_title.setdefault(_title(name, artist), set()).add(key)
+            if self._search_index is not None:
+                self._search_index.add(key, name, artist)
+        self._emit("add", (key,))
+        return key
+
+    def update_track(self, key, name=None, artist=None, rating=None):
+        """
+        Change the name, artist and/or rating of a track.
+
+        """
+        if key not in self.library:
+            return
+        item = self.library[key]
+        old_title = _title(item.name, item.artist)
+        if name is not None:
+            item.name = name
+        if artist is not None:
+            item.artist = artist
+        if rating is not None:
+            item.rating = rating
+        if self._storage is not None:
+            changed = {"name": name, "artist": artist, "rating": rating}
+            self._storage.update_track(int(key),
+                                       **{field: value for field, value in changed.items() if value is not None})
+        self._emit("update", (key,))
+        if name is not None or artist is not None:
+            with self._index_lock:
+                self._discard_title(old_title, key)
+                self._keys_by_title.setdefault(_title(item.name, item.artist), set()).add(key)
+                if self._search_index is not None:
+                    self._search_index.update(key, item.name, item.artist)
+
+    def remove_track(self, key):
+        """
+        Remove a track from the library.
+
+        """
+        if key in self.library:
+            title = _title(self.library[key].name, self.library[key].artist)
+            del self.library[key]
+            if self._storage is not None:
+                self._storage.delete_track(int(key))
+            with self._index_lock:
+                self._discard_title(title, key)
+                if self._search_index is not None:
+                    self._search_index.remove(key)
+            self._emit("delete", (key,))
+
+    def _discard_title(self, title, key):
+        """
+        Remove a track from the duplicate index entry of a title. Must be called with _index_lock held.
+
+        """
+        keys = self._keys_by_title.get(title)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_title[title]
+
+    def find_duplicates(self, name, artist):
+        """
+        Get the keys of the tracks with the same name and artist, ignoring case and surrounding spaces,
+        in library order. Takes constant time however large the library is.
+
+        """
+        with self._index_lock:
+            keys = self._keys_by_title.get(_title(name, artist), ())
+            return sorted(keys, key=key_order)
+
+    def _get_search_index(self):
+        """
+        Get the search index, building it from the library on first use.
+        Must be called with _index_lock held.
+
+        """
+        if self._search_index is None:
+            index = SearchIndex()
+            for key, item in list(self.library.items()):
+                index.add(key, item.name, item.artist)
+            self._search_index = index
+        return self._search_index
+
+    def search_tracks(self, term, field="name", match="substring"):
+        """
+        Find tracks whose name or artist matches the search term, ignoring case.
+        match is "substring", "prefix" (a word starts with the term) or "words" (whole words).
+        Returns the keys of the matching tracks in library order.
+        Safe to call from a background thread.
+
+        """
+        with self._index_lock:
+            keys = self._get_search_index().search(term, field, match)
+        return sorted(keys, key=key_order)
+
+
+def open_library(path="music.csv"):
     """
-    Set the rating for a track.
-    
+    Create a TrackLibrary for a CSV file and load it.
+
+    """
+    library = TrackLibrary(path)
+    library.load_library()
+    return library
+
+# Library that the module-level functions work on; empty until it is loaded
+_default_library = TrackLibrary()
+
+def default_library():
     """
-    if key in library:
-        library[key].rating = rating
+    Get the TrackLibrary that the module-level functions work on.
 
-def get_play_count(key):
     """
-    Get the play count of a track by its key.
+    return _default_library
 
+def set_default_library(library):
     """
-    return library[key].play_count if key in library else -1
+    Make the module-level functions work on another TrackLibrary, e.g. one opened on a
+    different file. Returns the previous default library.
 
-def increment_play_count(key):
     """
-    Increment the play count for a track.
+    global _default_library
+    previous, _default_library = _default_library, library
+    return previous
+
+# TrackLibrary attributes that are also available as module attributes of the default library
+_DEFAULT_LIBRARY_API = frozenset((
+    "library", "iter_library_chunks", "next_track_id", "load_library", "adopt", "load_storage", "set_backing_store",
+    "get_track", "get_display_row", "get_keys", "iter_tracks", "list_all", "get_name", "get_artist",
+    "get_rating", "subscribe", "unsubscribe", "set_dispatcher", "flush_changes", "set_rating",
+    "get_play_count", "increment_play_count", "increment_play_counts", "attach_play_journal",
+    "add_track", "update_track", "remove_track", "find_duplicates", "search_tracks",
+))
 
+def __getattr__(name):
     """
-    if key in library:
-        library[key].play_count += 1
+    Look up module-level functions and the library dictionary on the default library,
+    so they follow set_default_library.
 
-# Load library when module is imported
-load_library()
+    """
+    if name in _DEFAULT_LIBRARY_API:
+        return getattr(_default_library, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,9 +1,18 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import track_library as lib
-import csv
+from virtual_tree import VirtualTreeview, RowSource
+import storage
+import queue
+import threading
 import os
 
+# Size in bytes at which the patch file of edits is folded into music.csv by a full rewrite
+PATCH_COMPACT_BYTES = 64 * 1024
+
+# Milliseconds between checks for the end of a background rewrite of music.csv
+REWRITE_POLL_MS = 50
+
 class Update:
     """
     Class for managing and updating the music library.
@@ -15,7 +24,16 @@ class Update:
 
         """
         self.parent = parent
+        self.rows = []  # [ID, name, artist, rating] rows shown in the treeview
+        self.edited_ids = set()  # IDs of rows edited since the last save
+        self.added_ids = set()  # IDs of rows added since the last save
+        self.added_titles = set()  # Normalised (name, artist) of the rows added since the last save
+        self.deleted_ids = set()  # IDs of saved tracks deleted since the last save
+        self.next_id = lib.next_track_id()  # ID of the next added row
+        self.saving = False  # Whether a full rewrite of music.csv is running in the background
+        self.rewrite_results = queue.Queue()  # Error (or None) of each finished rewrite, read on the Tk thread
         self.setup_ui()
+        lib.subscribe(self.on_library_changed)  # Update the rows when the library changes
         
     def setup_ui(self):
         """
@@ -45,7 +63,7 @@ class Update:
         ttk.Button(entry_frame, text="🗑 Delete Selected", command=self.delete_selected_tracks).grid(row=0, column=8, padx=5)
 
         # Create treeview for displaying and editing tracks
-        self.update_tree = ttk.Treeview(self.parent, columns=("ID", "Name", "Artist", "Rating"), show="headings")
+        self.update_tree = VirtualTreeview(self.parent, columns=("ID", "Name", "Artist", "Rating"))
         for col in ("ID", "Name", "Artist", "Rating"):
             self.update_tree.heading(col, text=col)
             self.update_tree.column(col, width=150, anchor="center")
@@ -62,16 +80,18 @@ class Update:
         Delete selected tracks from the library and their associated images.
         Prompts for confirmation before deletion.
         """
-        selected_items = self.update_tree.selection()
+        if self.check_saving():
+            return
+        selected_items = self.update_tree.selected_indices()
         if not selected_items:
             messagebox.showwarning("Warning", "Please select tracks to delete")
             return
 
         # Confirm deletion
         if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete {len(selected_items)} track(s)?"):
-            # Delete selected items and their images
-            for item in selected_items:
-                track_id = self.update_tree.item(item)["values"][0]  # Get track ID
+            # Delete selected items and their images, from the bottom up so indices stay valid
+            for index in reversed(selected_items):
+                track_id = self.rows[index][0]  # Get track ID
                 # Delete image file if it exists
                 image_path = f"images/{track_id}.gif"
                 if os.path.exists(image_path):
@@ -79,57 +99,106 @@ class Update:
                         os.remove(image_path)
                     except Exception as e:
                         messagebox.showwarning("Warning", f"Could not delete image for track {track_id}: {str(e)}")
-                # Delete track from treeview
-                self.update_tree.delete(item)
-            
-            # Update IDs to maintain sequential order
-            self.update_track_ids()
+                # Delete track from the list; IDs are stable, so no other row changes
+                del self.rows[index]
+                self.edited_ids.discard(track_id)
+                if track_id in self.added_ids:
+                    self.added_ids.discard(track_id)  # Never saved, nothing to delete from music.csv
+                else:
+                    self.deleted_ids.add(track_id)
             
+            self.show_rows(keep_position=True)
             messagebox.showinfo("Success", f"Successfully deleted {len(selected_items)} track(s)")
 
-    def update_track_ids(self):
+    def check_saving(self):
         """
-        Update track IDs to maintain sequential order after deletions.
-        Also renames image files to match new track IDs.
+        Warn and return True if a save is still running, so the rows must not change yet.
+
         """
-        # Get all items and update their IDs
-        items = self.update_tree.get_children()
-        for idx, item in enumerate(items, 1):
-            old_id = self.update_tree.item(item)["values"][0]  # Get old ID
-            new_id = f"{idx:02d}"  # New ID
-            
-            # Rename image file if it exists
-            old_image_path = f"images/{old_id}.gif"
-            new_image_path = f"images/{new_id}.gif"
-            if os.path.exists(old_image_path):
-                try:
-                    os.rename(old_image_path, new_image_path)
-                except Exception as e:
-                    messagebox.showwarning("Warning", f"Could not rename image from {old_id} to {new_id}: {str(e)}")
-            
-            # Update track ID in treeview
-            values = list(self.update_tree.item(item)["values"])
-            values[0] = new_id
-            self.update_tree.item(item, values=values)
+        if self.saving:
+            messagebox.showinfo("Saving", "Please wait until the changes have been saved.")
+        return self.saving
+
+    def clear_changes(self):
+        """
+        Forget the unsaved changes, after saving or reloading the rows.
+
+        """
+        self.edited_ids = set()
+        self.added_ids = set()
+        self.added_titles = set()
+        self.deleted_ids = set()
 
     def save_to_csv(self):
         """
-        Save the current library state to a CSV file.
-        Updates the track library after saving.
+        Save the changes made since the last save to music.csv.
+        Added rows are appended and edited and deleted rows are recorded in the patch file,
+        so music.csv is only rewritten when the patch has grown large or to add the id
+        column to a legacy file. That rewrite is atomic and runs in the background.
         """
+        if self.check_saving():
+            return
         try:
-            with open("music.csv", "w", newline="", encoding="utf-8") as file:
-                writer = csv.writer(file)
-                writer.writerow(["name", "artist", "rating"])
-                for child in self.update_tree.get_children():
-                    values = self.update_tree.item(child)["values"]
-                    name, artist, rating = values[1], values[2], values[3]
-                    writer.writerow([name, artist, rating])
-            messagebox.showinfo("Success", "Data saved successfully to music.csv")
-            lib.load_library()  # Reload library after saving
+            patch_path = storage.patch_path("music.csv")
+            if (not storage.has_id_column("music.csv")
+                    or (os.path.exists(patch_path) and os.path.getsize(patch_path) >= PATCH_COMPACT_BYTES)):
+                self.saving = True
+                rows = [tuple(row) for row in self.rows]
+                next_id = max(self.next_id, lib.next_track_id())  # Kept so deleted IDs are not reused
+                threading.Thread(target=self.rewrite_csv, args=(rows, next_id), daemon=True).start()
+                self.parent.after(REWRITE_POLL_MS, self.check_rewrite)
+                return
+            edited = [row for row in self.rows if row[0] in self.edited_ids and row[0] not in self.added_ids]
+            deleted = [[track_id] for track_id in sorted(self.deleted_ids, key=lib.key_order)]
+            added = [row for row in self.rows if row[0] in self.added_ids]
+            if edited or deleted:
+                storage.append_patch("music.csv", edited + deleted)
+            if added:
+                storage.append_csv_rows("music.csv", added)
+            self.clear_changes()
+            messagebox.showinfo("Success", f"Saved {len(edited) + len(deleted) + len(added)} change(s) to music.csv")
+            lib.load_library(incremental=True)  # Load the appended rows and the patch
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save data: {e}")
 
+    def rewrite_csv(self, rows, next_id):
+        """
+        Rewrite music.csv with all rows and the ID the next added track will get.
+        Runs on a background thread and never calls Tk; the result is queued for check_rewrite.
+
+        """
+        try:
+            storage.rewrite_csv("music.csv", rows, next_id)
+            error = None
+        except Exception as e:
+            error = e
+        self.rewrite_results.put(error)
+
+    def check_rewrite(self):
+        """
+        Finish a background rewrite once it has ended, or check again later. Runs on the Tk thread.
+
+        """
+        try:
+            error = self.rewrite_results.get_nowait()
+        except queue.Empty:
+            self.parent.after(REWRITE_POLL_MS, self.check_rewrite)
+            return
+        self.finish_rewrite(error)
+
+    def finish_rewrite(self, error):
+        """
+        Report the result of a background rewrite and reload the library from the new file.
+
+        """
+        self.saving = False
+        if error is not None:
+            messagebox.showerror("Error", f"Failed to save data: {error}")
+            return
+        self.clear_changes()
+        messagebox.showinfo("Success", "Data saved successfully to music.csv")
+        lib.load_library()  # The file was replaced, so reload everything
+
     def on_double_click(self, event):
         """
         Handle double-click events for inline editing of track information.
@@ -139,18 +208,19 @@ class Update:
         region = self.update_tree.identify("region", event.x, event.y)
         if region != "cell":
             return
-        row_id = self.update_tree.identify_row(event.y)
+        row_index = self.update_tree.index_at(event.y)
         column = self.update_tree.identify_column(event.x)
         column_index = int(column.replace("#", "")) - 1
 
-        if column_index == 0:  # prevent editing ID
+        if column_index == 0 or row_index is None:  # prevent editing ID (or clicking below the rows)
+            return
+        if self.check_saving():
             return
 
-        item = self.update_tree.item(row_id)
-        old_value = item["values"][column_index]
+        old_value = self.rows[row_index][column_index]
 
         # Create entry widget for editing
-        entry = ttk.Entry(self.update_tree)
+        entry = ttk.Entry(self.update_tree.tree)
         entry.insert(0, old_value)
         entry.focus()
         entry.place(x=event.x_root - self.update_tree.winfo_rootx(),
@@ -163,7 +233,6 @@ class Update:
             
             """
             new_value = entry.get()
-            values = list(self.update_tree.item(row_id)["values"])
 
             # Validate rating if editing rating column
             if column_index == 3:  # Rating column
@@ -178,8 +247,9 @@ class Update:
                     entry.destroy()
                     return
 
-            values[column_index] = new_value
-            self.update_tree.item(row_id, values=values)
+            self.rows[row_index][column_index] = new_value
+            self.edited_ids.add(self.rows[row_index][0])
+            self.update_tree.refresh()
             entry.destroy()
 
         entry.bind("<Return>", save_edit)
@@ -187,22 +257,65 @@ class Update:
 
     def load_data(self):
         """
-        Load track data from the CSV file into the treeview.
+        Load track data from the track library, which was loaded from the CSV file, into the treeview.
+        """
+        self.rows = [[key, name, artist, str(rating)] for key, name, artist, rating, plays in lib.iter_tracks()]
+        self.next_id = lib.next_track_id()
+        self.clear_changes()
+        self.show_rows()
+
+    def on_library_changed(self, changes):
+        """
+        Apply library changes to the rows.
+        Only the affected rows are added, updated or removed, so unsaved edits to other rows are kept.
+
+        """
+        if changes.reloaded:
+            self.load_data()
+            return
+        if changes.deleted:
+            self.rows = [row for row in self.rows if row[0] not in changes.deleted]
+        rows_by_id = {row[0]: row for row in self.rows}
+        for key in changes.updated:
+            track = lib.get_track(key)
+            if key in rows_by_id and track:
+                rows_by_id[key][1:] = [track[1], track[2], str(track[3])]
+        for key in sorted(changes.added, key=lib.key_order):
+            track = lib.get_track(key)
+            if track and key in self.added_ids:
+                # The ID of an unsaved added row was taken by a track added elsewhere; give the row a new one
+                self.added_ids.discard(key)
+                rows_by_id[key][0] = self.take_id()
+                self.added_ids.add(rows_by_id[key][0])
+                del rows_by_id[key]
+            if track and key not in rows_by_id:
+                self.rows.append([key, track[1], track[2], str(track[3])])
+        self.show_rows(keep_position=True)
+
+    def take_id(self):
+        """
+        Get a free track ID for an added row.
+
+        """
+        self.next_id = max(self.next_id, lib.next_track_id())
+        key = lib.track_key(self.next_id)
+        self.next_id += 1
+        return key
+
+    def show_rows(self, keep_position=False):
+        """
+        Display the rows in the treeview.
+
         """
-        self.update_tree.delete(*self.update_tree.get_children())
-        if os.path.exists("music.csv"):
-            with open("music.csv", "r", encoding="utf-8") as file:
-                reader = csv.reader(file)
-                next(reader, None)  # skip header
-                for idx, row in enumerate(reader, start=1):
-                    if len(row) >= 3:
-                        self.update_tree.insert("", "end", values=(f"{idx:02d}", row[0], row[1], row[2]))
+        self.update_tree.set_source(RowSource(self.rows, tuple), keep_position)
 
     def add_track(self):
         """
         Add a new track to the library.
         Validates input and checks for duplicates.
         """
+        if self.check_saving():
+            return
         name = self.name_entry.get().strip()
         artist = self.artist_entry.get().strip()
         rating = self.rating_entry.get().strip() or "0"
@@ -221,19 +334,21 @@ class Update:
             messagebox.showwarning("Input Error", "Rating must be a number between 0 and 5.")
             return
 
-        # Check for duplicate (same name and artist)
-        for child in self.update_tree.get_children():
-            values = self.update_tree.item(child)["values"]
-            if name.lower() == str(values[1]).lower() and artist.lower() == str(values[2]).lower():
-                answer = messagebox.askyesno("Duplicate", 
-                    f"The track '{name}' by '{artist}' already exists.\nDo you still want to add it?")
-                if not answer:
-                    return
-                break
+        # Check for duplicate (same name and artist) in the library and in the unsaved added rows
+        duplicate = bool(lib.find_duplicates(name, artist)) or (name.casefold(), artist.casefold()) in self.added_titles
+        if duplicate:
+            answer = messagebox.askyesno("Duplicate", 
+                f"The track '{name}' by '{artist}' already exists.\nDo you still want to add it?")
+            if not answer:
+                return
 
-        # Add new track with sequential ID
-        new_id = f"{len(self.update_tree.get_children()) + 1:02d}"
-        self.update_tree.insert("", "end", values=(new_id, name, artist, rating))
+        # Add new track with a new stable ID
+        new_id = self.take_id()
+        self.rows.append([new_id, name, artist, rating])
+        self.added_ids.add(new_id)
+        self.added_titles.add((name.casefold(), artist.casefold()))
+        self.show_rows(keep_position=True)
+        self.update_tree.see(len(self.rows) - 1)
         
         # Clear input fields
         self.name_entry.delete(0, tk.END)
@@ -244,6 +359,5 @@ class Update:
         """
         Refresh the track list by reloading the library and updating the view.
         """
-        lib.load_library()  # Reload library
-        self.load_data()  # Update the view
+        lib.load_library(incremental=True)  # Reload library changes; the rows update from the change events
         messagebox.showinfo("Success", "Track list refreshed successfully") 
\ No newline at end of file
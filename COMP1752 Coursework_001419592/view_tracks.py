@@ -1,24 +1,49 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import track_library as lib
-from PIL import Image, ImageTk
-import os
-import csv
+from virtual_tree import VirtualTreeview, RowSource
+from library_query import LibraryQuery
+from thumbnail_cache import ThumbnailCache, ThumbnailLoader
+from artwork_pack import open_pack
+import storage
+import queue
+import threading
+
+# Delay after the last keystroke before a live search starts, in milliseconds
+SEARCH_DELAY_MS = 250
+
+# Milliseconds between checks for the results of live searches running on worker threads
+SEARCH_POLL_MS = 20
 
 class ViewTrack:
     """
     Class for viewing and managing tracks in the music library.
     Provides functionality for searching, viewing, and playing tracks.
     """
-    def __init__(self, parent):
+    def __init__(self, parent, player=None):
         """
         Initialize the ViewTrack class for viewing and managing tracks.
         
         Args:
             parent: The parent widget where this component will be placed
+            player: PlaybackEngine that plays the tracks
         """
         self.parent = parent
+        self.player = player
+        self.search_after_id = None  # Pending debounced live search
+        self.search_generation = 0  # Increases with every search, so stale results can be dropped
+        self.search_results = queue.Queue()  # (generation, keys) from the search workers, read on the Tk thread
+        self.searches_running = 0  # Live searches whose results have not been read yet
+        self.search_poll_id = None  # Timer of the next check for search results
+        self.query = LibraryQuery()  # Sort orders for the column headings; follows library changes before this view
+        self.sort_by = None  # Field the track list is sorted by, "-field" for descending; None for library order
+        self.shown_key = None  # Key of the track in the details panel
+        self.thumbnails = ThumbnailCache(pack=open_pack("artwork.pack"))  # Resized artwork, in memory and on disk
         self.setup_ui()  # Set up the user interface
+        self.thumbnail_loader = ThumbnailLoader(self.thumbnails, self.parent)  # Decodes artwork in the background
+        lib.subscribe(self.on_library_changed)  # Update the view when the library changes
+        if self.player is not None:
+            self.player.subscribe(self.on_playback_changed)  # Show what is playing
         
     def setup_ui(self):
         """
@@ -42,6 +67,12 @@ class ViewTrack:
         # Create search button
         ttk.Button(search_frame, text="Search", command=self.search_tracks).pack(side="left", padx=5)
 
+        # Create live search toggle; live search runs while typing
+        self.live_search = tk.BooleanVar(value=True)
+        ttk.Checkbutton(search_frame, text="Live search", variable=self.live_search).pack(side="left", padx=5)
+        self.search_var.trace_add("write", self.on_search_changed)
+        self.search_type.trace_add("write", self.on_search_changed)
+
         # Create track ID frame for direct track access
         track_id_frame = ttk.Frame(self.parent)
         track_id_frame.pack(fill="x", padx=5, pady=5)
@@ -57,22 +88,30 @@ class ViewTrack:
         ttk.Button(track_id_frame, text="Play", command=self.play_track).pack(side="left", padx=5)
         ttk.Button(track_id_frame, text="Save", command=self.save_track).pack(side="left", padx=5)
 
-        # Create treeview for displaying tracks
-        self.view_tree = ttk.Treeview(self.parent, columns=("ID", "Name", "Artist", "Rating", "Plays"), show="headings")
+        # Create playback controls and the now playing label
+        ttk.Button(track_id_frame, text="⏪ 10s", command=lambda: self.seek(-10)).pack(side="left", padx=5)
+        ttk.Button(track_id_frame, text="⏯ Pause", command=self.toggle_pause).pack(side="left", padx=5)
+        ttk.Button(track_id_frame, text="⏩ 10s", command=lambda: self.seek(10)).pack(side="left", padx=5)
+        ttk.Button(track_id_frame, text="⏹ Stop", command=self.stop_track).pack(side="left", padx=5)
+        self.now_playing = ttk.Label(track_id_frame, text="")
+        self.now_playing.pack(side="left", padx=5)
 
-        # Configure columns
-        self.view_tree.heading("ID", text="ID")
-        self.view_tree.heading("Name", text="Name")
-        self.view_tree.heading("Artist", text="Artist")
-        self.view_tree.heading("Rating", text="Rating")
-        self.view_tree.heading("Plays", text="Plays")
+        # Create treeview for displaying tracks; only the rows in view are materialised
+        self.view_tree = VirtualTreeview(self.parent, columns=("ID", "Name", "Artist", "Rating", "Plays"))
+
+        # Configure columns; clicking a heading sorts the track list by that column
+        self.view_tree.heading("ID", text="ID", command=lambda: self.sort_by_column("id"))
+        self.view_tree.heading("Name", text="Name", command=lambda: self.sort_by_column("name"))
+        self.view_tree.heading("Artist", text="Artist", command=lambda: self.sort_by_column("artist"))
+        self.view_tree.heading("Rating", text="Rating", command=lambda: self.sort_by_column("rating"))
+        self.view_tree.heading("Plays", text="Plays", command=lambda: self.sort_by_column("play_count"))
         
         # Configure column widths and alignment
         for col in ("ID", "Name", "Artist", "Rating", "Plays"):
             self.view_tree.column(col, width=100, anchor="center")
         
         self.view_tree.pack(fill="both", expand=True, padx=5, pady=5)
-        self.view_tree.bind("<ButtonRelease-1>", self.on_treeview_click)
+        self.view_tree.bind("<<TreeviewSelect>>", self.on_treeview_click, add="+")  # Clicks and arrow keys
 
         # Create details frame for track information
         details_frame = ttk.Frame(self.parent)
@@ -86,18 +125,20 @@ class ViewTrack:
         self.image_label = ttk.Label(details_frame, width=20)
         self.image_label.pack(side="left", padx=5)
 
-    def view_track(self):
+    def view_track(self, key=None):
         """
-        Display details for the track specified by the track ID.
+        Display details for a track, by default the one specified by the track ID entry.
         Shows track information and associated image if available.
         """
-        key = self.track_id_entry.get().strip()
+        if key is None:
+            key = self.track_id_entry.get().strip()
+        self.shown_key = key
         name = lib.get_name(key)
         if name:
             artist = lib.get_artist(key)
             rating = lib.get_rating(key)
             plays = lib.get_play_count(key)
-            stars = "⭐" * int(rating)
+            stars = lib.STARS[rating]
             details = (
                 f"Name:   {name}\n"
                 f"Artist: {artist}\n"
@@ -105,6 +146,7 @@ class ViewTrack:
                 f"Plays:  {plays}"
             )
             self.load_image(key)
+            self.prefetch_images()
         else:
             details = f"Track {key} not found."
             self.image_label.config(image="", text="No image")
@@ -115,73 +157,144 @@ class ViewTrack:
     def load_image(self, key):
         """
         Load and display the track's associated image.
-        The image is resized to fit the display area while maintaining aspect ratio.
+        The image is resized to fit the display area while maintaining aspect ratio;
+        the thumbnail cache makes repeated views free and skips the resize for cold ones.
+        Artwork that is not in memory is decoded in the background behind a placeholder.
 
         """
-        image_path = f"images/{key}.gif"
-        if os.path.exists(image_path):
-            # Open image with PIL
-            img = Image.open(image_path)
-            
-            # Calculate aspect ratio
-            aspect_ratio = img.width / img.height
-            
-            # Calculate new dimensions while maintaining aspect ratio
-            if aspect_ratio > 1:  # Width is greater than height
-                new_width = 120
-                new_height = int(120 / aspect_ratio)
-            else:  # Height is greater than width
-                new_height = 120
-                new_width = int(120 * aspect_ratio)
-            
-            # Resize image
-            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            # Convert to PhotoImage
-            self.tk_img = ImageTk.PhotoImage(img)
-            self.image_label.config(image=self.tk_img, text="")
+        if not self.thumbnail_loader.show(f"images/{key}.gif", self.show_image):
+            self.image_label.config(image="", text="Loading...")
+
+    def show_image(self, photo):
+        """
+        Display a thumbnail, or "No image" if the track has none.
+
+        """
+        self.tk_img = photo  # Keep a reference so Tk does not drop the image
+        if photo is not None:
+            self.image_label.config(image=photo, text="")
         else:
             self.image_label.config(image="", text="No image")
 
-    def list_tracks_clicked(self):
+    def prefetch_images(self):
+        """
+        Decode the artwork of the tracks in view and next to the selection in the background.
+
+        """
+        tree = self.view_tree
+        count = len(tree.source)
+        indices = set(range(tree.first, min(count, tree.first + tree.visible_rows())))
+        for index in tree.selected_indices():
+            indices.update(i for i in (index - 1, index + 1) if 0 <= i < count)
+        keys = [tree.source.key_of(index) for index in sorted(indices)]
+        self.thumbnail_loader.prefetch([f"images/{key}.gif" for key in keys])
+
+    def list_tracks_clicked(self, keep_position=False):
         """
         Display all tracks in the library.
         Updates the treeview with all available tracks.
         """
-        self.view_tree.delete(*self.view_tree.get_children())
-        for line in lib.list_all().strip().split("\n"):
-            parts = line.split("\t")
-            if len(parts) == 5:
-                self.view_tree.insert("", "end", values=parts)
+        self.search_generation += 1  # Results of running live searches are now stale
+        keys = lib.get_keys() if self.sort_by is None else self.query.select(order_by=self.sort_by)
+        self.view_tree.set_source(RowSource(keys, lib.get_display_row), keep_position)
+
+    def sort_by_column(self, field):
+        """
+        Sort the track list by a column, or reverse the order if it is already sorted by it.
+        Uses the query engine's sort orders, so large libraries are not sorted again on every click.
+        """
+        self.sort_by = "-" + field if self.sort_by == field else field
+        if self.search_var.get():
+            self.search_tracks()
+        else:
+            self.list_tracks_clicked()
 
     def on_treeview_click(self, event):
         """
-        Handle click events on the track list.
+        Handle selection changes in the track list, by clicking or with the arrow keys.
         Updates the track ID entry with the selected track's ID.
 
         """
-        selected = self.view_tree.selection()
+        selected = self.view_tree.selection_values()
         if selected:
-            track_id = self.view_tree.item(selected, "values")[0]
+            track_id = selected[0][0]
+            if track_id == self.track_id_entry.get().strip():
+                return  # Already shown; e.g. the selection was redrawn after scrolling
             self.track_id_entry.delete(0, tk.END)
             self.track_id_entry.insert(0, track_id)
             self.view_track()
 
+    def on_library_changed(self, changes):
+        """
+        Update the view after the library changed.
+        Added or removed tracks re-run the current listing or search; changed tracks
+        only update their own rows. The artwork of deleted tracks is discarded, and the
+        details panel is shown again if its track changed, was deleted or was reloaded.
+
+        """
+        self.thumbnails.discard(f"images/{key}.gif" for key in changes.deleted)
+        if changes.reloaded or changes.added or changes.deleted:
+            if self.search_var.get():
+                self.search_tracks()
+            else:
+                self.list_tracks_clicked(keep_position=not changes.reloaded)
+        else:
+            self.view_tree.refresh_keys(changes.updated)
+        shown = self.shown_key
+        if shown is not None and (changes.reloaded or shown in changes.updated or shown in changes.deleted):
+            self.view_track(shown)
+
     def play_track(self):
         """
-        Play the selected track and update play count.
+        Play the selected track.
+        Its play count is incremented by the player when it finishes.
         """
         key = self.track_id_entry.get().strip()
-        if key:
-            lib.increment_play_count(key)
-            self.list_tracks_clicked()
-            self.view_track()
+        if key and self.player is not None:
+            self.player.play([key])
+
+    def toggle_pause(self):
+        """
+        Pause or resume the playing track.
+        """
+        if self.player is not None:
+            self.player.toggle_pause()
+
+    def seek(self, seconds):
+        """
+        Move the playing track forward or back by a number of seconds.
+        """
+        if self.player is not None:
+            self.player.seek(seconds, relative=True)
+
+    def stop_track(self):
+        """
+        Stop playing.
+        """
+        if self.player is not None:
+            self.player.stop()
+
+    def on_playback_changed(self, state, key, position):
+        """
+        Show the state of the player next to the playback controls.
+        """
+        minutes, seconds = divmod(int(position), 60)
+        if state == "playing" or state == "paused":
+            symbol = "▶" if state == "playing" else "⏸"
+            self.now_playing.configure(text=f"{symbol} {key} {lib.get_name(key)}  {minutes}:{seconds:02d}")
+        elif state == "missing":
+            self.now_playing.configure(text=f"No audio file for track {key}")
+        elif state == "error":
+            self.now_playing.configure(text=f"Audio unavailable: {self.player.error}")
+        else:
+            self.now_playing.configure(text="")
 
     def search_tracks(self):
         """
         Search for tracks by name or artist.
         Updates the track list with matching results.
         """
+        self.search_generation += 1  # Results of running live searches are now stale
         search_term = self.search_var.get().lower()
         search_type = self.search_type.get()
         
@@ -189,21 +302,83 @@ class ViewTrack:
             self.list_tracks_clicked()
             return
 
-        # Clear current view
-        for i in self.view_tree.get_children():
-            self.view_tree.delete(i)
-
-        # Search through track library
-        track_list = lib.list_all()
-        for line in track_list.strip().split("\n"):
-            parts = line.strip().split("\t")
-            if len(parts) == 5:
-                if search_type == "name":
-                    if search_term in parts[1].lower():  # Name is at index 1
-                        self.view_tree.insert("", "end", values=parts)
-                else:  # search by artist
-                    if search_term in parts[2].lower():  # Artist is at index 2
-                        self.view_tree.insert("", "end", values=parts)
+        # Look up matching tracks in the library's search index
+        self.show_search_results(self.search_generation, lib.search_tracks(search_term, search_type))
+
+    def on_search_changed(self, *args):
+        """
+        Handle changes to the search term or type.
+        Debounces keystrokes so that a live search starts only after typing pauses.
+        """
+        if not self.live_search.get():
+            return
+        if self.search_after_id is not None:
+            self.parent.after_cancel(self.search_after_id)
+        self.search_after_id = self.parent.after(SEARCH_DELAY_MS, self.start_live_search)
+
+    def start_live_search(self):
+        """
+        Run the current search on a worker thread.
+        Any search still running becomes stale and its results are ignored.
+        """
+        self.search_after_id = None
+        self.search_generation += 1
+        generation = self.search_generation
+        search_term = self.search_var.get().lower()
+        search_type = self.search_type.get()
+
+        if not search_term:
+            self.list_tracks_clicked()
+            return
+
+        worker = threading.Thread(target=self.run_live_search, args=(generation, search_term, search_type),
+                                  daemon=True)
+        worker.start()
+        self.searches_running += 1
+        if self.search_poll_id is None:
+            self.search_poll_id = self.parent.after(SEARCH_POLL_MS, self.check_search_results)
+
+    def run_live_search(self, generation, search_term, search_type):
+        """
+        Search the library on a worker thread and queue the results for the Tk thread; never calls Tk.
+        Skips the work if a newer search has started in the meantime.
+
+        """
+        keys = None
+        if generation == self.search_generation:
+            keys = lib.search_tracks(search_term, search_type)
+        self.search_results.put((generation, keys))
+
+    def check_search_results(self):
+        """
+        Show the results of the latest live search once its worker has finished, dropping
+        the results of older searches, and check again while searches are running.
+        Runs on the Tk thread.
+
+        """
+        self.search_poll_id = None
+        while True:
+            try:
+                generation, keys = self.search_results.get_nowait()
+            except queue.Empty:
+                break
+            self.searches_running -= 1
+            if keys is not None:
+                self.show_search_results(generation, keys)  # Ignored if a newer search has started
+        if self.searches_running:
+            self.search_poll_id = self.parent.after(SEARCH_POLL_MS, self.check_search_results)
+
+    def show_search_results(self, generation, keys):
+        """
+        Display the tracks found by a search, unless a newer search has started.
+
+        """
+        if generation != self.search_generation:
+            return
+
+        if self.sort_by is not None:
+            keys = self.query.sort(keys, self.sort_by)
+        self.view_tree.set_source(RowSource(keys, lib.get_display_row))
 
     def save_track(self):
         """
@@ -224,13 +399,14 @@ class ViewTrack:
             # Get track details
             artist = lib.get_artist(key)
             
-            # Save to music.csv
-            with open("music.csv", "a", newline="", encoding="utf-8") as file:
-                writer = csv.writer(file)
-                writer.writerow([name, artist, "0"])  # Default rating of 0
+            # Save to music.csv with a new stable ID; legacy files without an id column number rows instead
+            row = [name, artist, "0"]  # Default rating of 0
+            if storage.has_id_column("music.csv"):
+                row.insert(0, lib.track_key(lib.next_track_id()))
+            storage.append_csv_rows("music.csv", [row])
             
-            # Reload library
-            lib.load_library()
+            # Reload library, parsing only the appended row; the views pick it up from the change events
+            lib.load_library(incremental=True)
             
             messagebox.showinfo("Success", f"Track '{name}' saved successfully")
             
@@ -0,0 +1,344 @@
+from tkinter import ttk
+
+# Default row height and heading height in pixels, used until the tree has been drawn
+DEFAULT_ROW_HEIGHT = 20
+DEFAULT_HEADING_HEIGHT = 25
+
+# Modifier bits in a Tk event's state that extend the selection (Shift and Control)
+EXTEND_SELECTION = 0x0001 | 0x0004
+
+class RowSource:
+    """
+    Data source for a VirtualTreeview that builds the displayed rows on demand.
+    Holds a list of items (e.g. track IDs) and a function that turns an item into row values,
+    so only the rows that are actually shown are ever formatted.
+    """
+    def __init__(self, items, make_row, key=None):
+        """
+        Create a data source.
+
+        Args:
+            items: List of items, one per row
+            make_row: Function that returns the row values for an item
+            key: Function that returns the track ID of an item; by default the item itself
+        """
+        self.items = items
+        self.make_row = make_row
+        self.key = key
+
+    def key_of(self, index):
+        """
+        Get the track ID of the row at the index.
+
+        """
+        item = self.items[index]
+        return item if self.key is None else self.key(item)
+
+    def __len__(self):
+        """
+        Get the number of rows.
+
+        """
+        return len(self.items)
+
+    def __getitem__(self, index):
+        """
+        Get the values of the row at the index.
+
+        """
+        return self.make_row(self.items[index])
+
+class VirtualTreeview:
+    """
+    Windowed adapter over ttk.Treeview for very long lists.
+    Only the rows in view plus a small buffer exist as Treeview items; scrolling
+    recycles those items by filling them with other rows from the data source.
+    The selection is kept as row indices, so it survives scrolling.
+    """
+    def __init__(self, parent, columns, buffer=5, **options):
+        """
+        Create the tree and its scrollbar inside a frame.
+
+        Args:
+            parent: The parent widget where this component will be placed
+            columns: Column identifiers, as for ttk.Treeview
+            buffer: Number of rows materialised beyond the visible ones
+            options: Other ttk.Treeview options
+        """
+        self.frame = ttk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=columns, show="headings", **options)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.on_scrollbar)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.frame.grid_rowconfigure(0, weight=1)
+        self.frame.grid_columnconfigure(0, weight=1)
+
+        self.source = []  # Data source with len() and indexing
+        self.buffer = buffer
+        self.first = 0  # Index of the row shown at the top
+        self.pool = []  # Treeview items, reused for whichever rows are in view
+        self.shown = {}  # Treeview item -> values it currently displays
+        self.item_by_key = {}  # Track ID -> Treeview item showing it, for rows in view
+        self.selected = set()  # Indices of the selected rows
+        self.anchor = None  # Index where keyboard selection moves from
+        self.extend_selection = False  # Whether the current click extends the selection
+
+        # Scroll and selection bindings
+        self.tree.bind("<Configure>", lambda event: self.refresh())
+        self.tree.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll(3))
+        self.tree.bind("<ButtonPress-1>", self.on_press, add="+")
+        self.tree.bind("<<TreeviewSelect>>", self.on_select, add="+")
+        for key, step in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "page-up"), ("<Next>", "page-down")):
+            self.tree.bind(key, lambda event, step=step: self.move_selection(step))
+
+    def __getattr__(self, name):
+        """
+        Forward other Treeview methods (heading, column, bind, identify_column, ...) to the tree.
+
+        """
+        if name == "tree":
+            raise AttributeError(name)  # Not created yet
+        return getattr(self.tree, name)
+
+    def pack(self, **options):
+        """
+        Pack the frame holding the tree and scrollbar.
+
+        """
+        self.frame.pack(**options)
+
+    def grid(self, **options):
+        """
+        Grid the frame holding the tree and scrollbar.
+
+        """
+        self.frame.grid(**options)
+
+    def set_source(self, source, keep_position=False):
+        """
+        Show a new data source and clear the selection.
+        The view scrolls back to the top unless keep_position is True.
+
+        """
+        self.source = source
+        self.selected = set()
+        self.anchor = None
+        if not keep_position:
+            self.first = 0
+        self.refresh()
+
+    def visible_rows(self):
+        """
+        Get the number of rows that fit in the tree.
+
+        """
+        row_height = DEFAULT_ROW_HEIGHT
+        heading_height = DEFAULT_HEADING_HEIGHT
+        if self.pool:
+            bbox = self.tree.bbox(self.pool[0])
+            if bbox:
+                heading_height, row_height = bbox[1], bbox[3]
+        return max(1, (self.tree.winfo_height() - heading_height) // row_height)
+
+    def refresh(self):
+        """
+        Fill the Treeview items with the rows in view.
+        Items whose values did not change are left alone.
+        """
+        count = len(self.source)
+        visible = self.visible_rows()
+        self.first = max(0, min(self.first, count - visible))
+        size = min(visible + self.buffer, count - self.first)
+
+        # Grow or shrink the pool of Treeview items
+        while len(self.pool) < size:
+            self.pool.append(self.tree.insert("", "end"))
+        while len(self.pool) > size:
+            item = self.pool.pop()
+            self.shown.pop(item, None)
+            self.tree.delete(item)
+
+        # Recycle the items for the rows in view
+        key_of = getattr(self.source, "key_of", None)
+        self.item_by_key = {}
+        for offset, item in enumerate(self.pool):
+            values = tuple(self.source[self.first + offset])
+            if self.shown.get(item) != values:
+                self.tree.item(item, values=values)
+                self.shown[item] = values
+            if key_of is not None:
+                self.item_by_key[key_of(self.first + offset)] = item
+
+        self.tree.yview_moveto(0)  # The adapter does the scrolling, not the tree
+        self.show_selection()
+        if count:
+            self.scrollbar.set(self.first / count, min(1.0, (self.first + visible) / count))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def refresh_keys(self, keys):
+        """
+        Update the rows of the given track IDs if they are in view.
+        Only the cells whose values changed are rewritten.
+
+        """
+        columns = self.tree["columns"]
+        for key in keys:
+            item = self.item_by_key.get(key)
+            if item is None:
+                continue  # Not in view; it is formatted when scrolled to
+            old_values = self.shown[item]
+            values = tuple(self.source[self.index_of(item)])
+            for column, old, new in zip(columns, old_values, values):
+                if old != new:
+                    self.tree.set(item, column, new)
+            self.shown[item] = values
+
+    def selected_items(self):
+        """
+        Get the Treeview items that show selected rows.
+
+        """
+        return tuple(item for offset, item in enumerate(self.pool) if self.first + offset in self.selected)
+
+    def show_selection(self):
+        """
+        Select the Treeview items of the selected rows that are in view.
+
+        """
+        items = self.selected_items()
+        if items != self.tree.selection():
+            self.tree.selection_set(items)
+
+    def scroll_to(self, first):
+        """
+        Scroll so that the row at index first is at the top.
+
+        """
+        self.first = max(0, first)
+        self.refresh()
+
+    def scroll(self, rows):
+        """
+        Scroll by a number of rows.
+
+        """
+        self.scroll_to(self.first + rows)
+        return "break"
+
+    def see(self, index):
+        """
+        Scroll so that the row at the index is in view.
+
+        """
+        visible = self.visible_rows()
+        if index < self.first:
+            self.scroll_to(index)
+        elif index >= self.first + visible:
+            self.scroll_to(index - visible + 1)
+
+    def on_scrollbar(self, action, amount, unit=None):
+        """
+        Handle scrollbar drags and clicks.
+
+        """
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.source)))
+        elif unit == "pages":
+            self.scroll(int(amount) * self.visible_rows())
+        else:
+            self.scroll(int(amount))
+
+    def on_mouse_wheel(self, event):
+        """
+        Handle mouse wheel scrolling on Windows and macOS.
+
+        """
+        steps = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self.scroll(-3 * steps)
+
+    def on_press(self, event):
+        """
+        Remember whether a click extends the selection or replaces it.
+
+        """
+        self.extend_selection = bool(event.state & EXTEND_SELECTION)
+
+    def on_select(self, event):
+        """
+        Copy selection changes made by the user in the Treeview into the row selection.
+
+        """
+        items = self.tree.selection()
+        if items == self.selected_items():
+            return  # Caused by show_selection, or nothing changed
+        in_view = {self.first + self.pool.index(item) for item in items if item in self.shown}
+        if self.extend_selection:
+            window = range(self.first, self.first + len(self.pool))
+            self.selected = {index for index in self.selected if index not in window} | in_view
+        else:
+            self.selected = in_view
+        focus = self.tree.focus()
+        if focus in self.shown:
+            self.anchor = self.first + self.pool.index(focus)
+        elif in_view:
+            self.anchor = max(in_view)
+
+    def move_selection(self, step):
+        """
+        Move the selection with the keyboard, scrolling when it leaves the view.
+
+        """
+        if not len(self.source):
+            return "break"
+        if step in ("page-up", "page-down"):
+            step = self.visible_rows() * (-1 if step == "page-up" else 1)
+        start = self.anchor if self.anchor is not None else self.first - 1
+        self.anchor = max(0, min(len(self.source) - 1, start + step))
+        self.selected = {self.anchor}
+        self.see(self.anchor)
+        self.show_selection()
+        return "break"
+
+    def index_of(self, item):
+        """
+        Get the row index displayed by a Treeview item, or None.
+
+        """
+        if item not in self.shown:
+            return None
+        return self.first + self.pool.index(item)
+
+    def index_at(self, y):
+        """
+        Get the row index at a y coordinate, or None.
+
+        """
+        return self.index_of(self.tree.identify_row(y))
+
+    def selected_indices(self):
+        """
+        Get the indices of the selected rows in order.
+
+        """
+        return sorted(self.selected)
+
+    def select_indices(self, indices):
+        """
+        Select the rows at the given indices and scroll the first of them into view.
+
+        """
+        self.selected = set(indices)
+        self.anchor = max(self.selected) if self.selected else None
+        if self.selected:
+            self.see(min(self.selected))
+        self.show_selection()
+
+    def selection_values(self):
+        """
+        Get the values of the selected rows in order.
+
+        """
+        return [tuple(self.source[index]) for index in self.selected_indices()]